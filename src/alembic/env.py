@@ -15,6 +15,10 @@ if config.config_file_name is not None:
 from core.config import app_config
 from db.session import Base
 import models.incident
+import models.incident_stats
+import models.incident_history
+import models.idempotency_key
+import models.incident_archive
 
 target_metadata = Base.metadata
 
@@ -36,7 +40,13 @@ def run_migrations_offline():
 
 def do_run_migrations(connection: Connection):
     """Run migrations (sync) using a given connection."""
-    context.configure(connection=connection, target_metadata=target_metadata)
+    # Отдельная транзакция на каждую миграцию позволяет использовать autocommit_block
+    # (например, для CREATE INDEX CONCURRENTLY)
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        transaction_per_migration=True,
+    )
     with context.begin_transaction():
         context.run_migrations()
 
@@ -47,7 +57,7 @@ async def run_migrations_online():
     url = config.get_main_option("sqlalchemy.url") or app_config.DATABASE_URL
     connectable = create_async_engine(url, poolclass=pool.NullPool)
 
-    async with connectable.begin() as async_conn:
+    async with connectable.connect() as async_conn:
         # run the sync migration functions in a sync context
         await async_conn.run_sync(do_run_migrations)
     await connectable.dispose()
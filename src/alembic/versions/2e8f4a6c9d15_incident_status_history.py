@@ -0,0 +1,75 @@
+"""incident status history
+
+Revision ID: 2e8f4a6c9d15
+Revises: 9a3c6e1d8b27
+Create Date: 2025-11-17 14:12:40.226183
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2e8f4a6c9d15'
+down_revision: Union[str, Sequence[str], None] = '9a3c6e1d8b27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'incident_status_history',
+        sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('incident_id', sa.UUID(), nullable=False),
+        sa.Column('from_status', sa.String(length=50), nullable=True),
+        sa.Column('to_status', sa.String(length=50), nullable=False),
+        sa.Column('changed_at', sa.DateTime(), server_default=sa.text('LOCALTIMESTAMP'), nullable=False),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_incident_status_history')),
+    )
+    op.create_index(
+        'ix_incident_status_history_incident_id_changed_at',
+        'incident_status_history',
+        ['incident_id', 'changed_at'],
+        unique=False,
+    )
+    op.create_table(
+        'incident_lifecycle',
+        sa.Column('incident_id', sa.UUID(), nullable=False),
+        sa.Column('source', sa.String(length=50), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('status', sa.String(length=50), nullable=False),
+        sa.Column('status_since', sa.DateTime(), nullable=False),
+        sa.Column('open_seconds', sa.Float(), server_default='0', nullable=False),
+        sa.Column('in_progress_seconds', sa.Float(), server_default='0', nullable=False),
+        sa.Column('waiting_seconds', sa.Float(), server_default='0', nullable=False),
+        sa.Column('resolved_at', sa.DateTime(), nullable=True),
+        sa.Column('resolve_seconds', sa.Float(), nullable=True),
+        sa.PrimaryKeyConstraint('incident_id', name=op.f('pk_incident_lifecycle')),
+    )
+    op.create_index(
+        'ix_incident_lifecycle_source_resolved_at',
+        'incident_lifecycle',
+        ['source', 'resolved_at'],
+        unique=False,
+        postgresql_where=sa.text('resolved_at IS NOT NULL'),
+    )
+    # История существующих инцидентов неизвестна: время в статусе отсчитывается
+    # с момента миграции, а уже решенные инциденты в MTTR не попадают
+    op.execute("LOCK TABLE incidents IN SHARE MODE")
+    op.execute(
+        """
+        INSERT INTO incident_lifecycle (incident_id, source, created_at, status, status_since)
+        SELECT id, source, created_at, status, LOCALTIMESTAMP FROM incidents
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_incident_lifecycle_source_resolved_at', table_name='incident_lifecycle')
+    op.drop_table('incident_lifecycle')
+    op.drop_index('ix_incident_status_history_incident_id_changed_at', table_name='incident_status_history')
+    op.drop_table('incident_status_history')
@@ -0,0 +1,43 @@
+"""incidents keyset index
+
+Revision ID: 3f1c9a7d2b64
+Revises: e25dafb4b95a
+Create Date: 2025-11-10 10:15:12.418734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c9a7d2b64'
+down_revision: Union[str, Sequence[str], None] = 'e25dafb4b95a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY не может выполняться внутри транзакции
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_incidents_created_at_id',
+            'incidents',
+            ['created_at', 'id'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_incidents_created_at_id',
+            table_name='incidents',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
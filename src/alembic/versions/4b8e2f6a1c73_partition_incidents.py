@@ -0,0 +1,134 @@
+"""partition incidents by month
+
+Revision ID: 4b8e2f6a1c73
+Revises: 7c1d5e9a3f42
+Create Date: 2025-11-19 09:41:27.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b8e2f6a1c73'
+down_revision: Union[str, Sequence[str], None] = '7c1d5e9a3f42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Партиции на столько месяцев вперед; дальше их создает maintenance.py partitions
+MONTHS_AHEAD = 3
+
+INDEX_NAMES = (
+    'ix_incidents_created_at_id',
+    'ix_incidents_status_created_at',
+    'ix_incidents_active_created_at',
+    'ix_incidents_search_vector',
+    'ix_incidents_description_trgm',
+)
+
+COPY_COLUMNS = "id, description, status, source, created_at, version"
+
+
+def create_incidents_table(primary_key: sa.PrimaryKeyConstraint, **kwargs) -> None:
+    op.create_table(
+        'incidents',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('description', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(length=50), nullable=False),
+        sa.Column('source', sa.String(length=50), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('version', sa.Integer(), server_default='1', nullable=False),
+        sa.Column(
+            'search_vector',
+            postgresql.TSVECTOR(),
+            sa.Computed("to_tsvector('simple', description)", persisted=True),
+            nullable=True,
+        ),
+        primary_key,
+        **kwargs,
+    )
+
+
+def create_incidents_indexes() -> None:
+    op.create_index('ix_incidents_created_at_id', 'incidents', ['created_at', 'id'], unique=False)
+    op.create_index('ix_incidents_status_created_at', 'incidents', ['status', 'created_at', 'id'], unique=False)
+    op.create_index(
+        'ix_incidents_active_created_at',
+        'incidents',
+        ['created_at', 'id'],
+        unique=False,
+        postgresql_where=sa.text("status IN ('open', 'in_progress', 'waiting')"),
+    )
+    op.create_index('ix_incidents_search_vector', 'incidents', ['search_vector'], unique=False, postgresql_using='gin')
+    op.create_index(
+        'ix_incidents_description_trgm',
+        'incidents',
+        ['description'],
+        unique=False,
+        postgresql_using='gin',
+        postgresql_ops={'description': 'gin_trgm_ops'},
+    )
+
+
+def replace_incidents_table() -> None:
+    """Переименовать текущую таблицу и освободить имена ее индексов"""
+    # Запись в incidents останавливается до конца миграции; время пропорционально
+    # размеру таблицы, поэтому миграцию нужно проводить в окно обслуживания
+    op.execute("LOCK TABLE incidents IN ACCESS EXCLUSIVE MODE")
+    op.rename_table('incidents', 'incidents_old')
+    op.execute("ALTER TABLE incidents_old RENAME CONSTRAINT pk_incidents TO pk_incidents_old")
+    for name in INDEX_NAMES:
+        op.drop_index(name, table_name='incidents_old', if_exists=True)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    replace_incidents_table()
+    create_incidents_table(
+        sa.PrimaryKeyConstraint('id', 'created_at', name=op.f('pk_incidents')),
+        postgresql_partition_by='RANGE (created_at)',
+    )
+    # Партиции от месяца самого старого инцидента до MONTHS_AHEAD месяцев вперед
+    # (имена совпадают с db/partitions.py: incidents_YYYY_MM)
+    op.execute(
+        f"""
+        DO $$
+        DECLARE
+            month timestamp;
+        BEGIN
+            FOR month IN
+                SELECT generate_series(
+                    date_trunc('month', coalesce((SELECT min(created_at) FROM incidents_old), localtimestamp)),
+                    date_trunc('month', localtimestamp) + interval '{MONTHS_AHEAD} months',
+                    interval '1 month'
+                )
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF incidents FOR VALUES FROM (%L) TO (%L)',
+                    'incidents_' || to_char(month, 'YYYY_MM'),
+                    month,
+                    month + interval '1 month'
+                );
+            END LOOP;
+        END
+        $$
+        """
+    )
+    op.execute(f"INSERT INTO incidents ({COPY_COLUMNS}) SELECT {COPY_COLUMNS} FROM incidents_old")
+    # Индексы строятся после копирования данных - так быстрее
+    create_incidents_indexes()
+    op.drop_table('incidents_old')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    replace_incidents_table()
+    create_incidents_table(sa.PrimaryKeyConstraint('id', name=op.f('pk_incidents')))
+    op.execute(f"INSERT INTO incidents ({COPY_COLUMNS}) SELECT {COPY_COLUMNS} FROM incidents_old")
+    create_incidents_indexes()
+    # Вместе с секционированной таблицей удаляются все ее партиции
+    op.drop_table('incidents_old')
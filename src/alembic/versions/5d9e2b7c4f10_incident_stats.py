@@ -0,0 +1,43 @@
+"""incident stats
+
+Revision ID: 5d9e2b7c4f10
+Revises: c4a7e1f05d38
+Create Date: 2025-11-14 11:05:12.418207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d9e2b7c4f10'
+down_revision: Union[str, Sequence[str], None] = 'c4a7e1f05d38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'incident_stats',
+        sa.Column('status', sa.String(length=50), nullable=False),
+        sa.Column('source', sa.String(length=50), nullable=False),
+        sa.Column('shard', sa.Integer(), nullable=False),
+        sa.Column('count', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('status', 'source', 'shard', name=op.f('pk_incident_stats')),
+    )
+    # Начальные значения; запись в incidents на время подсчета блокируется
+    op.execute("LOCK TABLE incidents IN SHARE MODE")
+    op.execute(
+        """
+        INSERT INTO incident_stats (status, source, shard, count)
+        SELECT status, source, 0, count(*) FROM incidents GROUP BY status, source
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('incident_stats')
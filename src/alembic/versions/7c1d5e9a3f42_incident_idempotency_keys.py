@@ -0,0 +1,42 @@
+"""incident idempotency keys
+
+Revision ID: 7c1d5e9a3f42
+Revises: 2e8f4a6c9d15
+Create Date: 2025-11-18 10:05:12.904417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1d5e9a3f42'
+down_revision: Union[str, Sequence[str], None] = '2e8f4a6c9d15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'incident_idempotency_keys',
+        sa.Column('source', sa.String(length=50), nullable=False),
+        sa.Column('key', sa.String(length=255), nullable=False),
+        sa.Column('incident_id', sa.UUID(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('LOCALTIMESTAMP'), nullable=False),
+        sa.PrimaryKeyConstraint('source', 'key', name=op.f('pk_incident_idempotency_keys')),
+    )
+    op.create_index(
+        'ix_incident_idempotency_keys_incident_id',
+        'incident_idempotency_keys',
+        ['incident_id'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_incident_idempotency_keys_incident_id', table_name='incident_idempotency_keys')
+    op.drop_table('incident_idempotency_keys')
@@ -0,0 +1,58 @@
+"""incidents filter indexes
+
+Revision ID: 8b2e4d6f1a93
+Revises: 3f1c9a7d2b64
+Create Date: 2025-11-11 09:42:03.517206
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2e4d6f1a93'
+down_revision: Union[str, Sequence[str], None] = '3f1c9a7d2b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Индексы строятся CONCURRENTLY, чтобы не блокировать запись в таблицу
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_incidents_status_created_at',
+            'incidents',
+            ['status', 'created_at', 'id'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            'ix_incidents_active_created_at',
+            'incidents',
+            ['created_at', 'id'],
+            unique=False,
+            postgresql_where=sa.text("status IN ('open', 'in_progress', 'waiting')"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_incidents_active_created_at',
+            table_name='incidents',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            'ix_incidents_status_created_at',
+            table_name='incidents',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,73 @@
+"""incident search
+
+Revision ID: 9a3c6e1d8b27
+Revises: 5d9e2b7c4f10
+Create Date: 2025-11-15 10:31:26.774512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a3c6e1d8b27'
+down_revision: Union[str, Sequence[str], None] = '5d9e2b7c4f10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # Хранимый генерируемый столбец: таблица перезаписывается под
+    # эксклюзивной блокировкой, на больших таблицах нужно окно обслуживания
+    op.add_column(
+        'incidents',
+        sa.Column(
+            'search_vector',
+            postgresql.TSVECTOR(),
+            sa.Computed("to_tsvector('simple', description)", persisted=True),
+            nullable=True,
+        ),
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_incidents_search_vector',
+            'incidents',
+            ['search_vector'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            'ix_incidents_description_trgm',
+            'incidents',
+            ['description'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={'description': 'gin_trgm_ops'},
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_incidents_description_trgm',
+            table_name='incidents',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            'ix_incidents_search_vector',
+            table_name='incidents',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    op.drop_column('incidents', 'search_vector')
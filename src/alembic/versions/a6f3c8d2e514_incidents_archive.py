@@ -0,0 +1,38 @@
+"""incidents archive
+
+Revision ID: a6f3c8d2e514
+Revises: 4b8e2f6a1c73
+Create Date: 2025-11-20 11:16:03.552871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6f3c8d2e514'
+down_revision: Union[str, Sequence[str], None] = '4b8e2f6a1c73'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'incidents_archive',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('description', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(length=50), nullable=False),
+        sa.Column('source', sa.String(length=50), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('archived_at', sa.DateTime(), server_default=sa.text('LOCALTIMESTAMP'), nullable=False),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_incidents_archive')),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('incidents_archive')
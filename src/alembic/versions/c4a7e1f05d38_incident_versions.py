@@ -0,0 +1,34 @@
+"""incident versions
+
+Revision ID: c4a7e1f05d38
+Revises: 8b2e4d6f1a93
+Create Date: 2025-11-13 16:20:47.903114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4a7e1f05d38'
+down_revision: Union[str, Sequence[str], None] = '8b2e4d6f1a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Константный DEFAULT не требует перезаписи таблицы
+    op.add_column(
+        'incidents',
+        sa.Column('version', sa.Integer(), server_default='1', nullable=False),
+    )
+    op.execute(sa.schema.CreateSequence(sa.Sequence('incident_changes_seq')))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(sa.schema.DropSequence(sa.Sequence('incident_changes_seq')))
+    op.drop_column('incidents', 'version')
@@ -0,0 +1,45 @@
+"""incident collection version table
+
+Revision ID: d7e2a9c4b6f1
+Revises: a6f3c8d2e514
+Create Date: 2025-11-21 10:42:18.215634
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7e2a9c4b6f1'
+down_revision: Union[str, Sequence[str], None] = 'a6f3c8d2e514'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'incident_collection_version',
+        sa.Column('shard', sa.Integer(), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('shard', name=op.f('pk_incident_collection_version')),
+    )
+    # Версия продолжается с последнего значения последовательности, чтобы
+    # ETag, выданные до миграции, не совпали с новыми
+    op.execute(
+        "INSERT INTO incident_collection_version (shard, version) "
+        "SELECT 0, last_value FROM incident_changes_seq"
+    )
+    op.execute(sa.schema.DropSequence(sa.Sequence('incident_changes_seq')))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(sa.schema.CreateSequence(sa.Sequence('incident_changes_seq')))
+    op.execute(
+        "SELECT setval('incident_changes_seq', GREATEST(COALESCE(SUM(version), 0), 1)) "
+        "FROM incident_collection_version"
+    )
+    op.drop_table('incident_collection_version')
@@ -0,0 +1,50 @@
+"""incidents default partition
+
+Revision ID: e3b5d8f1a2c9
+Revises: d7e2a9c4b6f1
+Create Date: 2025-11-24 09:17:36.508142
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3b5d8f1a2c9'
+down_revision: Union[str, Sequence[str], None] = 'd7e2a9c4b6f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COPY_COLUMNS = "id, description, status, source, created_at, version"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Вставка в месяц без партиции не падает, а попадает сюда;
+    # maintenance.py partitions переносит такие строки в партицию месяца
+    op.execute("CREATE TABLE incidents_default PARTITION OF incidents DEFAULT")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE incidents DETACH PARTITION incidents_default")
+    op.execute(
+        """
+        DO $$
+        DECLARE
+            month date;
+        BEGIN
+            FOR month IN SELECT DISTINCT date_trunc('month', created_at)::date FROM incidents_default LOOP
+                EXECUTE format(
+                    'CREATE TABLE IF NOT EXISTS %I PARTITION OF incidents FOR VALUES FROM (%L) TO (%L)',
+                    'incidents_' || to_char(month, 'YYYY_MM'),
+                    month,
+                    (month + interval '1 month')::date
+                );
+            END LOOP;
+        END $$;
+        """
+    )
+    op.execute(f"INSERT INTO incidents ({COPY_COLUMNS}) SELECT {COPY_COLUMNS} FROM incidents_default")
+    op.execute("DROP TABLE incidents_default")
@@ -0,0 +1,73 @@
+from fastapi import APIRouter
+
+from core.admission import admission_controller
+from core.cache import incident_cache
+from core.events import incident_events
+from core.idempotency import recent_idempotency_keys
+from db.pool import checkout_wait_stats
+from db.session import engine
+from db.slow_queries import slow_query_recorder
+from services.ingestion import incident_ingestion
+
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+@router.get("/cache/stats")
+async def get_cache_stats() -> dict:
+    """Счетчики кэша инцидентов (попадания, промахи, вытеснения)"""
+    if incident_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **incident_cache.stats()}
+
+
+@router.get("/events/stats")
+async def get_events_stats() -> dict:
+    """Подписчики ленты изменений, доставленные и отброшенные события"""
+    return incident_events.stats()
+
+
+@router.get("/ingestion/stats")
+async def get_ingestion_stats() -> dict:
+    """Очередь создания инцидентов: размер, пакеты, отказы"""
+    if incident_ingestion is None:
+        return {"enabled": False}
+    return {"enabled": True, **incident_ingestion.stats()}
+
+
+@router.get("/idempotency/stats")
+async def get_idempotency_stats() -> dict:
+    """Недавние ключи идемпотентности процесса: повторы, отвеченные без записи"""
+    return recent_idempotency_keys.stats()
+
+
+@router.get("/admission/stats")
+async def get_admission_stats() -> dict:
+    """Контроль допуска: выполняющиеся запросы, отказы по лимитам и сброс нагрузки"""
+    if admission_controller is None:
+        return {"enabled": False}
+    return {"enabled": True, **admission_controller.stats()}
+
+
+@router.get("/db/pool")
+async def get_pool_stats() -> dict:
+    """Использование пула соединений и гистограмма времени ожидания соединения"""
+    return {
+        "pool": engine.pool.usage(),
+        "checkout_wait": checkout_wait_stats.snapshot(),
+    }
+
+
+@router.get("/slow-queries")
+async def get_slow_queries() -> dict:
+    """Медленные запросы по убыванию суммарного времени, с планами EXPLAIN для выборки"""
+    if slow_query_recorder is None:
+        return {"enabled": False}
+    return {"enabled": True, **slow_query_recorder.snapshot()}
+
+
+@router.delete("/slow-queries", status_code=204)
+async def reset_slow_queries() -> None:
+    """Очистить журнал медленных запросов"""
+    if slow_query_recorder is not None:
+        slow_query_recorder.reset()
@@ -1,18 +1,45 @@
+import asyncio
+from datetime import datetime
 from typing import Annotated, List
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, WebSocket
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from uuid import UUID
 
 from schemas.incident import (
+    IncidentArchivedOut,
+    IncidentBulkCreate,
+    IncidentBulkResult,
+    IncidentBulkStatusResult,
+    IncidentBulkStatusUpdate,
     IncidentCreate,
+    IncidentFilter,
     IncidentOut,
+    IncidentPage,
+    IncidentSearchPage,
+    IncidentStatsOut,
+    MttrReport,
+    SEARCH_QUERY_MAX_LENGTH,
+    SEARCH_QUERY_MIN_LENGTH,
+    IDEMPOTENCY_KEY_MAX_LENGTH,
+    INCIDENT_FIELDS,
+    parse_incident_fields,
     IncidentStatusUpdate,
     IncidentDescriptionUpdate,
 )
 from schemas.errors import BaseErrorSchema
-from core.enums import IncidentStatus, IncidentSource
+from core.config import app_config
+from core.enums import ExportFormat, IncidentStatus, IncidentSource
+from core.events import incident_events
+from core.idempotency import IDEMPOTENCY_KEY_HEADER, IDEMPOTENT_REPLAY_HEADER, IdempotencyKeyConflictError
+from core.etag import etag_matches, make_collection_etag, make_incident_etag
+from core.pagination import DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT
 from services.incident import IncidentService, IncidentNotFoundError
+from services.export import EXPORT_MEDIA_TYPES
+from services.ingestion import IngestionQueueFullError, IngestionStoppedError, incident_ingestion
+from services.stream import sse_messages
 from core.unit_of_work import AbstractUnitOfWork
-from core.dependencies import get_uow
+from core.dependencies import get_read_uow, get_uow
 
 
 router = APIRouter(prefix="/incidents", tags=["incidents"])
@@ -22,46 +49,366 @@ def get_incident_service(uow: AbstractUnitOfWork = Depends(get_uow)) -> Incident
     return IncidentService(uow)
 
 
+def get_read_incident_service(uow: AbstractUnitOfWork = Depends(get_read_uow)) -> IncidentService:
+    """Сервис для GET-запросов: read-only транзакции, при наличии - реплика"""
+    return IncidentService(uow)
+
+
+def get_incident_fields(
+    fields: str | None = Query(
+        default=None,
+        description=f"Поля ответа через запятую (по умолчанию все): {','.join(INCIDENT_FIELDS)}",
+    ),
+) -> tuple[str, ...] | None:
+    if fields is None:
+        return None
+    try:
+        return parse_incident_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def get_stream_filter(
+    status: List[IncidentStatus] | None = Query(
+        default=None, description="Только события инцидентов в этих статусах (текущем или прежнем)"
+    ),
+    source: List[IncidentSource] | None = Query(
+        default=None, description="Только события инцидентов из этих источников"
+    ),
+) -> tuple[List[IncidentStatus] | None, List[IncidentSource] | None]:
+    return status, source
+
+
+def get_incident_filter(
+    status: List[IncidentStatus] | None = Query(
+        default=None, description="Фильтр по статусам (параметр можно повторять)"
+    ),
+    source: IncidentSource | None = Query(
+        default=None, description="Фильтр по источнику"
+    ),
+    created_from: datetime | None = Query(
+        default=None, description="Начало интервала created_at (включительно)"
+    ),
+    created_to: datetime | None = Query(
+        default=None, description="Конец интервала created_at (не включительно)"
+    ),
+) -> IncidentFilter:
+    try:
+        return IncidentFilter(
+            statuses=status,
+            source=source,
+            created_from=created_from,
+            created_to=created_to,
+        )
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=e.errors()[0]["msg"])
+
+
 @router.post(
     "/",
     status_code=201,
     response_model=IncidentOut,
     responses={
+        200: {"model": IncidentOut, "description": "Повтор с тем же ключом идемпотентности"},
         201: {"model": IncidentOut},
         400: {"model": BaseErrorSchema},
+        409: {"model": BaseErrorSchema, "description": "Ключ идемпотентности использован с другим описанием"},
+        429: {"model": BaseErrorSchema, "description": "Очередь создания переполнена"},
         500: {"model": BaseErrorSchema},
+        503: {"model": BaseErrorSchema, "description": "Приложение останавливается"},
     },
 )
 async def create_incident(
-    payload: IncidentCreate, service: IncidentService = Depends(get_incident_service)
+    payload: IncidentCreate,
+    response: Response,
+    idempotency_key: str | None = Header(
+        default=None,
+        alias=IDEMPOTENCY_KEY_HEADER,
+        min_length=1,
+        max_length=IDEMPOTENCY_KEY_MAX_LENGTH,
+        description="Ключ идемпотентности (альтернатива полю idempotency_key)",
+    ),
+    service: IncidentService = Depends(get_incident_service),
 ) -> IncidentOut:
     """Создать новый инцидент"""
+    if idempotency_key is not None:
+        if payload.idempotency_key not in (None, idempotency_key):
+            raise HTTPException(
+                status_code=400, detail="Idempotency-Key header does not match idempotency_key field"
+            )
+        payload = payload.model_copy(update={"idempotency_key": idempotency_key})
+    try:
+        # Большинство повторов отвечается по недавним ключам процесса без записи в БД
+        incident = await service.find_replay(payload)
+        if incident is not None:
+            created = False
+        elif incident_ingestion is not None:
+            # Создание пакетом вместе с конкурентными запросами
+            incident, created = await incident_ingestion.submit(payload)
+        else:
+            incident, created = await service.create_incident_idempotent(payload)
+        if not created:
+            response.status_code = 200
+            response.headers[IDEMPOTENT_REPLAY_HEADER] = "true"
+        return incident
+    except IdempotencyKeyConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except IngestionQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    except IngestionStoppedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post(
+    "/bulk",
+    response_model=IncidentBulkResult,
+    responses={
+        200: {"model": IncidentBulkResult},
+        422: {"description": "Пустой или слишком большой пакет"},
+        500: {"model": BaseErrorSchema},
+    },
+)
+async def create_incidents_bulk(
+    payload: IncidentBulkCreate, service: IncidentService = Depends(get_incident_service)
+) -> IncidentBulkResult:
+    """Создать пакет инцидентов одним запросом с результатом по каждому элементу"""
     try:
-        return await service.create_incident(payload)
+        return await service.create_incidents_bulk(payload.items)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get(
     "/",
-    response_model=List[IncidentOut],
+    response_model=IncidentPage,
     responses={
-        200: {"model": List[IncidentOut]},
+        200: {"model": IncidentPage},
+        304: {"description": "Список не изменился (If-None-Match)"},
+        400: {"model": BaseErrorSchema},
         500: {"model": BaseErrorSchema},
     },
 )
 async def list_incidents(
-    status: IncidentStatus | None = Query(
-        default=None, description="Фильтр по статусу"
+    request: Request,
+    filters: IncidentFilter = Depends(get_incident_filter),
+    limit: int = Query(
+        default=DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT, description="Размер страницы"
     ),
-    service: IncidentService = Depends(get_incident_service),
-) -> List[IncidentOut]:
-    """Получить список инцидентов с возможностью фильтрации по статусу"""
+    cursor: str | None = Query(
+        default=None, description="Курсор следующей страницы из next_cursor"
+    ),
+    fields: tuple[str, ...] | None = Depends(get_incident_fields),
+    if_none_match: str | None = Header(default=None),
+    service: IncidentService = Depends(get_read_incident_service),
+) -> Response:
+    """Получить страницу инцидентов с фильтрацией по статусам, источнику и дате создания"""
     try:
-        if status:
-            return await service.get_incidents_by_status(status)
-        else:
-            return await service.get_all_incidents()
+        # Версия читается до данных: если между чтениями случится запись,
+        # ETag окажется старше данных и следующий опрос просто получит их заново
+        etag = make_collection_etag(
+            await service.get_collection_version(), request.query_params.multi_items()
+        )
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        # Готовый JSON отдается напрямую, минуя повторную валидацию response_model
+        content = await service.get_incidents_page_json(
+            limit=limit, cursor=cursor, filters=filters, fields=fields
+        )
+        return Response(content=content, media_type="application/json", headers={"ETag": etag})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "description": "Потоковая выгрузка инцидентов",
+            "content": {media_type: {} for media_type in EXPORT_MEDIA_TYPES.values()},
+        },
+        400: {"model": BaseErrorSchema},
+    },
+)
+async def export_incidents(
+    format: ExportFormat = Query(
+        default=ExportFormat.NDJSON, description="Формат выгрузки"
+    ),
+    filters: IncidentFilter = Depends(get_incident_filter),
+    service: IncidentService = Depends(get_read_incident_service),
+) -> StreamingResponse:
+    """Выгрузить инциденты потоком в формате NDJSON или CSV"""
+    return StreamingResponse(
+        service.export_incidents(format, app_config.EXPORT_CHUNK_SIZE, filters),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="incidents.{format}"'},
+    )
+
+
+@router.get(
+    "/search",
+    response_model=IncidentSearchPage,
+    responses={
+        200: {"model": IncidentSearchPage},
+        400: {"model": BaseErrorSchema},
+        500: {"model": BaseErrorSchema},
+    },
+)
+async def search_incidents(
+    q: str = Query(
+        min_length=SEARCH_QUERY_MIN_LENGTH,
+        max_length=SEARCH_QUERY_MAX_LENGTH,
+        description="Поисковый запрос (слова, \"фразы\", -исключения; допускаются опечатки)",
+    ),
+    filters: IncidentFilter = Depends(get_incident_filter),
+    limit: int = Query(
+        default=DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT, description="Размер страницы"
+    ),
+    cursor: str | None = Query(
+        default=None, description="Курсор следующей страницы из next_cursor"
+    ),
+    service: IncidentService = Depends(get_read_incident_service),
+) -> IncidentSearchPage:
+    """Полнотекстовый и нечеткий поиск по описанию, по убыванию релевантности"""
+    try:
+        return await service.search_incidents(q, limit=limit, cursor=cursor, filters=filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get(
+    "/stream",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "description": "Поток событий изменения инцидентов (Server-Sent Events)",
+            "content": {"text/event-stream": {}},
+        },
+    },
+)
+async def stream_incident_events(
+    stream_filter: tuple = Depends(get_stream_filter),
+) -> StreamingResponse:
+    """Лента изменений инцидентов: created, status_changed, description_changed, deleted.
+
+    Событие resync означает, что клиент пропустил события и должен перечитать список.
+    """
+    statuses, sources = stream_filter
+
+    async def body():
+        # Подписка создается при старте потока, чтобы отписка в finally была гарантирована
+        subscription = incident_events.subscribe(statuses, sources)
+        try:
+            async for message in sse_messages(
+                subscription, app_config.INCIDENT_EVENTS_HEARTBEAT_SECONDS
+            ):
+                yield message
+        finally:
+            incident_events.unsubscribe(subscription)
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/stream/ws")
+async def stream_incident_events_ws(
+    websocket: WebSocket,
+    stream_filter: tuple = Depends(get_stream_filter),
+) -> None:
+    """Лента изменений инцидентов через WebSocket (те же события в JSON)"""
+    statuses, sources = stream_filter
+    await websocket.accept()
+    subscription = incident_events.subscribe(statuses, sources)
+
+    async def forward() -> None:
+        while True:
+            _, data = await subscription.get()
+            await websocket.send_text(data)
+
+    sender = asyncio.create_task(forward())
+    try:
+        # Входящие сообщения не используются; ждем отключения клиента
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    finally:
+        incident_events.unsubscribe(subscription)
+        sender.cancel()
+        await asyncio.gather(sender, return_exceptions=True)
+
+
+@router.get(
+    "/stats",
+    response_model=IncidentStatsOut,
+    responses={
+        200: {"model": IncidentStatsOut},
+        500: {"model": BaseErrorSchema},
+    },
+)
+async def get_incident_stats(
+    service: IncidentService = Depends(get_read_incident_service),
+) -> IncidentStatsOut:
+    """Количество инцидентов по статусам и источникам (из таблицы счетчиков)"""
+    try:
+        return await service.get_incident_stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get(
+    "/analytics/mttr",
+    response_model=MttrReport,
+    responses={
+        200: {"model": MttrReport},
+        400: {"model": BaseErrorSchema},
+        500: {"model": BaseErrorSchema},
+    },
+)
+async def get_mttr_report(
+    resolved_from: datetime | None = Query(
+        default=None, description="Начало интервала решения (включительно)"
+    ),
+    resolved_to: datetime | None = Query(
+        default=None, description="Конец интервала решения (не включительно)"
+    ),
+    service: IncidentService = Depends(get_read_incident_service),
+) -> MttrReport:
+    """Перцентили времени решения (MTTR) и среднее время в статусах по источникам"""
+    try:
+        return await service.get_mttr_report(resolved_from, resolved_to)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get(
+    "/archive/{incident_id}",
+    response_model=IncidentArchivedOut,
+    responses={
+        200: {"model": IncidentArchivedOut},
+        404: {"model": BaseErrorSchema},
+        500: {"model": BaseErrorSchema},
+    },
+)
+async def get_archived_incident(
+    incident_id: UUID, service: IncidentService = Depends(get_read_incident_service)
+) -> IncidentArchivedOut:
+    """Получить инцидент, перенесенный в архив"""
+    try:
+        return await service.get_archived_incident(incident_id)
+    except IncidentNotFoundError:
+        raise HTTPException(
+            status_code=404, detail=f"Archived incident with id {incident_id} not found"
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -71,16 +418,38 @@ async def list_incidents(
     response_model=IncidentOut,
     responses={
         200: {"model": IncidentOut},
+        304: {"description": "Инцидент не изменился (If-None-Match)"},
         404: {"model": BaseErrorSchema},
         500: {"model": BaseErrorSchema},
     },
 )
 async def get_incident(
-    incident_id: UUID, service: IncidentService = Depends(get_incident_service)
+    incident_id: UUID,
+    response: Response,
+    fields: tuple[str, ...] | None = Depends(get_incident_fields),
+    if_none_match: str | None = Header(default=None),
+    service: IncidentService = Depends(get_read_incident_service),
 ) -> IncidentOut:
-    """Получить инцидент по ID"""
+    """Получить инцидент по ID (целиком или только поля fields)"""
     try:
-        return await service.get_incident_by_id(incident_id)
+        if if_none_match:
+            # Сначала сверяем только версию, не читая и не сериализуя весь инцидент
+            etag = make_incident_etag(
+                incident_id, await service.get_incident_version(incident_id), fields
+            )
+            if etag_matches(if_none_match, etag):
+                return Response(status_code=304, headers={"ETag": etag})
+        if fields:
+            projection, version = await service.get_incident_fields(incident_id, fields)
+            # Частичный ответ не проходит валидацию response_model IncidentOut
+            return Response(
+                content=projection.model_dump_json(),
+                media_type="application/json",
+                headers={"ETag": make_incident_etag(incident_id, version, fields)},
+            )
+        incident = await service.get_incident_by_id(incident_id)
+        response.headers["ETag"] = make_incident_etag(incident.id, incident.version)
+        return incident
     except IncidentNotFoundError:
         raise HTTPException(
             status_code=404, detail=f"Incident with id {incident_id} not found"
@@ -89,6 +458,29 @@ async def get_incident(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.patch(
+    "/status",
+    response_model=IncidentBulkStatusResult,
+    responses={
+        200: {"model": IncidentBulkStatusResult},
+        500: {"model": BaseErrorSchema},
+    },
+)
+async def update_incidents_status(
+    payload: IncidentBulkStatusUpdate,
+    service: IncidentService = Depends(get_incident_service),
+) -> IncidentBulkStatusResult:
+    """Сменить статус пакета инцидентов одним запросом.
+
+    Недопустимые переходы и отсутствующие инциденты не отменяют остальные
+    изменения, а перечисляются в ответе.
+    """
+    try:
+        return await service.update_incidents_status(payload)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.patch(
     "/{incident_id}/status",
     response_model=IncidentOut,
@@ -0,0 +1,3 @@
+"""
+Бенчмарки горячих путей приложения (запуск: python -m benchmarks.<имя> из src)
+"""
@@ -0,0 +1,105 @@
+"""
+Сравнение сериализации страницы списка: ORM + Pydantic против кортежей + orjson
+
+Запуск из src:
+    python -m benchmarks.list_serialization --rows 10000
+
+Замеряется только работа Python после получения строк от драйвера:
+- orm: сущности Incident, IncidentOut.model_validate на строку, затем
+  serialize_response FastAPI (валидация response_model и дамп) и JSONResponse;
+- rows: строки Row как есть, кодирование orjson (get_incidents_page_json).
+Время - процессорное, лучшее из --repeat; память - пик tracemalloc.
+"""
+
+import argparse
+import asyncio
+import gc
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from sqlalchemy.engine.result import IteratorResult, SimpleResultMetaData
+
+from core.enums import IncidentSource, IncidentStatus
+from core.pagination import encode_cursor
+from models.incident import Incident
+from repositories.abstract_incident import INCIDENT_ROW_FIELDS
+from schemas.incident import IncidentOut, IncidentPage
+from services.serialization import encode_incident_page
+
+
+def make_rows(count: int) -> list:
+    """Строки в том виде, в каком их возвращает session.execute(select(*columns))"""
+    statuses = list(IncidentStatus)
+    sources = list(IncidentSource)
+    started = datetime(2025, 11, 1)
+    tuples = [
+        (
+            uuid.uuid4(),
+            f"Incident {i}: disk usage above threshold on host-{i % 97}",
+            statuses[i % len(statuses)].value,
+            sources[i % len(sources)].value,
+            started + timedelta(seconds=i, microseconds=i),
+            1 + i % 3,
+        )
+        for i in range(count)
+    ]
+    return IteratorResult(SimpleResultMetaData(INCIDENT_ROW_FIELDS), iter(tuples)).all()
+
+
+PAGE_FIELD = create_model_field(name="Response_list_incidents", type_=IncidentPage, mode="serialization")
+
+
+def orm_path(rows: list) -> bytes:
+    incidents = [Incident(**dict(zip(INCIDENT_ROW_FIELDS, row))) for row in rows]
+    items = [IncidentOut.model_validate(incident) for incident in incidents]
+    page = IncidentPage(items=items, next_cursor=encode_cursor(items[-1].created_at, items[-1].id))
+    content = asyncio.run(serialize_response(field=PAGE_FIELD, response_content=page))
+    return JSONResponse(content).body
+
+
+def rows_path(rows: list) -> bytes:
+    last = rows[-1]
+    return encode_incident_page(rows, encode_cursor(last.created_at, last.id))
+
+
+def measure(path: Callable[[list], bytes], rows: list, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.process_time()
+        body = path(rows)
+        timings.append(time.process_time() - started)
+
+    gc.collect()
+    tracemalloc.start()
+    path(rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"cpu_ms": min(timings) * 1000, "peak_mib": peak / 2**20, "bytes": len(body)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    results = {name: measure(path, rows, args.repeat) for name, path in (("orm", orm_path), ("rows", rows_path))}
+
+    print(f"{args.rows} rows, best of {args.repeat}")
+    print(f"{'path':<6}{'cpu, ms':>10}{'peak, MiB':>12}{'body, bytes':>14}")
+    for name, result in results.items():
+        print(f"{name:<6}{result['cpu_ms']:>10.1f}{result['peak_mib']:>12.1f}{result['bytes']:>14}")
+    orm, fast = results["orm"], results["rows"]
+    print(f"cpu x{orm['cpu_ms'] / fast['cpu_ms']:.1f}, memory x{orm['peak_mib'] / fast['peak_mib']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
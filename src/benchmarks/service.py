@@ -0,0 +1,317 @@
+"""
+Пропускная способность и задержки операций IncidentService
+
+Запуск из src:
+    python -m benchmarks.service --backend mock --output results.json
+    python -m benchmarks.service --backend postgres --sizes 1000,10000
+    python -m benchmarks.service --backend mock --baseline baseline.json
+
+Каждый замер повторяется --rounds раз, в отчет попадает лучший прогон.
+Операции: create (одиночное создание), transition (смена статуса одного
+инцидента), transition_bulk (PATCH /incidents/status на 100 инцидентов),
+serialize (IncidentOut.model_validate страницы из 100 сущностей) и
+list@N (страница из 100 по курсору при N инцидентах в хранилище).
+
+mock - MockIncidentRepository, memory - индексированный InMemoryIncidentRepository,
+postgres - БД из настроек (POSTGRES_*);
+для postgres нужна пустая локальная база: созданные инциденты удаляются в конце.
+С --baseline результаты сравниваются с сохраненными ранее (--output), и при
+ухудшении больше чем на --tolerance команда завершается с кодом 1.
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import AsyncIterator, Awaitable, Callable, Optional
+from uuid import UUID
+
+from sqlalchemy import delete
+
+from core.enums import IncidentSource, IncidentStatus
+from core.unit_of_work import AbstractUnitOfWork
+from schemas.incident import (
+    BULK_CREATE_MAX_ITEMS,
+    IncidentBulkStatusUpdate,
+    IncidentCreate,
+    IncidentOut,
+    IncidentStatusUpdate,
+)
+from services.incident import IncidentService
+
+
+PAGE_SIZE = 100
+SOURCES = list(IncidentSource)
+
+
+class MockBackendUnitOfWork(AbstractUnitOfWork):
+    """Unit of Work вокруг MockIncidentRepository: коммит пишет счетчики и журнал статусов, отката данных нет"""
+
+    def __init__(self, incidents):
+        self.incidents = incidents
+
+    async def commit(self):
+        await self.incidents.apply_stats_deltas()
+        events = list(self.incidents.events)
+        self.incidents.events.clear()
+        if events:
+            await self.incidents.record_status_history(events)
+        self.incidents.changed_ids.clear()
+        self.incidents.created_ids.clear()
+
+    async def rollback(self):
+        self.incidents.changed_ids.clear()
+        self.incidents.created_ids.clear()
+        self.incidents.stats_deltas.clear()
+        self.incidents.events.clear()
+
+
+@asynccontextmanager
+async def mock_backend() -> AsyncIterator[AbstractUnitOfWork]:
+    from repositories.mock_incident import MockIncidentRepository
+
+    yield MockBackendUnitOfWork(MockIncidentRepository())
+
+
+@asynccontextmanager
+async def memory_backend() -> AsyncIterator[AbstractUnitOfWork]:
+    from core.unit_of_work import InMemoryUnitOfWork
+
+    yield InMemoryUnitOfWork()
+
+
+@asynccontextmanager
+async def postgres_backend(created: list[UUID]) -> AsyncIterator[AbstractUnitOfWork]:
+    from core.unit_of_work import primary_uow
+    from db.session import engine
+
+    try:
+        async with primary_uow() as uow:
+            try:
+                yield uow
+            finally:
+                await cleanup_postgres(uow, created)
+    finally:
+        await engine.dispose()
+
+
+async def cleanup_postgres(uow, created: list[UUID]) -> None:
+    """Удалить инциденты бенчмарка вместе с журналом статусов и агрегатами"""
+    from models.incident import Incident
+    from models.incident_history import IncidentLifecycle, IncidentStatusHistory
+
+    await uow.session.rollback()
+    for start in range(0, len(created), BULK_CREATE_MAX_ITEMS):
+        chunk = created[start:start + BULK_CREATE_MAX_ITEMS]
+        await uow.session.execute(delete(IncidentStatusHistory).where(IncidentStatusHistory.incident_id.in_(chunk)))
+        await uow.session.execute(delete(IncidentLifecycle).where(IncidentLifecycle.incident_id.in_(chunk)))
+        await uow.session.execute(delete(Incident).where(Incident.id.in_(chunk)))
+        await uow.session.commit()
+    async with uow:
+        await uow.incidents.rebuild_incident_stats()
+        await uow.incidents.bump_collection_version()
+
+
+def incident_data(index: int) -> IncidentCreate:
+    return IncidentCreate(
+        description=f"benchmark incident {index}: disk usage above threshold on host-{index % 97}",
+        source=SOURCES[index % len(SOURCES)],
+    )
+
+
+def summarize(latencies: list[float], seconds: float) -> dict:
+    ordered = sorted(latencies)
+
+    def percentile(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {
+        "ops": len(ordered),
+        "seconds": seconds,
+        "ops_per_second": len(ordered) / seconds if seconds else 0.0,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+async def measure(operation: Callable[[int], Awaitable[object]], ops: int, rounds: int) -> dict:
+    """Лучший из rounds прогонов по ops операций (как timeit): меньше шума от GC и планировщика"""
+    best = None
+    for round_index in range(rounds):
+        latencies = []
+        started = time.perf_counter()
+        for index in range(round_index * ops, (round_index + 1) * ops):
+            op_started = time.perf_counter()
+            await operation(index)
+            latencies.append(time.perf_counter() - op_started)
+        result = summarize(latencies, time.perf_counter() - started)
+        if best is None or result["ops_per_second"] > best["ops_per_second"]:
+            best = result
+    return best
+
+
+class ServiceBenchmark:
+    """Набор замеров над одним хранилищем"""
+
+    def __init__(self, uow: AbstractUnitOfWork, created: list[UUID], rounds: int):
+        self.uow = uow
+        self.rounds = rounds
+        self.service = IncidentService(uow)
+        # Все созданные инциденты (для очистки postgres и подсчета размера)
+        self.created = created
+
+    async def seed(self, count: int, status: IncidentStatus = IncidentStatus.OPEN) -> list[UUID]:
+        """Создать count инцидентов пакетами (вне замера)"""
+        ids = []
+        for start in range(0, count, BULK_CREATE_MAX_ITEMS):
+            batch = [incident_data(index) for index in range(start, min(count, start + BULK_CREATE_MAX_ITEMS))]
+            async with self.uow:
+                incidents = await self.uow.incidents.create_incidents_bulk(batch, status)
+                ids.extend(incident.id for incident in incidents)
+        self.created.extend(ids)
+        return ids
+
+    async def create(self, ops: int) -> dict:
+        async def operation(index: int) -> None:
+            incident = await self.service.create_incident(incident_data(index))
+            self.created.append(incident.id)
+
+        return await measure(operation, ops, self.rounds)
+
+    async def transition(self, ops: int) -> dict:
+        # Каждая операция переводит свой инцидент: open -> in_progress
+        ids = await self.seed(ops * self.rounds)
+        status_update = IncidentStatusUpdate(status=IncidentStatus.IN_PROGRESS)
+        return await measure(
+            lambda index: self.service.update_incident_status(ids[index], status_update), ops, self.rounds
+        )
+
+    async def transition_bulk(self, ops: int) -> dict:
+        ids = await self.seed(ops * self.rounds * PAGE_SIZE)
+
+        async def operation(index: int) -> None:
+            await self.service.update_incidents_status(
+                IncidentBulkStatusUpdate(
+                    ids=ids[index * PAGE_SIZE:(index + 1) * PAGE_SIZE], status=IncidentStatus.CANCELLED
+                )
+            )
+
+        return await measure(operation, ops, self.rounds)
+
+    async def serialize(self, ops: int) -> dict:
+        if len(self.created) < PAGE_SIZE:
+            await self.seed(PAGE_SIZE)
+        async with self.uow:
+            incidents = await self.uow.incidents.get_incidents_page(limit=PAGE_SIZE)
+
+        async def operation(index: int) -> None:
+            [IncidentOut.model_validate(incident) for incident in incidents]
+
+        return await measure(operation, ops, self.rounds)
+
+    async def list_pages(self, ops: int, size: int) -> dict:
+        """Листать страницы по курсору, когда в хранилище size инцидентов"""
+        if len(self.created) < size:
+            await self.seed(size - len(self.created))
+        cursor: Optional[str] = None
+
+        async def operation(index: int) -> None:
+            nonlocal cursor
+            page = await self.service.get_incidents_page(limit=PAGE_SIZE, cursor=cursor)
+            cursor = page.next_cursor
+
+        return await measure(operation, ops, self.rounds)
+
+
+async def run_benchmarks(backend: str, sizes: list[int], ops: int, rounds: int) -> dict:
+    created: list[UUID] = []
+    if backend == "postgres":
+        context = postgres_backend(created)
+    else:
+        context = memory_backend() if backend == "memory" else mock_backend()
+    results = {}
+    async with context as uow:
+        benchmark = ServiceBenchmark(uow, created, rounds)
+        # Листание - первым: остальные замеры добавляют инциденты в хранилище
+        for size in sorted(sizes):
+            results[f"list@{size}"] = await benchmark.list_pages(ops, size)
+        results["serialize"] = await benchmark.serialize(ops)
+        results["create"] = await benchmark.create(ops)
+        results["transition"] = await benchmark.transition(ops)
+        results["transition_bulk"] = await benchmark.transition_bulk(max(1, ops // 10))
+    return {
+        "backend": backend,
+        "ops": ops,
+        "rounds": rounds,
+        "python": platform.python_version(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Имена замеров, ухудшившихся больше чем на tolerance"""
+    regressions = []
+    print(f"{'benchmark':<18}{'p50, ms':>10}{'baseline':>10}{'ops/s':>12}{'baseline':>12}")
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:<18}{result['p50_ms']:>10.3f}{'-':>10}{result['ops_per_second']:>12.1f}{'-':>12}")
+            continue
+        slower = result["p50_ms"] > base["p50_ms"] * (1 + tolerance)
+        fewer = result["ops_per_second"] < base["ops_per_second"] * (1 - tolerance)
+        mark = "  REGRESSION" if slower or fewer else ""
+        print(
+            f"{name:<18}{result['p50_ms']:>10.3f}{base['p50_ms']:>10.3f}"
+            f"{result['ops_per_second']:>12.1f}{base['ops_per_second']:>12.1f}{mark}"
+        )
+        if mark:
+            regressions.append(name)
+    return regressions
+
+
+def print_results(report: dict) -> None:
+    print(f"backend {report['backend']}, {report['ops']} ops per benchmark")
+    print(f"{'benchmark':<18}{'ops/s':>12}{'p50, ms':>10}{'p95, ms':>10}{'p99, ms':>10}{'max, ms':>10}")
+    for name, result in report["results"].items():
+        print(
+            f"{name:<18}{result['ops_per_second']:>12.1f}{result['p50_ms']:>10.3f}"
+            f"{result['p95_ms']:>10.3f}{result['p99_ms']:>10.3f}{result['max_ms']:>10.3f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--backend", choices=["mock", "memory", "postgres"], default="mock")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Dataset sizes for list benchmarks")
+    parser.add_argument("--ops", type=int, default=1000, help="Operations per benchmark")
+    parser.add_argument("--rounds", type=int, default=3, help="Runs per benchmark, the best one is reported")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", help="Compare with results saved earlier by --output")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before a regression is reported")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    report = asyncio.run(run_benchmarks(args.backend, sizes, args.ops, args.rounds))
+    print_results(report)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        print()
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"Regressions: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
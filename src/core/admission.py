@@ -0,0 +1,261 @@
+"""
+Контроль допуска запросов: лимиты по источнику и клиенту, сброс нагрузки
+"""
+
+import math
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Sequence
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from core.config import app_config
+
+
+# Адрес клиента за доверенным прокси (ADMISSION_TRUSTED_PROXIES). Остальные
+# заголовки запроса (X-Incident-Source, X-Client-Id) для лимитов не используются:
+# их выставляет сам клиент
+FORWARDED_FOR_HEADER = "X-Forwarded-For"
+# Источник запросов с адресов не из ADMISSION_CLIENT_SOURCES
+UNIDENTIFIED_SOURCE = "unidentified"
+
+
+class AdmissionRejectedError(Exception):
+    """Запрос отклонен до обработки"""
+
+    def __init__(self, status_code: int, reason: str, retry_after: float):
+        self.status_code = status_code
+        self.retry_after = retry_after
+        super().__init__(reason)
+
+
+class TokenBucket:
+    """Корзина токенов: rate запросов в секунду со всплеском до burst"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated_at")
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = now
+
+    def acquire(self, now: float) -> float:
+        """Взять токен: 0 - запрос допущен, иначе через сколько секунд появится токен"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class AdmissionController:
+    """Решает, допустить ли запрос.
+
+    Лимиты источника и клиента отвечают 429: клиент превысил свою долю.
+    Глобальный лимит одновременных запросов отвечает 503 и срабатывает,
+    только когда пул соединений исчерпан: новый запрос все равно ждал бы
+    соединение до DB_POOL_TIMEOUT, занимая воркер.
+    """
+
+    def __init__(
+        self,
+        source_rates: dict[str, float],
+        default_source_rate: Optional[float],
+        unidentified_rate: Optional[float],
+        client_sources: dict[str, str],
+        client_rate: Optional[float],
+        burst_seconds: float,
+        max_clients: int,
+        max_in_flight: Optional[int],
+        pool_saturated: Callable[[], bool],
+        retry_after_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._clock = clock
+        self._burst_seconds = burst_seconds
+        self._client_sources = {address: source.lower() for address, source in client_sources.items()}
+        source_rates = {source.lower(): rate for source, rate in source_rates.items()}
+        # Своя корзина у каждого источника, назначенного адресам: чужой поток
+        # не расходует лимит операторов
+        self._source_buckets = {}
+        for source in set(self._client_sources.values()):
+            rate = source_rates.get(source, default_source_rate)
+            if rate:
+                self._source_buckets[source] = TokenBucket(rate, self._burst(rate), clock())
+        # Одна корзина на всех, чей адрес не сопоставлен источнику
+        self._unidentified_bucket = (
+            TokenBucket(unidentified_rate, self._burst(unidentified_rate), clock()) if unidentified_rate else None
+        )
+        self._client_rate = client_rate
+        # Ограниченный LRU: давно не появлявшиеся клиенты вытесняются
+        self._client_buckets: OrderedDict[str, TokenBucket] = OrderedDict()
+        self._max_clients = max_clients
+        self._max_in_flight = max_in_flight
+        self._pool_saturated = pool_saturated
+        self._retry_after = retry_after_seconds
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected_source = 0
+        self.rejected_client = 0
+        self.shed = 0
+
+    def _burst(self, rate: float) -> float:
+        return max(1.0, rate * self._burst_seconds)
+
+    def resolve_source(self, address: Optional[str]) -> str:
+        """Источник запроса по адресу клиента из ADMISSION_CLIENT_SOURCES"""
+        source = self._client_sources.get(address) if address else None
+        return source or UNIDENTIFIED_SOURCE
+
+    def admit(self, source: str, client: Optional[str]) -> None:
+        """Допустить запрос или выбросить AdmissionRejectedError.
+
+        Сначала проверяется лимит клиента: отклоненный по нему запрос не
+        расходует токен источника, общий с другими клиентами.
+        Допущенный запрос учитывается как выполняющийся до вызова release().
+        """
+        now = self._clock()
+        if client and self._client_rate:
+            wait = self._client_bucket(client, now).acquire(now)
+            if wait:
+                self.rejected_client += 1
+                raise AdmissionRejectedError(429, "Rate limit exceeded for client", wait)
+        if source == UNIDENTIFIED_SOURCE:
+            bucket = self._unidentified_bucket
+        else:
+            bucket = self._source_buckets.get(source)
+        if bucket is not None:
+            wait = bucket.acquire(now)
+            if wait:
+                self.rejected_source += 1
+                raise AdmissionRejectedError(429, f"Rate limit exceeded for source {source}", wait)
+        if (
+            self._max_in_flight is not None
+            and self.in_flight >= self._max_in_flight
+            and self._pool_saturated()
+        ):
+            self.shed += 1
+            raise AdmissionRejectedError(503, "Server is overloaded, retry later", self._retry_after)
+        self.in_flight += 1
+        self.admitted += 1
+
+    def release(self) -> None:
+        """Запрос завершен"""
+        self.in_flight -= 1
+
+    def _client_bucket(self, client: str, now: float) -> TokenBucket:
+        bucket = self._client_buckets.get(client)
+        if bucket is None:
+            bucket = self._client_buckets[client] = TokenBucket(
+                self._client_rate, self._burst(self._client_rate), now
+            )
+            if len(self._client_buckets) > self._max_clients:
+                self._client_buckets.popitem(last=False)
+        else:
+            self._client_buckets.move_to_end(client)
+        return bucket
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self._max_in_flight,
+            "admitted": self.admitted,
+            "rejected_source": self.rejected_source,
+            "rejected_client": self.rejected_client,
+            "shed": self.shed,
+            "tracked_clients": len(self._client_buckets),
+        }
+
+
+class AdmissionMiddleware:
+    """ASGI middleware: отклоняет запросы сверх лимитов до маршрутизации.
+
+    Ответ 429/503 отдается сразу, без чтения тела запроса и без обращения
+    к БД. Запрос считается выполняющимся до конца отправки ответа, включая
+    потоковые ответы.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        controller: AdmissionController,
+        exempt_paths: Sequence[str] = (),
+        trusted_proxies: Sequence[str] = (),
+    ):
+        self.app = app
+        self._controller = controller
+        self._exempt_paths = tuple(exempt_paths)
+        self._trusted_proxies = frozenset(trusted_proxies)
+
+    def client_address(self, scope: Scope) -> Optional[str]:
+        """Адрес клиента: адрес подключения, а за доверенным прокси -
+        ближайший недоверенный адрес из X-Forwarded-For (левые записи
+        списка клиент может подставить сам)"""
+        address = scope["client"][0] if scope.get("client") else None
+        if address not in self._trusted_proxies:
+            return address
+        forwarded = Headers(scope=scope).get(FORWARDED_FOR_HEADER)
+        if not forwarded:
+            return address
+        for hop in reversed([hop.strip() for hop in forwarded.split(",")]):
+            if hop and hop not in self._trusted_proxies:
+                return hop
+        return address
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self._exempt_paths):
+            await self.app(scope, receive, send)
+            return
+        client = self.client_address(scope)
+        source = self._controller.resolve_source(client)
+        try:
+            self._controller.admit(source, client)
+        except AdmissionRejectedError as e:
+            response = JSONResponse(
+                {"detail": str(e)},
+                status_code=e.status_code,
+                headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self._controller.release()
+
+
+def _pool_saturated() -> bool:
+    """Все соединения пула, включая overflow, выданы"""
+    from db.session import engine
+
+    usage = engine.pool.usage()
+    return usage["checked_out"] >= usage["size"] + usage["max_overflow"]
+
+
+def build_admission_controller() -> Optional[AdmissionController]:
+    """Создать контроль допуска согласно настройкам"""
+    if not app_config.ADMISSION_ENABLED:
+        return None
+    max_in_flight = app_config.ADMISSION_MAX_IN_FLIGHT
+    if max_in_flight is None:
+        # Вдвое больше соединений пула: часть запросов обслуживается кэшем без соединения
+        max_in_flight = 2 * (app_config.DB_POOL_SIZE + app_config.DB_MAX_OVERFLOW)
+    return AdmissionController(
+        source_rates=app_config.ADMISSION_SOURCE_RATES,
+        default_source_rate=app_config.ADMISSION_DEFAULT_SOURCE_RATE,
+        unidentified_rate=app_config.ADMISSION_UNIDENTIFIED_RATE,
+        client_sources=app_config.ADMISSION_CLIENT_SOURCES,
+        client_rate=app_config.ADMISSION_CLIENT_RATE,
+        burst_seconds=app_config.ADMISSION_BURST_SECONDS,
+        max_clients=app_config.ADMISSION_MAX_CLIENTS,
+        max_in_flight=max_in_flight,
+        pool_saturated=_pool_saturated,
+        retry_after_seconds=app_config.ADMISSION_RETRY_AFTER_SECONDS,
+    )
+
+
+admission_controller = build_admission_controller()
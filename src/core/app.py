@@ -6,12 +6,20 @@ from contextlib import asynccontextmanager
 import traceback
 from fastapi import FastAPI
 # from fastapi.middleware.cors import CORSMiddleware  # Убран - CORS не нужен
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 
+from api.admin import router as admin_router
 from api.routers import router as incidents_router
+from core.admission import AdmissionMiddleware, admission_controller
+from core.cache import incident_cache
 from core.config import app_config
 from core.dependencies import settings
+from core.events import incident_events
+from core.metrics import METRICS_CONTENT_TYPE, MetricsMiddleware, mark_process_dead, render_metrics
+from db.listener import pg_listener
+from db.slow_queries import slow_query_recorder
 from services.incident import IncidentNotFoundError
+from services.ingestion import incident_ingestion
 
 
 @asynccontextmanager
@@ -23,10 +31,29 @@ async def lifespan(app: FastAPI):
     # Здесь можно добавить инициализацию БД при необходимости
     # await init_database()
 
+    if incident_cache is not None:
+        await incident_cache.start()
+    await incident_events.start()
+    if pg_listener.has_listeners:
+        await pg_listener.start()
+    if incident_ingestion is not None:
+        await incident_ingestion.start()
+    if slow_query_recorder is not None:
+        await slow_query_recorder.start()
+
     yield
 
     # Shutdown
     print("Shutting down Incident Management API...")
+    if incident_ingestion is not None:
+        # Накопленные создания записываются до закрытия соединений
+        await incident_ingestion.stop()
+    if slow_query_recorder is not None:
+        await slow_query_recorder.stop()
+    await pg_listener.stop()
+    if incident_cache is not None:
+        await incident_cache.stop()
+    mark_process_dead()
     print("Shutdown completed")
 
 
@@ -34,7 +61,15 @@ def setup_middleware(app: FastAPI) -> None:
     """Настройка middleware для приложения"""
     # cors_config = app_config.get_cors_config()
     # app.add_middleware(CORSMiddleware, **cors_config)
-    pass
+    if admission_controller is not None:
+        app.add_middleware(
+            AdmissionMiddleware,
+            controller=admission_controller,
+            exempt_paths=app_config.ADMISSION_EXEMPT_PATHS,
+            trusted_proxies=app_config.ADMISSION_TRUSTED_PROXIES,
+        )
+    # Добавлен последним, поэтому внешний: видит и отказы контроля допуска
+    app.add_middleware(MetricsMiddleware)
 
 
 def setup_exception_handlers(app: FastAPI) -> None:
@@ -83,7 +118,13 @@ def setup_routes(app: FastAPI) -> None:
             },
         }
 
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics_endpoint():
+        """Метрики в формате Prometheus"""
+        return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
     app.include_router(incidents_router)
+    app.include_router(admin_router)
 
 
 def create_app() -> FastAPI:
@@ -0,0 +1,240 @@
+"""
+Кэш инцидентов в памяти процесса с инвалидацией между воркерами
+"""
+
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Collection, Generic, Hashable, Iterable, Optional, TypeVar
+from uuid import UUID
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import app_config
+from schemas.incident import IncidentOut
+
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRUTTLCache(Generic[K, V]):
+    """Ограниченный по размеру LRU-кэш с временем жизни записей"""
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+        invalidation_memory_seconds: float = 0.0,
+    ):
+        self._max_size = max_size
+        self._ttl = ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        # Увеличивается при каждой инвалидации; см. read_token()
+        self._epoch = 0
+        # Время недавних инвалидаций для карантина (см. set)
+        self._invalidation_memory = invalidation_memory_seconds
+        self._invalidated_at: OrderedDict[K, float] = OrderedDict()
+        self._cleared_at = float("-inf")
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def read_token(self) -> int:
+        """Токен, который нужно получить до чтения из источника.
+
+        Если между получением токена и вызовом set() случилась инвалидация,
+        прочитанное значение могло устареть, и set() его не сохранит.
+        """
+        return self._epoch
+
+    def get(self, key: K) -> Optional[V]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: K, value: V, token: Optional[int] = None, quarantine: float = 0.0) -> bool:
+        """Сохранить значение.
+
+        quarantine - не сохранять значение, если ключ инвалидировался менее
+        quarantine секунд назад: так значение с отстающей реплики не вернет
+        в кэш данные, которые только что изменились на primary.
+        """
+        if token is not None and token != self._epoch:
+            return False
+        if quarantine:
+            now = self._clock()
+            invalidated_at = max(self._invalidated_at.get(key, float("-inf")), self._cleared_at)
+            if now - invalidated_at < quarantine:
+                return False
+        self._entries[key] = (self._clock() + self._ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return True
+
+    def invalidate(self, keys: Iterable[K]) -> None:
+        self._epoch += 1
+        now = self._clock()
+        for key in keys:
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+            if self._invalidation_memory:
+                self._invalidated_at[key] = now
+                self._invalidated_at.move_to_end(key)
+        horizon = now - self._invalidation_memory
+        while self._invalidated_at and next(iter(self._invalidated_at.values())) < horizon:
+            self._invalidated_at.popitem(last=False)
+
+    def clear(self) -> None:
+        self._epoch += 1
+        self._cleared_at = self._clock()
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_size": self._max_size,
+            "ttl_seconds": self._ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+class InvalidationChannel(ABC):
+    """Канал доставки инвалидаций в другие процессы"""
+
+    @abstractmethod
+    async def publish(self, session: AsyncSession, incident_ids: Collection[UUID]) -> None:
+        """Отправить инвалидацию в рамках текущей транзакции сессии"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def start(self, on_invalidate: Callable[[list[UUID]], None], on_reset: Callable[[], None]) -> None:
+        """Начать прием инвалидаций от других процессов"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def stop(self) -> None:
+        raise NotImplementedError
+
+
+class LocalInvalidationChannel(InvalidationChannel):
+    """Канал для одного процесса: достаточно локальной инвалидации"""
+
+    async def publish(self, session: AsyncSession, incident_ids: Collection[UUID]) -> None:
+        pass
+
+    async def start(self, on_invalidate: Callable[[list[UUID]], None], on_reset: Callable[[], None]) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+
+class PostgresInvalidationChannel(InvalidationChannel):
+    """Инвалидация через LISTEN/NOTIFY.
+
+    pg_notify вызывается в транзакции записи, поэтому другие воркеры получат
+    уведомление только после коммита, а при откате оно не будет отправлено.
+    """
+
+    CHANNEL = "incident_cache_invalidation"
+    # Полезная нагрузка NOTIFY ограничена 8000 байтами
+    IDS_PER_NOTIFY = 200
+
+    def __init__(self, listener):
+        self._listener = listener
+
+    async def publish(self, session: AsyncSession, incident_ids: Collection[UUID]) -> None:
+        ids = [str(incident_id) for incident_id in incident_ids]
+        for start in range(0, len(ids), self.IDS_PER_NOTIFY):
+            payload = ",".join(ids[start:start + self.IDS_PER_NOTIFY])
+            await session.execute(select(func.pg_notify(self.CHANNEL, payload)))
+
+    async def start(self, on_invalidate: Callable[[list[UUID]], None], on_reset: Callable[[], None]) -> None:
+        def handle(payload: str) -> None:
+            on_invalidate([UUID(incident_id) for incident_id in payload.split(",") if incident_id])
+
+        # Пока соединение LISTEN было разорвано, инвалидации могли потеряться
+        self._listener.add_listener(self.CHANNEL, handle, on_reconnect=on_reset)
+
+    async def stop(self) -> None:
+        pass
+
+
+class IncidentCache:
+    """Кэш IncidentOut по id с инвалидацией через канал"""
+
+    def __init__(self, cache: LRUTTLCache[UUID, IncidentOut], channel: InvalidationChannel):
+        self._cache = cache
+        self._channel = channel
+
+    def read_token(self) -> int:
+        return self._cache.read_token()
+
+    def get(self, incident_id: UUID) -> Optional[IncidentOut]:
+        return self._cache.get(incident_id)
+
+    def set(self, incident: IncidentOut, token: Optional[int] = None, quarantine: float = 0.0) -> None:
+        self._cache.set(incident.id, incident, token, quarantine)
+
+    def invalidate(self, incident_ids: Iterable[UUID]) -> None:
+        self._cache.invalidate(incident_ids)
+
+    async def publish(self, session: AsyncSession, incident_ids: Collection[UUID]) -> None:
+        await self._channel.publish(session, incident_ids)
+
+    async def start(self) -> None:
+        await self._channel.start(self.invalidate, self._cache.clear)
+
+    async def stop(self) -> None:
+        await self._channel.stop()
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+def build_incident_cache() -> Optional[IncidentCache]:
+    """Создать кэш инцидентов согласно настройкам"""
+    if not app_config.INCIDENT_CACHE_ENABLED:
+        return None
+    if app_config.INCIDENT_CACHE_INVALIDATION == "postgres":
+        from db.listener import pg_listener
+
+        channel: InvalidationChannel = PostgresInvalidationChannel(pg_listener)
+    else:
+        channel = LocalInvalidationChannel()
+    return IncidentCache(
+        LRUTTLCache(
+            app_config.INCIDENT_CACHE_MAX_SIZE,
+            app_config.INCIDENT_CACHE_TTL_SECONDS,
+            invalidation_memory_seconds=(
+                app_config.DATABASE_REPLICA_MAX_LAG_SECONDS if app_config.DATABASE_REPLICA_URL else 0.0
+            ),
+        ),
+        channel,
+    )
+
+
+incident_cache = build_incident_cache()
@@ -1,9 +1,10 @@
 import os
-from typing import List
-from pydantic import field_validator, Field, computed_field
+from typing import List, Literal
+from pydantic import field_validator, Field, computed_field, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pathlib import Path
 from typing import Optional
+from uuid import uuid4
 
 
 class Settings(BaseSettings):
@@ -30,6 +31,177 @@ class Settings(BaseSettings):
         "backend", description="Database password for backend user"
     )
 
+    # Database engine profile
+    DB_ECHO: bool = Field(False, description="Log every SQL statement")
+    DB_POOL_SIZE: int = Field(5, description="Persistent connections kept in the pool")
+    DB_MAX_OVERFLOW: int = Field(10, description="Extra connections opened above pool size")
+    DB_POOL_TIMEOUT: float = Field(30.0, description="Seconds to wait for a free connection")
+    DB_POOL_RECYCLE: int = Field(3600, description="Reconnect connections older than this (seconds)")
+    DB_POOL_PRE_PING: bool = Field(
+        True, description="Check connection liveness on checkout (one extra round trip)"
+    )
+    DB_STATEMENT_CACHE_SIZE: int = Field(
+        100, description="asyncpg prepared statement cache size per connection"
+    )
+    DB_TRANSACTION_POOLER: bool = Field(
+        False,
+        description="PgBouncer transaction pooling compatibility: no cached or named prepared statements",
+    )
+    DATABASE_LISTENER_URL: Optional[str] = Field(
+        None,
+        description="Direct PostgreSQL URL (bypassing the pooler) for the LISTEN connection; "
+        "required with DB_TRANSACTION_POOLER when a 'postgres' channel is used",
+    )
+
+    # Read replica routing
+    DATABASE_REPLICA_URL: Optional[str] = Field(
+        None, description="SQLAlchemy URL of a read replica; reads use the primary when unset"
+    )
+    DATABASE_REPLICA_MAX_LAG_SECONDS: float = Field(
+        5.0, description="Expected replica lag; replica reads do not refill the cache for recently changed incidents"
+    )
+    READ_YOUR_WRITES_SECONDS: float = Field(
+        0.0, description="Pin a client to the primary for this long after a write (0 disables)"
+    )
+
+    # Export configuration
+    EXPORT_CHUNK_SIZE: int = Field(
+        1000, description="Rows fetched from the server-side cursor per chunk"
+    )
+
+    # Incident cache configuration
+    INCIDENT_CACHE_ENABLED: bool = Field(
+        True, description="Enable in-process read-through cache for incident lookups"
+    )
+    INCIDENT_CACHE_MAX_SIZE: int = Field(
+        10000, description="Maximum number of incidents kept in the cache"
+    )
+    INCIDENT_CACHE_TTL_SECONDS: float = Field(
+        30.0, description="Time to live of a cached incident"
+    )
+    INCIDENT_CACHE_INVALIDATION: Literal["local", "postgres"] = Field(
+        "postgres",
+        description="Cross-worker invalidation channel: 'local' (single worker) or 'postgres' (LISTEN/NOTIFY)",
+    )
+
+    # Incident change feed configuration
+    INCIDENT_EVENTS_TRANSPORT: Literal["local", "postgres"] = Field(
+        "postgres",
+        description="Change feed delivery between workers: 'local' (single worker) or 'postgres' (LISTEN/NOTIFY)",
+    )
+    INCIDENT_EVENTS_QUEUE_SIZE: int = Field(
+        1000, description="Per-subscriber event queue size; overflow drops the backlog and asks the client to resync"
+    )
+    INCIDENT_EVENTS_HEARTBEAT_SECONDS: float = Field(
+        15.0, description="Keep-alive interval for idle change feed connections"
+    )
+
+    # Write-behind ingestion of incident creates
+    INCIDENT_INGESTION_ENABLED: bool = Field(
+        False, description="Queue POST /incidents/ creates and insert them in micro-batches"
+    )
+    INCIDENT_INGESTION_QUEUE_SIZE: int = Field(
+        10000, description="Maximum queued creates; further requests get 429"
+    )
+    INCIDENT_INGESTION_BATCH_SIZE: int = Field(
+        500, description="Maximum creates inserted by one multi-row INSERT"
+    )
+    INCIDENT_INGESTION_FLUSH_SECONDS: float = Field(
+        0.01, description="How long the first queued create waits for others to join its batch"
+    )
+
+    # Idempotent incident creation
+    IDEMPOTENCY_RECENT_KEYS_SIZE: int = Field(
+        100000, description="Recently used idempotency keys remembered per worker to answer retries without a write"
+    )
+    IDEMPOTENCY_RECENT_KEYS_TTL_SECONDS: float = Field(
+        600.0, description="How long a recently used idempotency key is remembered"
+    )
+
+    # Incident table partitioning (maintenance.py partitions)
+    INCIDENT_PARTITION_MONTHS_AHEAD: int = Field(
+        3, description="Monthly incident partitions created in advance"
+    )
+    INCIDENT_PARTITION_RETENTION_MONTHS: Optional[int] = Field(
+        None, description="Detach partitions older than this many months (unset keeps all)"
+    )
+
+    # Archival of closed incidents (maintenance.py archive)
+    INCIDENT_ARCHIVE_AGE_DAYS: int = Field(
+        90, description="Resolved and cancelled incidents created earlier than this are moved to the archive"
+    )
+    INCIDENT_ARCHIVE_BATCH_SIZE: int = Field(
+        500, description="Incidents moved by one archival transaction"
+    )
+    INCIDENT_ARCHIVE_PAUSE_SECONDS: float = Field(
+        0.2, description="Pause between archival batches to leave room for regular traffic"
+    )
+
+    # Admission control (rate limits and load shedding before routing)
+    ADMISSION_ENABLED: bool = Field(
+        True, description="Reject requests above per-source/per-client limits and shed load on pool saturation"
+    )
+    ADMISSION_SOURCE_RATES: dict[str, float] = Field(
+        {"partner": 200.0},
+        description="Requests per second per incident source assigned in ADMISSION_CLIENT_SOURCES",
+    )
+    ADMISSION_DEFAULT_SOURCE_RATE: Optional[float] = Field(
+        500.0,
+        description="Requests per second of each assigned source missing from ADMISSION_SOURCE_RATES "
+        "(every source keeps its own bucket); unset leaves them unlimited",
+    )
+    ADMISSION_UNIDENTIFIED_RATE: Optional[float] = Field(
+        200.0,
+        description="Requests per second shared by clients whose address is not in ADMISSION_CLIENT_SOURCES; "
+        "unset leaves them unlimited",
+    )
+    ADMISSION_CLIENT_SOURCES: dict[str, str] = Field(
+        {},
+        description="Client address -> incident source (operator, partner, ...); the only way a request gets a source",
+    )
+    ADMISSION_CLIENT_RATE: Optional[float] = Field(
+        50.0, description="Requests per second per client address; unset disables the limit"
+    )
+    ADMISSION_TRUSTED_PROXIES: List[str] = Field(
+        [],
+        description="Proxy addresses whose X-Forwarded-For is used as the client address; "
+        "other connections are keyed by their own address",
+    )
+    ADMISSION_BURST_SECONDS: float = Field(
+        2.0, description="Token bucket size in seconds of the rate: how large a burst is admitted"
+    )
+    ADMISSION_MAX_CLIENTS: int = Field(
+        10000, description="Per-client buckets kept in memory (least recently seen are dropped)"
+    )
+    ADMISSION_MAX_IN_FLIGHT: Optional[int] = Field(
+        None,
+        description="Concurrent requests above which new ones get 503 while the DB pool is exhausted "
+        "(default: twice the pool size plus overflow)",
+    )
+    ADMISSION_EXEMPT_PATHS: List[str] = Field(
+        ["/health", "/metrics", "/swagger", "/redoc", "/admin", "/incidents/stream"],
+        description="Path prefixes never rejected (health checks, metrics, admin, long-lived change feed)",
+    )
+    ADMISSION_RETRY_AFTER_SECONDS: float = Field(
+        1.0, description="Retry-After sent with 503 when load is shed"
+    )
+
+    # Slow query log (GET /admin/slow-queries)
+    SLOW_QUERY_ENABLED: bool = Field(True, description="Record statements slower than the threshold")
+    SLOW_QUERY_THRESHOLD_SECONDS: float = Field(0.2, description="Statements slower than this are recorded")
+    SLOW_QUERY_MAX_STATEMENTS: int = Field(
+        200, description="Distinct normalized statements kept (least recently seen are dropped)"
+    )
+    SLOW_QUERY_EXPLAIN_SAMPLE_RATE: float = Field(
+        0.1, ge=0.0, le=1.0, description="Share of slow SELECTs re-run with EXPLAIN (ANALYZE, BUFFERS) in the background"
+    )
+    SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS: float = Field(
+        600.0, description="Minimum time between EXPLAINs of the same statement"
+    )
+    SLOW_QUERY_EXPLAIN_TIMEOUT_SECONDS: float = Field(
+        5.0, description="statement_timeout for background EXPLAIN ANALYZE"
+    )
+
     # Web server configuration
     HOST: str = Field("0.0.0.0", description="Web server host")
     PORT: int = Field(8000, description="Web server port")
@@ -44,6 +216,54 @@ class Settings(BaseSettings):
             f"postgresql+asyncpg://{username}:{password}@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
         )
 
+    def get_asyncpg_dsn(self) -> str:
+        """DSN для прямого подключения asyncpg (без драйвера SQLAlchemy в схеме)"""
+        return self.DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+    def get_listener_dsn(self) -> str:
+        """DSN соединения LISTEN: прямое подключение, если задано, иначе основная БД"""
+        if self.DATABASE_LISTENER_URL:
+            return self.DATABASE_LISTENER_URL.replace("postgresql+asyncpg://", "postgresql://", 1)
+        return self.get_asyncpg_dsn()
+
+    @model_validator(mode="after")
+    def check_listener_behind_pooler(self) -> "Settings":
+        """LISTEN через PgBouncer в режиме transaction pooling не работает:
+        сессия LISTEN не привязана к серверному соединению, и уведомления
+        молча теряются (кэш других воркеров устаревает, лента теряет события)"""
+        channels = []
+        if self.INCIDENT_CACHE_ENABLED and self.INCIDENT_CACHE_INVALIDATION == "postgres":
+            channels.append("INCIDENT_CACHE_INVALIDATION")
+        if self.INCIDENT_EVENTS_TRANSPORT == "postgres":
+            channels.append("INCIDENT_EVENTS_TRANSPORT")
+        if self.DB_TRANSACTION_POOLER and channels and not self.DATABASE_LISTENER_URL:
+            raise ValueError(
+                f"{', '.join(channels)}='postgres' needs DATABASE_LISTENER_URL (a direct connection) "
+                "when DB_TRANSACTION_POOLER is enabled"
+            )
+        return self
+
+    def get_engine_config(self) -> dict:
+        """Параметры create_async_engine согласно профилю БД"""
+        connect_args: dict = {"statement_cache_size": self.DB_STATEMENT_CACHE_SIZE}
+        if self.DB_TRANSACTION_POOLER:
+            # В режиме transaction pooling соседние транзакции могут попасть на разные
+            # серверные соединения, поэтому подготовленные выражения не переиспользуются
+            connect_args = {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+            }
+        return {
+            "echo": self.DB_ECHO,
+            "pool_pre_ping": self.DB_POOL_PRE_PING,
+            "pool_size": self.DB_POOL_SIZE,
+            "max_overflow": self.DB_MAX_OVERFLOW,
+            "pool_timeout": self.DB_POOL_TIMEOUT,
+            "pool_recycle": self.DB_POOL_RECYCLE,
+            "connect_args": connect_args,
+        }
+
     def get_uvicorn_config(self) -> dict:
         return {
             "host": self.HOST,
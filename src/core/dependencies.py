@@ -2,19 +2,66 @@
 Зависимости для FastAPI эндпойнтов (только development режим)
 """
 
+import time
+from typing import AsyncIterator
+from fastapi import Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from core.unit_of_work import AbstractUnitOfWork, SQLAlchemyUnitOfWork
+from core.unit_of_work import AbstractUnitOfWork, ReadOnlySQLAlchemyUnitOfWork, SQLAlchemyUnitOfWork
 from core.config import app_config
 
 settings = app_config
 
-async def get_uow() -> AbstractUnitOfWork:
-    """Dependency для получения Unit of Work"""
+# Cookie с моментом (unix time), до которого чтения клиента идут в primary
+PRIMARY_PIN_COOKIE = "db_primary_until"
+
+
+def is_pinned_to_primary(request: Request, now: float | None = None) -> bool:
+    """Читать ли из primary: клиент недавно что-то записал"""
+    try:
+        pinned_until = float(request.cookies.get(PRIMARY_PIN_COOKIE, 0))
+    except ValueError:
+        return False
+    return pinned_until > (time.time() if now is None else now)
+
+
+def pin_to_primary(response: Response) -> None:
+    """Закрепить чтения клиента за primary на окно READ_YOUR_WRITES_SECONDS"""
+    window = app_config.READ_YOUR_WRITES_SECONDS
+    if app_config.DATABASE_REPLICA_URL and window > 0:
+        response.set_cookie(
+            PRIMARY_PIN_COOKIE,
+            str(time.time() + window),
+            max_age=int(window) + 1,
+            httponly=True,
+        )
+
+
+async def get_uow(response: Response) -> AsyncIterator[AbstractUnitOfWork]:
+    """Dependency для получения Unit of Work на время запроса.
+
+    Сессия закрывается после отправки ответа (в том числе потокового),
+    поэтому соединение всегда возвращается в пул.
+    """
     from db.session import async_session
 
-    session = async_session()
-    return SQLAlchemyUnitOfWork(session)
+    pin_to_primary(response)
+    async with async_session() as session:
+        yield SQLAlchemyUnitOfWork(session)
+
+
+async def get_read_uow(request: Request) -> AsyncIterator[AbstractUnitOfWork]:
+    """Dependency для Unit of Work только для чтения.
+
+    Чтения идут в реплику (если она настроена), кроме клиентов,
+    закрепленных за primary после записи.
+    """
+    from db.session import async_session, replica_session
+
+    replica = bool(app_config.DATABASE_REPLICA_URL) and not is_pinned_to_primary(request)
+    session_factory = replica_session if replica else async_session
+    async with session_factory() as session:
+        yield ReadOnlySQLAlchemyUnitOfWork(session, replica=replica)
 
 
 # Настройки для development режима
@@ -24,7 +71,7 @@ class Settings:
         self.database_url = app_config.DATABASE_URL
         self.debug = True  # Всегда включен в dev
         self.database_schema = app_config.POSTGRES_SCHEMA
-        self.echo_sql = True  # Всегда включено в dev
+        self.echo_sql = app_config.DB_ECHO
 
 
 settings = Settings()
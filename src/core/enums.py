@@ -7,7 +7,24 @@ class IncidentStatus(StrEnum):
     RESOLVED = "resolved"
     CANCELLED = "cancelled"
 
+# Статусы, в которых инцидент еще требует внимания (покрыты частичным индексом)
+ACTIVE_STATUSES = (IncidentStatus.OPEN, IncidentStatus.IN_PROGRESS, IncidentStatus.WAITING)
+# Финальные статусы: из них нет переходов, удалять можно только такие инциденты
+FINAL_STATUSES = (IncidentStatus.RESOLVED, IncidentStatus.CANCELLED)
+
 class IncidentSource(StrEnum):
     OPERATOR = "operator"
     MONITORING = "monitoring"
-    PARTNER = "partner"
\ No newline at end of file
+    PARTNER = "partner"
+
+class ExportFormat(StrEnum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+class IncidentEventType(StrEnum):
+    CREATED = "created"
+    STATUS_CHANGED = "status_changed"
+    DESCRIPTION_CHANGED = "description_changed"
+    DELETED = "deleted"
+    # Служебное событие: подписчик пропустил события и должен перечитать список
+    RESYNC = "resync"
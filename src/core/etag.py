@@ -0,0 +1,40 @@
+"""
+ETag и условные GET-запросы (If-None-Match)
+"""
+
+import hashlib
+from typing import Iterable, Optional
+from uuid import UUID
+
+
+def make_incident_etag(incident_id: UUID, version: int, fields: Optional[Iterable[str]] = None) -> str:
+    """Сильный ETag инцидента по его версии.
+
+    Ответ с частью полей - другое представление, поэтому набор полей
+    входит в ETag.
+    """
+    if not fields:
+        return f'"{incident_id}-{version}"'
+    digest = hashlib.sha1(",".join(fields).encode()).hexdigest()[:8]
+    return f'"{incident_id}-{version}-{digest}"'
+
+
+def make_collection_etag(collection_version: int, query_params: Iterable[tuple[str, str]]) -> str:
+    """Сильный ETag списка: версия коллекции плюс параметры запроса.
+
+    Разные фильтры, курсоры и размеры страниц при одной версии коллекции
+    дают разные ответы, поэтому параметры входят в ETag.
+    """
+    query = "&".join(f"{key}={value}" for key, value in sorted(query_params))
+    digest = hashlib.sha1(query.encode()).hexdigest()[:16]
+    return f'"c{collection_version}-{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Проверить заголовок If-None-Match (слабое сравнение, RFC 9110)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
@@ -0,0 +1,281 @@
+"""
+Лента изменений инцидентов: публикация через LISTEN/NOTIFY и рассылка подписчикам
+"""
+
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Callable, Collection, Iterable, NamedTuple, Optional
+from uuid import UUID
+
+import orjson
+from sqlalchemy import ARRAY, Text, bindparam, func, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import app_config
+from core.enums import IncidentEventType
+
+
+logger = logging.getLogger(__name__)
+
+
+class IncidentEvent(NamedTuple):
+    """Изменение инцидента.
+
+    Описание в событие не входит: оно может занимать до 4000 символов, а
+    полезная нагрузка NOTIFY ограничена 8000 байтами. При необходимости
+    клиент читает инцидент по id.
+    """
+
+    type: IncidentEventType
+    id: UUID
+    status: str
+    source: str
+    version: Optional[int] = None
+    created_at: Optional[datetime] = None
+    previous_status: Optional[str] = None
+
+    @classmethod
+    def of(
+        cls, event_type: IncidentEventType, incident, previous_status: Optional[str] = None
+    ) -> "IncidentEvent":
+        """Событие по инциденту (сущности или строке с теми же атрибутами)"""
+        return cls(
+            event_type,
+            incident.id,
+            incident.status,
+            incident.source,
+            incident.version,
+            incident.created_at,
+            previous_status,
+        )
+
+    def to_json(self) -> bytes:
+        return orjson.dumps(self._asdict(), option=orjson.OPT_UTC_Z)
+
+
+RESYNC_MESSAGE = (IncidentEventType.RESYNC, orjson.dumps({"type": IncidentEventType.RESYNC}).decode())
+
+
+class Subscription:
+    """Подписка клиента с ограниченной очередью.
+
+    Медленный клиент не должен задерживать остальных и копить память: при
+    переполнении очередь очищается, а клиент получает событие resync и
+    должен перечитать список через GET /incidents/.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        statuses: Optional[Collection[str]] = None,
+        sources: Optional[Collection[str]] = None,
+    ):
+        self._queue: asyncio.Queue[tuple[str, str]] = asyncio.Queue(maxsize)
+        self._statuses = frozenset(statuses) if statuses else None
+        self._sources = frozenset(sources) if sources else None
+        self._resync = False
+        self.dropped = 0
+
+    def matches(self, event: IncidentEvent) -> bool:
+        # Фильтр по статусу учитывает и прежний статус: подписчик на open
+        # узнает, что инцидент ушел в работу
+        if self._statuses is not None and not (
+            event.status in self._statuses or event.previous_status in self._statuses
+        ):
+            return False
+        return self._sources is None or event.source in self._sources
+
+    def offer(self, message: tuple[str, str]) -> None:
+        """Поставить сообщение в очередь, не блокируясь"""
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.dropped += self._queue.qsize() + 1
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self.request_resync()
+
+    def request_resync(self) -> None:
+        self._resync = True
+        if self._queue.empty():
+            # Разбудить ожидающего get()
+            self._queue.put_nowait(RESYNC_MESSAGE)
+            self._resync = False
+
+    async def get(self) -> tuple[str, str]:
+        """Следующее сообщение: (тип события, JSON)"""
+        if self._resync:
+            self._resync = False
+            return RESYNC_MESSAGE
+        return await self._queue.get()
+
+
+class EventTransport(ABC):
+    """Доставка событий во все процессы приложения"""
+
+    @abstractmethod
+    async def publish(self, session: AsyncSession, events: Collection[IncidentEvent]) -> None:
+        """Отправить события в рамках текущей транзакции сессии"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def after_commit(self, events: Collection[IncidentEvent]) -> None:
+        """Вызывается после успешного коммита транзакции с событиями"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def start(
+        self, on_events: Callable[[list[IncidentEvent]], None], on_reset: Callable[[], None]
+    ) -> None:
+        """Начать прием событий"""
+        raise NotImplementedError
+
+
+class LocalEventTransport(EventTransport):
+    """Один процесс: события рассылаются сразу после коммита"""
+
+    def __init__(self):
+        self._on_events: Optional[Callable[[list[IncidentEvent]], None]] = None
+
+    async def publish(self, session: AsyncSession, events: Collection[IncidentEvent]) -> None:
+        pass
+
+    def after_commit(self, events: Collection[IncidentEvent]) -> None:
+        if self._on_events is not None:
+            self._on_events(list(events))
+
+    async def start(
+        self, on_events: Callable[[list[IncidentEvent]], None], on_reset: Callable[[], None]
+    ) -> None:
+        self._on_events = on_events
+
+
+class PostgresEventTransport(EventTransport):
+    """События через LISTEN/NOTIFY.
+
+    pg_notify вызывается в транзакции записи: подписчики видят только
+    зафиксированные изменения, в порядке коммитов. Процесс-отправитель
+    получает свои уведомления так же, как остальные воркеры.
+    """
+
+    CHANNEL = "incident_events"
+    # Полезная нагрузка NOTIFY ограничена 8000 байтами
+    MAX_PAYLOAD_BYTES = 7900
+
+    def __init__(self, listener):
+        self._listener = listener
+
+    async def publish(self, session: AsyncSession, events: Collection[IncidentEvent]) -> None:
+        payloads = list(self._batches(event.to_json() for event in events))
+        # Все уведомления транзакции - одним запросом
+        stmt = select(func.pg_notify(self.CHANNEL, literal_column("payload"))).select_from(
+            func.unnest(bindparam("payloads", payloads, type_=ARRAY(Text))).alias("payload")
+        )
+        await session.execute(stmt)
+
+    def after_commit(self, events: Collection[IncidentEvent]) -> None:
+        pass
+
+    async def start(
+        self, on_events: Callable[[list[IncidentEvent]], None], on_reset: Callable[[], None]
+    ) -> None:
+        def handle(payload: str) -> None:
+            on_events([self._decode(item) for item in orjson.loads(payload)])
+
+        # Пока соединение LISTEN было разорвано, события могли потеряться
+        self._listener.add_listener(self.CHANNEL, handle, on_reconnect=on_reset)
+
+    @staticmethod
+    def _decode(item: dict) -> IncidentEvent:
+        created_at = item.get("created_at")
+        return IncidentEvent(**{
+            **item,
+            "type": IncidentEventType(item["type"]),
+            "id": UUID(item["id"]),
+            "created_at": datetime.fromisoformat(created_at) if created_at else None,
+        })
+
+    @classmethod
+    def _batches(cls, encoded: Iterable[bytes]) -> Iterable[str]:
+        batch: list[bytes] = []
+        size = 2
+        for item in encoded:
+            if batch and size + len(item) + 1 > cls.MAX_PAYLOAD_BYTES:
+                yield (b"[" + b",".join(batch) + b"]").decode()
+                batch, size = [], 2
+            batch.append(item)
+            size += len(item) + 1
+        if batch:
+            yield (b"[" + b",".join(batch) + b"]").decode()
+
+
+class EventBroadcaster:
+    """Рассылка событий подписчикам текущего процесса"""
+
+    def __init__(self, transport: EventTransport, queue_size: int):
+        self._transport = transport
+        self._queue_size = queue_size
+        self._subscriptions: set[Subscription] = set()
+        self.delivered = 0
+        self._dropped_closed = 0
+
+    def subscribe(
+        self,
+        statuses: Optional[Collection[str]] = None,
+        sources: Optional[Collection[str]] = None,
+    ) -> Subscription:
+        subscription = Subscription(self._queue_size, statuses, sources)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+            self._dropped_closed += subscription.dropped
+
+    async def publish(self, session: AsyncSession, events: Collection[IncidentEvent]) -> None:
+        await self._transport.publish(session, events)
+
+    def after_commit(self, events: Collection[IncidentEvent]) -> None:
+        self._transport.after_commit(events)
+
+    def broadcast(self, events: Iterable[IncidentEvent]) -> None:
+        """Разослать события подходящим подписчикам"""
+        for event in events:
+            # Событие кодируется один раз для всех подписчиков
+            message = (event.type, event.to_json().decode())
+            for subscription in self._subscriptions:
+                if subscription.matches(event):
+                    subscription.offer(message)
+                    self.delivered += 1
+
+    def resync_all(self) -> None:
+        for subscription in self._subscriptions:
+            subscription.request_resync()
+
+    async def start(self) -> None:
+        await self._transport.start(self.broadcast, self.resync_all)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscriptions),
+            "delivered": self.delivered,
+            "dropped": self._dropped_closed
+            + sum(subscription.dropped for subscription in self._subscriptions),
+        }
+
+
+def build_incident_events() -> EventBroadcaster:
+    """Создать рассылку событий согласно настройкам"""
+    if app_config.INCIDENT_EVENTS_TRANSPORT == "postgres":
+        from db.listener import pg_listener
+
+        transport: EventTransport = PostgresEventTransport(pg_listener)
+    else:
+        transport = LocalEventTransport()
+    return EventBroadcaster(transport, app_config.INCIDENT_EVENTS_QUEUE_SIZE)
+
+
+incident_events = build_incident_events()
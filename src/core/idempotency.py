@@ -0,0 +1,62 @@
+"""
+Идемпотентное создание инцидентов: проверка повторов и недавние ключи процесса
+"""
+
+from typing import Optional
+from uuid import UUID
+
+from core.cache import LRUTTLCache
+from core.config import app_config
+from core.enums import IncidentSource
+from schemas.incident import IncidentCreate
+
+
+# Заголовок запроса с ключом и заголовок ответа на повтор
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+IDEMPOTENT_REPLAY_HEADER = "Idempotent-Replayed"
+
+
+class IdempotencyKeyConflictError(Exception):
+    """Ключ идемпотентности уже использован для другого запроса"""
+
+    def __init__(self, key: str, reason: str):
+        self.key = key
+        super().__init__(f"Idempotency key {key!r} {reason}")
+
+
+def check_replay(incident_data: IncidentCreate, incident) -> None:
+    """Повтор должен совпадать с исходным запросом.
+
+    Ключ уникален в пределах источника, поэтому сравнивается только описание.
+    """
+    if incident.description != incident_data.description:
+        raise IdempotencyKeyConflictError(
+            incident_data.idempotency_key, "was already used with a different description"
+        )
+
+
+class RecentIdempotencyKeys:
+    """Недавно использованные ключи -> id инцидента в памяти процесса.
+
+    Повтор с известным ключом получает исходный инцидент (обычно из кэша
+    инцидентов) без транзакции записи. Промах ничего не доказывает:
+    окончательно ключ проверяет первичный ключ таблицы в БД.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self._keys: LRUTTLCache[tuple[str, str], UUID] = LRUTTLCache(max_size, ttl_seconds)
+
+    def get(self, source: IncidentSource, key: str) -> Optional[UUID]:
+        return self._keys.get((source.value, key))
+
+    def add(self, source: IncidentSource, key: str, incident_id: UUID) -> None:
+        """Запомнить ключ; вызывать только после коммита"""
+        self._keys.set((source.value, key), incident_id)
+
+    def stats(self) -> dict:
+        return self._keys.stats()
+
+
+recent_idempotency_keys = RecentIdempotencyKeys(
+    app_config.IDEMPOTENCY_RECENT_KEYS_SIZE, app_config.IDEMPOTENCY_RECENT_KEYS_TTL_SECONDS
+)
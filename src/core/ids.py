@@ -0,0 +1,36 @@
+"""
+Идентификаторы инцидентов: UUIDv7 (RFC 9562) со временем создания в старших 48 битах
+"""
+
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from uuid import UUID
+
+
+# Насколько created_at (время начала транзакции по часам БД) может отличаться
+# от времени в id (часы приложения): с запасом на долгие транзакции и
+# расхождение часов. Окно в два дня задевает не больше двух помесячных партиций
+ID_TIME_TOLERANCE = timedelta(days=1)
+
+
+def uuid7(now: Optional[float] = None) -> UUID:
+    """UUIDv7: миллисекунды Unix-времени, затем 74 случайных бита"""
+    milliseconds = int((time.time() if now is None else now) * 1000) & ((1 << 48) - 1)
+    random_bits = int.from_bytes(os.urandom(10), "big")
+    value = (
+        milliseconds << 80
+        | 0x7 << 76
+        | (random_bits >> 68) << 64
+        | 0b10 << 62
+        | random_bits & ((1 << 62) - 1)
+    )
+    return UUID(int=value)
+
+
+def uuid7_time(value: UUID) -> Optional[datetime]:
+    """Время создания из UUIDv7 (наивное UTC, как created_at); None для других версий"""
+    if value.version != 7:
+        return None
+    return datetime.fromtimestamp((value.int >> 80) / 1000, tz=timezone.utc).replace(tzinfo=None)
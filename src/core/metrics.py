@@ -0,0 +1,174 @@
+"""
+Метрики Prometheus: задержки HTTP, запросы к БД, пул соединений, Unit of Work
+
+При нескольких воркерах каждый процесс пишет значения в файлы каталога
+PROMETHEUS_MULTIPROC_DIR (переменная окружения задается до запуска, каталог
+очищается перед стартом), а /metrics любого воркера собирает их все.
+"""
+
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+METRICS_CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+# Метка маршрута для запросов, не попавших ни в один маршрут (404):
+# произвольные пути не должны порождать новые временные ряды
+UNMATCHED_ROUTE = "unmatched"
+
+# Метка вида запроса к БД; остальные (SET, SHOW, LOCK, ...) - OTHER
+DB_OPERATIONS = frozenset({"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "BEGIN", "COMMIT", "ROLLBACK"})
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template and status code",
+    ["method", "route", "status"],
+)
+db_query_duration = Histogram(
+    "db_query_duration_seconds",
+    "Database statement execution time",
+    ["engine", "operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+db_query_rows = Histogram(
+    "db_query_rows",
+    "Rows returned or affected by a database statement",
+    ["engine", "operation"],
+    buckets=(0, 1, 10, 100, 1000, 10000, 100000),
+)
+db_pool_checkout_wait = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time to obtain a connection from the pool",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+db_pool_checkout_timeouts = Counter(
+    "db_pool_checkout_timeouts_total", "Pool checkouts that gave up after pool_timeout"
+)
+db_pool_in_use = Gauge(
+    "db_pool_connections_in_use",
+    "Connections checked out of the pool",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+db_pool_overflow = Gauge(
+    "db_pool_overflow_connections",
+    "Connections opened above pool size",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+# kind: write - обычные транзакции, read - транзакции только для чтения
+uow_commits = Counter("uow_commits_total", "Units of work completed successfully", ["kind"])
+uow_rollbacks = Counter("uow_rollbacks_total", "Units of work rolled back after an error", ["kind"])
+
+
+def is_multiprocess() -> bool:
+    return "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+
+def render_metrics() -> bytes:
+    """Метрики в текстовом формате Prometheus (по всем воркерам)"""
+    if is_multiprocess():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def mark_process_dead() -> None:
+    """Убрать значения livesum-метрик завершающегося воркера"""
+    if is_multiprocess():
+        multiprocess.mark_process_dead(os.getpid())
+
+
+def statement_operation(statement: str) -> str:
+    words = statement.lstrip().split(None, 1)
+    operation = words[0].upper() if words else ""
+    return operation if operation in DB_OPERATIONS else "OTHER"
+
+
+def instrument_engine(engine: AsyncEngine, name: str) -> None:
+    """Подписаться на события движка: время и число строк запросов, занятость пула"""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+        operation = statement_operation(statement)
+        db_query_duration.labels(name, operation).observe(elapsed)
+        # -1 - драйвер не знает числа строк (серверный курсор)
+        if cursor.rowcount >= 0:
+            db_query_rows.labels(name, operation).observe(cursor.rowcount)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(exception_context):
+        # Неудачный запрос не доходит до after_cursor_execute
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_start_time"):
+            connection.info["query_start_time"].pop()
+
+    in_use = db_pool_in_use.labels(name)
+    overflow = db_pool_overflow.labels(name)
+
+    # checkin вызывается до возврата соединения в пул, поэтому занятость
+    # считается приращениями, а не по pool.checkedout()
+    @event.listens_for(sync_engine, "checkout")
+    def on_checkout(*_):
+        in_use.inc()
+        overflow.set(max(sync_engine.pool.overflow(), 0))
+
+    @event.listens_for(sync_engine, "checkin")
+    def on_checkin(*_):
+        in_use.dec()
+        overflow.set(max(sync_engine.pool.overflow(), 0))
+
+
+class MetricsMiddleware:
+    """ASGI middleware: гистограмма задержек по шаблону маршрута и коду ответа.
+
+    Время считается до конца отправки ответа, поэтому потоковые выгрузки
+    учитываются целиком. Отказы контроля допуска до маршрутизации
+    попадают в метрику с маршрутом unmatched.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Маршрут FastAPI кладет в scope при сопоставлении
+            route = scope.get("route")
+            http_request_duration.labels(
+                scope["method"], getattr(route, "path", UNMATCHED_ROUTE), str(status)
+            ).observe(time.perf_counter() - start)
@@ -0,0 +1,69 @@
+"""
+Непрозрачные курсоры для keyset-пагинации
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from uuid import UUID
+
+
+DEFAULT_PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = 500
+
+
+class InvalidCursorError(ValueError):
+    """Исключение для некорректного или поврежденного курсора"""
+
+    def __init__(self, cursor: str):
+        self.cursor = cursor
+        super().__init__(f"Invalid pagination cursor: {cursor!r}")
+
+
+def _encode(payload: list) -> str:
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _decode(cursor: str) -> list:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        raise InvalidCursorError(cursor)
+    if not isinstance(payload, list):
+        raise InvalidCursorError(cursor)
+    return payload
+
+
+def encode_cursor(created_at: datetime, incident_id: UUID) -> str:
+    """Закодировать позицию (created_at, id) последнего элемента страницы"""
+    return _encode([created_at.isoformat(), str(incident_id)])
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    """Раскодировать курсор в пару (created_at, id)"""
+    payload = _decode(cursor)
+    try:
+        created_at, incident_id = payload
+        return datetime.fromisoformat(created_at), UUID(incident_id)
+    except (TypeError, ValueError):
+        raise InvalidCursorError(cursor)
+
+
+def encode_search_cursor(rank: float, incident_id: UUID) -> str:
+    """Закодировать позицию (rank, id) последнего результата поиска"""
+    return _encode([rank, str(incident_id)])
+
+
+def decode_search_cursor(cursor: str) -> tuple[float, UUID]:
+    """Раскодировать курсор поиска в пару (rank, id)"""
+    payload = _decode(cursor)
+    try:
+        rank, incident_id = payload
+        if isinstance(rank, bool) or not isinstance(rank, (int, float)):
+            raise TypeError(rank)
+        return float(rank), UUID(incident_id)
+    except (TypeError, ValueError):
+        raise InvalidCursorError(cursor)
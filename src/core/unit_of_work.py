@@ -1,6 +1,8 @@
 from abc import ABC, abstractmethod
-from typing import AsyncContextManager
+from contextlib import asynccontextmanager
+from typing import AsyncContextManager, AsyncIterator
 from sqlalchemy.ext.asyncio import AsyncSession
+from core.metrics import uow_commits, uow_rollbacks
 from repositories.abstract_incident import AbstractIncidentRepository
 
 
@@ -30,13 +32,27 @@ class AbstractUnitOfWork(ABC):
 class SQLAlchemyUnitOfWork(AbstractUnitOfWork):
     """Реализация Unit of Work для SQLAlchemy"""
 
+    # Карантин заполнения кэша (см. CachedIncidentRepository)
+    cache_fill_quarantine = 0.0
+    # Метка счетчиков коммитов и откатов
+    kind = "write"
+
     def __init__(self, session: AsyncSession):
         self.session = session
 
     async def __aenter__(self):
+        from core.cache import incident_cache
+        from core.events import incident_events
+        from repositories.cached_incident import CachedIncidentRepository
         from repositories.incident import IncidentRepository
 
+        self._cache = incident_cache
+        self._events = incident_events
         self.incidents = IncidentRepository(self.session)
+        if self._cache is not None:
+            self.incidents = CachedIncidentRepository(
+                self.incidents, self._cache, self.cache_fill_quarantine
+            )
         return await super().__aenter__()
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
@@ -44,8 +60,122 @@ class SQLAlchemyUnitOfWork(AbstractUnitOfWork):
 
     async def commit(self):
         """Коммит транзакции"""
+        if self.incidents.stats_deltas:
+            # Счетчики меняются в той же транзакции, что и сами инциденты
+            await self.incidents.apply_stats_deltas()
+        changed_ids = set(self.incidents.changed_ids)
+        events = list(self.incidents.events)
+        self.incidents.events.clear()
+        if events:
+            # Журнал статусов и агрегаты MTTR пишутся в той же транзакции
+            await self.incidents.record_status_history(events)
+            await self._events.publish(self.session, events)
+        if changed_ids and self._cache is not None:
+            # NOTIFY внутри транзакции доставляется другим воркерам только после коммита
+            await self._cache.publish(self.session, changed_ids)
+        if changed_ids or self.incidents.created_ids:
+            # Версия коллекции (ETag списков) фиксируется вместе с данными:
+            # читатель видит либо старые данные со старой версией, либо новые с новой.
+            # Запрос последний перед коммитом: блокировка шарда счетчика держится недолго
+            await self.incidents.bump_collection_version()
         await self.session.commit()
+        if changed_ids and self._cache is not None:
+            # Повторная инвалидация убирает значения, прочитанные до коммита
+            self._cache.invalidate(changed_ids)
+        if events:
+            self._events.after_commit(events)
+        self.incidents.changed_ids.clear()
+        self.incidents.created_ids.clear()
+        uow_commits.labels(self.kind).inc()
 
     async def rollback(self):
         """Откат транзакции"""
+        await self._discard()
+        uow_rollbacks.labels(self.kind).inc()
+
+    async def _discard(self):
         await self.session.rollback()
+        self.incidents.changed_ids.clear()
+        self.incidents.created_ids.clear()
+        self.incidents.stats_deltas.clear()
+        self.incidents.events.clear()
+
+
+class ReadOnlySQLAlchemyUnitOfWork(SQLAlchemyUnitOfWork):
+    """Unit of Work только для чтения (в том числе с реплики).
+
+    Транзакция открывается как BEGIN READ ONLY, а вместо коммита
+    откатывается: записывать нечего, а случайная запись завершится ошибкой.
+    """
+
+    kind = "read"
+
+    def __init__(self, session: AsyncSession, replica: bool = False):
+        super().__init__(session)
+        if replica:
+            # Реплика отстает: не возвращать в кэш только что измененные инциденты
+            from core.config import app_config
+
+            self.cache_fill_quarantine = app_config.DATABASE_REPLICA_MAX_LAG_SECONDS
+
+    async def __aenter__(self):
+        uow = await super().__aenter__()
+        await self.session.connection(execution_options={"postgresql_readonly": True})
+        return uow
+
+    async def commit(self):
+        """Завершить транзакцию чтения"""
+        await self._discard()
+        uow_commits.labels(self.kind).inc()
+
+
+class InMemoryUnitOfWork(AbstractUnitOfWork):
+    """Unit of Work над InMemoryIncidentRepository (тесты, бенчмарки, один процесс без БД).
+
+    Транзакцией служит журнал отмены репозитория. Журнал у репозитория
+    один, поэтому одновременно открытым может быть только один Unit of Work.
+    """
+
+    kind = "write"
+
+    def __init__(self, incidents=None):
+        from repositories.memory_incident import InMemoryIncidentRepository
+
+        self.incidents = incidents if incidents is not None else InMemoryIncidentRepository()
+
+    async def __aenter__(self):
+        self.incidents.begin()
+        return await super().__aenter__()
+
+    async def commit(self):
+        """Коммит транзакции"""
+        if self.incidents.stats_deltas:
+            await self.incidents.apply_stats_deltas()
+        events = list(self.incidents.events)
+        self.incidents.events.clear()
+        if events:
+            await self.incidents.record_status_history(events)
+        self.incidents.commit_changes()
+        if self.incidents.changed_ids or self.incidents.created_ids:
+            await self.incidents.bump_collection_version()
+        self.incidents.changed_ids.clear()
+        self.incidents.created_ids.clear()
+        uow_commits.labels(self.kind).inc()
+
+    async def rollback(self):
+        """Откат транзакции"""
+        self.incidents.rollback_changes()
+        self.incidents.changed_ids.clear()
+        self.incidents.created_ids.clear()
+        self.incidents.stats_deltas.clear()
+        self.incidents.events.clear()
+        uow_rollbacks.labels(self.kind).inc()
+
+
+@asynccontextmanager
+async def primary_uow() -> AsyncIterator[SQLAlchemyUnitOfWork]:
+    """Unit of Work на отдельной сессии primary (вне HTTP-запроса)"""
+    from db.session import async_session
+
+    async with async_session() as session:
+        yield SQLAlchemyUnitOfWork(session)
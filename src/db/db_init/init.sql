@@ -1,6 +1,7 @@
 SELECT 'CREATE DATABASE incidents_db'
 WHERE NOT EXISTS (SELECT FROM pg_database WHERE datname = 'incidents_db')\gexec
 \c incidents_db;
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
 DO $$
 BEGIN
 	IF NOT EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'backend') THEN
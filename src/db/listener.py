@@ -0,0 +1,105 @@
+"""
+Выделенное соединение asyncpg для LISTEN/NOTIFY
+"""
+
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Callable, Optional
+
+import asyncpg
+
+from core.config import app_config
+
+
+logger = logging.getLogger(__name__)
+
+
+class PostgresListener:
+    """Одно соединение на процесс, подписанное на несколько каналов NOTIFY.
+
+    Соединение не берется из пула движка: LISTEN должен жить все время работы
+    приложения. За PgBouncer в режиме transaction pooling оно открывается
+    напрямую к PostgreSQL (DATABASE_LISTENER_URL). При обрыве соединение восстанавливается, а подписчики получают
+    уведомление on_reconnect - уведомления за время обрыва потеряны.
+    """
+
+    def __init__(self, dsn: str, reconnect_delay: float = 1.0, max_reconnect_delay: float = 30.0):
+        self._dsn = dsn
+        self._reconnect_delay = reconnect_delay
+        self._max_reconnect_delay = max_reconnect_delay
+        self._callbacks: dict[str, list[Callable[[str], None]]] = defaultdict(list)
+        self._reconnect_callbacks: list[Callable[[], None]] = []
+        self._connection: Optional[asyncpg.Connection] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._stopped = True
+
+    def add_listener(
+        self,
+        channel: str,
+        callback: Callable[[str], None],
+        on_reconnect: Optional[Callable[[], None]] = None,
+    ) -> None:
+        """Подписать callback на канал (до или после запуска)"""
+        self._callbacks[channel].append(callback)
+        if on_reconnect:
+            self._reconnect_callbacks.append(on_reconnect)
+        if self._connection is not None and len(self._callbacks[channel]) == 1:
+            asyncio.get_running_loop().create_task(
+                self._connection.add_listener(channel, self._dispatch)
+            )
+
+    @property
+    def has_listeners(self) -> bool:
+        return bool(self._callbacks)
+
+    async def start(self) -> None:
+        """Открыть соединение и подписаться на все каналы"""
+        self._stopped = False
+        await self._connect()
+
+    async def stop(self) -> None:
+        """Закрыть соединение"""
+        self._stopped = True
+        if self._reconnect_task:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            await connection.close()
+
+    async def _connect(self) -> None:
+        connection = await asyncpg.connect(self._dsn)
+        for channel in self._callbacks:
+            await connection.add_listener(channel, self._dispatch)
+        connection.add_termination_listener(self._on_termination)
+        self._connection = connection
+
+    def _dispatch(self, connection, pid: int, channel: str, payload: str) -> None:
+        for callback in self._callbacks.get(channel, []):
+            try:
+                callback(payload)
+            except Exception:
+                logger.exception("NOTIFY callback failed for channel %s", channel)
+
+    def _on_termination(self, connection) -> None:
+        self._connection = None
+        if not self._stopped and self._reconnect_task is None:
+            self._reconnect_task = asyncio.get_running_loop().create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        delay = self._reconnect_delay
+        while not self._stopped:
+            try:
+                await self._connect()
+                break
+            except (OSError, asyncpg.PostgresError):
+                logger.warning("LISTEN connection lost, retrying in %.1fs", delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self._max_reconnect_delay)
+        self._reconnect_task = None
+        for callback in self._reconnect_callbacks:
+            callback()
+
+
+pg_listener = PostgresListener(app_config.get_listener_dsn())
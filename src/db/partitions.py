@@ -0,0 +1,167 @@
+"""
+Помесячные партиции таблицы incidents (RANGE по created_at)
+"""
+
+import logging
+import re
+from datetime import date, datetime
+from typing import NamedTuple, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from core.enums import FINAL_STATUSES
+
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLE = "incidents"
+# Сюда попадают строки, для месяца которых еще нет партиции
+DEFAULT_PARTITION = f"{PARTITIONED_TABLE}_default"
+# Колонки, которые переносятся из DEFAULT-партиции (search_vector вычисляется заново)
+PARTITION_COLUMNS = "id, description, status, source, created_at, version"
+
+# FOR VALUES FROM ('2025-11-01 00:00:00') TO ('2025-12-01 00:00:00')
+_BOUND_RE = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+class Partition(NamedTuple):
+    name: str
+    # Границы created_at: [start, end)
+    start: date
+    end: date
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """Имя партиции месяца: incidents_2025_11"""
+    return f"{PARTITIONED_TABLE}_{month:%Y_%m}"
+
+
+def parse_partition_bound(bound: str) -> Optional[tuple[date, date]]:
+    """Границы партиции из pg_get_expr(relpartbound); None - DEFAULT-партиция"""
+    match = _BOUND_RE.search(bound)
+    if match is None:
+        return None
+    start, end = (datetime.fromisoformat(value).date() for value in match.groups())
+    return start, end
+
+
+def missing_months(partitions: list[Partition], today: date, months_ahead: int) -> list[date]:
+    """Месяцы от текущего до months_ahead вперед, для которых еще нет партиции"""
+    existing = {partition.start for partition in partitions}
+    current = month_start(today)
+    months = (add_months(current, offset) for offset in range(months_ahead + 1))
+    return [month for month in months if month not in existing]
+
+
+def expired_partitions(partitions: list[Partition], today: date, retention_months: int) -> list[Partition]:
+    """Партиции, целиком лежащие раньше, чем retention_months месяцев назад"""
+    boundary = add_months(month_start(today), -retention_months)
+    return [partition for partition in partitions if partition.end <= boundary]
+
+
+async def list_partitions(connection: AsyncConnection) -> list[Partition]:
+    """Партиции incidents по возрастанию границ"""
+    result = await connection.execute(
+        text(
+            """
+            SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = CAST(:table AS regclass)
+            """
+        ),
+        {"table": PARTITIONED_TABLE},
+    )
+    partitions = []
+    for name, bound in result.all():
+        bounds = parse_partition_bound(bound)
+        if bounds is not None:
+            partitions.append(Partition(name, *bounds))
+    return sorted(partitions, key=lambda partition: partition.start)
+
+
+async def create_partition(connection: AsyncConnection, month: date) -> str:
+    """Создать партицию месяца (индексы наследуются от секционированной таблицы).
+
+    Если в DEFAULT-партицию уже попали строки этого месяца, PostgreSQL не даст
+    создать партицию поверх них: строки переносятся в новую таблицу, и только
+    потом она присоединяется. Вызывается внутри транзакции.
+    """
+    name = partition_name(month)
+    bounds = f"FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    in_month = f"created_at >= '{month.isoformat()}' AND created_at < '{add_months(month, 1).isoformat()}'"
+    # Блокировка не дает вставить строки месяца в DEFAULT между проверкой и присоединением
+    await connection.execute(text(f"LOCK TABLE {DEFAULT_PARTITION} IN SHARE ROW EXCLUSIVE MODE"))
+    stranded = await connection.scalar(text(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_month})"))
+    if not stranded:
+        await connection.execute(
+            text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARTITIONED_TABLE} FOR VALUES {bounds}")
+        )
+        return name
+    logger.warning("Moving rows of %s out of %s", name, DEFAULT_PARTITION)
+    await connection.execute(text(f"CREATE TABLE {name} (LIKE {PARTITIONED_TABLE} INCLUDING DEFAULTS INCLUDING GENERATED)"))
+    await connection.execute(
+        text(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE {in_month} RETURNING {PARTITION_COLUMNS}) "
+            f"INSERT INTO {name} ({PARTITION_COLUMNS}) SELECT {PARTITION_COLUMNS} FROM moved"
+        )
+    )
+    await connection.execute(text(f"ALTER TABLE {PARTITIONED_TABLE} ATTACH PARTITION {name} FOR VALUES {bounds}"))
+    return name
+
+
+async def ensure_partitions(engine: AsyncEngine, months_ahead: int, today: Optional[date] = None) -> list[str]:
+    """Заранее создать партиции на months_ahead месяцев вперед"""
+    today = today or date.today()
+    async with engine.begin() as connection:
+        months = missing_months(await list_partitions(connection), today, months_ahead)
+        return [await create_partition(connection, month) for month in months]
+
+
+async def detach_expired_partitions(
+    engine: AsyncEngine, retention_months: int, today: Optional[date] = None
+) -> list[str]:
+    """Отсоединить партиции старше retention_months месяцев.
+
+    Отсоединенная партиция остается обычной таблицей с тем же именем. DETACH
+    CONCURRENTLY не блокирует запросы к incidents, но не может выполняться
+    в транзакции. Партиции с нефинальными инцидентами пропускаются: они
+    пропали бы из API вместе с партицией.
+    """
+    today = today or date.today()
+    async with engine.connect() as connection:
+        partitions = expired_partitions(await list_partitions(connection), today, retention_months)
+    detached = []
+    final_statuses = ", ".join(f"'{status.value}'" for status in FINAL_STATUSES)
+    for partition in partitions:
+        async with engine.connect() as connection:
+            active = await connection.scalar(
+                text(f"SELECT EXISTS (SELECT 1 FROM {partition.name} WHERE status NOT IN ({final_statuses}))")
+            )
+            if active:
+                logger.warning("Partition %s still has active incidents, not detaching", partition.name)
+                continue
+            autocommit = await connection.execution_options(isolation_level="AUTOCOMMIT")
+            await autocommit.execute(
+                text(f"ALTER TABLE {PARTITIONED_TABLE} DETACH PARTITION {partition.name} CONCURRENTLY")
+            )
+        async with engine.begin() as connection:
+            # Ключи идемпотентности ссылаются на инциденты, которых больше нет в incidents
+            await connection.execute(
+                text(
+                    f"DELETE FROM incident_idempotency_keys keys USING {partition.name} detached "
+                    "WHERE keys.incident_id = detached.id"
+                )
+            )
+        detached.append(partition.name)
+    return detached
@@ -0,0 +1,84 @@
+"""
+Пул соединений с замером времени ожидания выдачи соединения
+"""
+
+import bisect
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from core.metrics import db_pool_checkout_timeouts, db_pool_checkout_wait
+
+
+class CheckoutWaitStats:
+    """Гистограмма времени получения соединения из пула"""
+
+    BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.timeouts = 0
+        # Последний элемент - ожидания дольше самой большой границы
+        self.bucket_counts = [0] * (len(self.BUCKETS) + 1)
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.bucket_counts[bisect.bisect_left(self.BUCKETS, seconds)] += 1
+
+    def snapshot(self) -> dict:
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip((*self.BUCKETS, float("inf")), self.bucket_counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {
+            "count": self.count,
+            "total_seconds": self.total_seconds,
+            "avg_seconds": self.total_seconds / self.count if self.count else 0.0,
+            "max_seconds": self.max_seconds,
+            "timeouts": self.timeouts,
+            "buckets": buckets,
+        }
+
+
+checkout_wait_stats = CheckoutWaitStats()
+
+
+class TimedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool, который учитывает время выдачи соединения.
+
+    В замер входит ожидание свободного соединения, открытие нового соединения
+    в пределах max_overflow и pre-ping - все, что видит вызывающий код.
+    """
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            checkout_wait_stats.timeouts += 1
+            db_pool_checkout_timeouts.inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            checkout_wait_stats.observe(elapsed)
+            db_pool_checkout_wait.observe(elapsed)
+
+    def usage(self) -> dict:
+        """Текущее использование пула"""
+        return {
+            "size": self.size(),
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": self.overflow(),
+            "max_overflow": self._max_overflow,
+            "timeout_seconds": self.timeout(),
+        }
@@ -1,5 +1,5 @@
 """
-Конфигурация базы данных и сессий SQLAlchemy для development режима
+Конфигурация базы данных и сессий SQLAlchemy
 """
 
 import os
@@ -9,27 +9,52 @@ from sqlalchemy.orm import declarative_base
 from contextvars import ContextVar
 from typing import AsyncGenerator
 from core.config import app_config
+from core.metrics import instrument_engine
+from db.pool import TimedAsyncAdaptedQueuePool
+from db.slow_queries import slow_query_recorder
 
 DATABASE_URL = app_config.DATABASE_URL
 POSTGRES_SCHEMA = app_config.POSTGRES_SCHEMA
 
-# Создание движка базы данных для development
+# Создание движка базы данных; размеры пула и прочее задаются профилем в Settings
 engine = create_async_engine(
     DATABASE_URL,
-    echo=True,
-    pool_pre_ping=True,  # Проверка соединения перед использованием
-    pool_size=5,  # Меньший размер пула для dev
-    max_overflow=10,  # Меньше дополнительных соединений для dev
-    pool_timeout=30,  # Таймаут ожидания соединения
-    pool_recycle=3600,  # Переиспользование соединений (1 час)
+    poolclass=TimedAsyncAdaptedQueuePool,  # Пул с замером времени ожидания соединения
+    **app_config.get_engine_config(),
 )
 
+instrument_engine(engine, "primary")
+if slow_query_recorder is not None:
+    slow_query_recorder.instrument(engine, "primary")
+
 async_session = async_sessionmaker(
     bind=engine,
     expire_on_commit=False,
     class_=AsyncSession,
 )
 
+# Движок реплики для чтения; без реплики чтения идут в primary
+replica_engine = (
+    create_async_engine(
+        app_config.DATABASE_REPLICA_URL,
+        poolclass=TimedAsyncAdaptedQueuePool,
+        **app_config.get_engine_config(),
+    )
+    if app_config.DATABASE_REPLICA_URL
+    else engine
+)
+
+if replica_engine is not engine:
+    instrument_engine(replica_engine, "replica")
+    if slow_query_recorder is not None:
+        slow_query_recorder.instrument(replica_engine, "replica")
+
+replica_session = async_sessionmaker(
+    bind=replica_engine,
+    expire_on_commit=False,
+    class_=AsyncSession,
+)
+
 async def get_async_session():
     async with async_session() as session:
         yield session
@@ -0,0 +1,294 @@
+"""
+Журнал медленных запросов с фоновым EXPLAIN (ANALYZE, BUFFERS)
+"""
+
+import asyncio
+import logging
+import random
+import re
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+import greenlet
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from core.config import app_config
+
+
+logger = logging.getLogger(__name__)
+
+# Опция выполнения, которой помечаются собственные запросы журнала (EXPLAIN)
+SLOW_QUERY_IGNORE_OPTION = "slow_query_ignore"
+
+_WHITESPACE_RE = re.compile(r"\s+")
+# Списки плейсхолдеров IN ($1, $2, ...) разной длины - один и тот же запрос
+_PLACEHOLDER_LIST_RE = re.compile(r"\$\d+(?:\s*,\s*\$\d+)+")
+_PLACEHOLDER_RE = re.compile(r"\$\d+")
+_STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL_RE = re.compile(r"(?<![\w$])\d+(?:\.\d+)?\b")
+
+
+def normalize_sql(statement: str) -> str:
+    """SQL без значений: одинаковые по форме запросы дают одну строку"""
+    normalized = _WHITESPACE_RE.sub(" ", statement).strip()
+    normalized = _STRING_LITERAL_RE.sub("?", normalized)
+    normalized = _PLACEHOLDER_LIST_RE.sub("?, ...", normalized)
+    normalized = _PLACEHOLDER_RE.sub("?", normalized)
+    return _NUMBER_LITERAL_RE.sub("?", normalized)
+
+
+def parameters_shape(parameters: Any, executemany: bool = False) -> str:
+    """Типы параметров без значений: значения могут содержать персональные данные"""
+    if executemany:
+        rows = list(parameters or ())
+        return f"{len(rows)} x {parameters_shape(rows[0]) if rows else '()'}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in parameters.items()) + "}"
+    return "(" + ", ".join(type(value).__name__ for value in parameters or ()) + ")"
+
+
+def find_caller(module_prefix: str = "repositories.") -> Optional[str]:
+    """Метод репозитория, выполнивший запрос.
+
+    Синхронная часть SQLAlchemy работает в дочернем greenlet, а корутины
+    репозитория ждут в родительском, поэтому стек просматривается по цепочке
+    greenlet'ов.
+    """
+    frame = sys._getframe()
+    current = greenlet.getcurrent()
+    while True:
+        while frame is not None:
+            module = frame.f_globals.get("__name__", "")
+            if module.startswith(module_prefix):
+                return f"{module}:{frame.f_code.co_qualname}"
+            frame = frame.f_back
+        current = current.parent
+        if current is None:
+            return None
+        frame = current.gr_frame
+
+
+class SlowQuery:
+    """Медленный запрос одной формы: статистика и последний план"""
+
+    __slots__ = (
+        "sql", "count", "total_seconds", "max_seconds", "last_seen", "parameters",
+        "caller", "engine", "plan", "plan_seconds", "explained_at", "explain_error",
+    )
+
+    def __init__(self, sql: str, engine: str):
+        self.sql = sql
+        self.engine = engine
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.last_seen = 0.0
+        self.parameters = ""
+        self.caller: Optional[str] = None
+        self.plan: Optional[str] = None
+        self.plan_seconds: Optional[float] = None
+        self.explained_at: Optional[float] = None
+        self.explain_error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "sql": self.sql,
+            "engine": self.engine,
+            "count": self.count,
+            "total_seconds": self.total_seconds,
+            "avg_seconds": self.total_seconds / self.count,
+            "max_seconds": self.max_seconds,
+            "last_seen": self.last_seen,
+            "parameters": self.parameters,
+            "caller": self.caller,
+            "plan": self.plan,
+            "plan_seconds": self.plan_seconds,
+            "explained_at": self.explained_at,
+            "explain_error": self.explain_error,
+        }
+
+
+class SlowQueryRecorder:
+    """Собирает запросы дольше threshold_seconds по событиям движка.
+
+    Хранится не более max_statements форм запросов (LRU). Для доли
+    explain_sample_rate медленных SELECT фоновая задача выполняет
+    EXPLAIN (ANALYZE, BUFFERS) с теми же параметрами в транзакции только
+    для чтения, не чаще раза в explain_interval_seconds для одной формы.
+    """
+
+    def __init__(
+        self,
+        threshold_seconds: float,
+        max_statements: int,
+        explain_sample_rate: float,
+        explain_interval_seconds: float,
+        explain_timeout_seconds: float,
+        explain_queue_size: int = 100,
+        clock: Callable[[], float] = time.time,
+        sample: Callable[[], float] = random.random,
+    ):
+        self._threshold = threshold_seconds
+        self._max_statements = max_statements
+        self._sample_rate = explain_sample_rate
+        self._explain_interval = explain_interval_seconds
+        self._explain_timeout = explain_timeout_seconds
+        self._clock = clock
+        self._sample = sample
+        self._statements: OrderedDict[str, SlowQuery] = OrderedDict()
+        self._engines: dict[str, AsyncEngine] = {}
+        self._explain_queue: asyncio.Queue[tuple[SlowQuery, str, Any]] = asyncio.Queue(explain_queue_size)
+        self._pending: set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+        self.recorded = 0
+        self.explained = 0
+        self.explain_dropped = 0
+
+    def instrument(self, engine: AsyncEngine, name: str) -> None:
+        """Подписаться на события движка"""
+        self._engines[name] = engine
+        sync_engine = engine.sync_engine
+
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("slow_query_start", []).append(time.perf_counter())
+
+        @event.listens_for(sync_engine, "after_cursor_execute")
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.perf_counter() - conn.info["slow_query_start"].pop()
+            if elapsed < self._threshold:
+                return
+            if context is not None and context.execution_options.get(SLOW_QUERY_IGNORE_OPTION):
+                return
+            self.record(name, statement, parameters, executemany, elapsed, find_caller())
+
+        @event.listens_for(sync_engine, "handle_error")
+        def handle_error(exception_context):
+            connection = exception_context.connection
+            if connection is not None and connection.info.get("slow_query_start"):
+                connection.info["slow_query_start"].pop()
+
+    def record(
+        self,
+        engine: str,
+        statement: str,
+        parameters: Any,
+        executemany: bool,
+        elapsed: float,
+        caller: Optional[str],
+    ) -> SlowQuery:
+        """Учесть медленный запрос"""
+        sql = normalize_sql(statement)
+        key = f"{engine}:{sql}"
+        entry = self._statements.get(key)
+        if entry is None:
+            entry = self._statements[key] = SlowQuery(sql, engine)
+            if len(self._statements) > self._max_statements:
+                self._statements.popitem(last=False)
+        else:
+            self._statements.move_to_end(key)
+        entry.count += 1
+        entry.total_seconds += elapsed
+        entry.max_seconds = max(entry.max_seconds, elapsed)
+        entry.last_seen = self._clock()
+        entry.parameters = parameters_shape(parameters, executemany)
+        entry.caller = caller
+        self.recorded += 1
+        if not executemany and self._should_explain(key, entry, statement):
+            try:
+                self._explain_queue.put_nowait((entry, statement, parameters))
+                self._pending.add(key)
+            except asyncio.QueueFull:
+                self.explain_dropped += 1
+        return entry
+
+    def _should_explain(self, key: str, entry: SlowQuery, statement: str) -> bool:
+        # EXPLAIN ANALYZE выполняет запрос, поэтому только чтение
+        if self._task is None or statement.lstrip()[:6].upper() != "SELECT":
+            return False
+        if key in self._pending:
+            return False
+        if entry.explained_at is not None and self._clock() - entry.explained_at < self._explain_interval:
+            return False
+        return self._sample() < self._sample_rate
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            entry, statement, parameters = await self._explain_queue.get()
+            try:
+                await self._explain(entry, statement, parameters)
+            except Exception as e:
+                entry.explain_error = str(e)
+                logger.warning("EXPLAIN of slow query failed: %s", e)
+            finally:
+                self._pending.discard(f"{entry.engine}:{entry.sql}")
+                self._explain_queue.task_done()
+
+    async def _explain(self, entry: SlowQuery, statement: str, parameters: Any) -> None:
+        engine = self._engines[entry.engine]
+        async with engine.connect() as connection:
+            connection = await connection.execution_options(
+                postgresql_readonly=True, **{SLOW_QUERY_IGNORE_OPTION: True}
+            )
+            await connection.exec_driver_sql(
+                f"SET LOCAL statement_timeout = {int(self._explain_timeout * 1000)}"
+            )
+            start = time.perf_counter()
+            result = await connection.exec_driver_sql(
+                f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters
+            )
+            plan = "\n".join(row[0] for row in result.all())
+            await connection.rollback()
+        entry.plan = plan
+        entry.plan_seconds = time.perf_counter() - start
+        entry.explained_at = self._clock()
+        entry.explain_error = None
+        self.explained += 1
+
+    def snapshot(self) -> dict:
+        statements = sorted(self._statements.values(), key=lambda entry: entry.total_seconds, reverse=True)
+        return {
+            "threshold_seconds": self._threshold,
+            "recorded": self.recorded,
+            "explained": self.explained,
+            "explain_dropped": self.explain_dropped,
+            "statements": [entry.to_dict() for entry in statements],
+        }
+
+    def reset(self) -> None:
+        self._statements.clear()
+        self.recorded = 0
+        self.explained = 0
+        self.explain_dropped = 0
+
+
+def build_slow_query_recorder() -> Optional[SlowQueryRecorder]:
+    """Создать журнал медленных запросов согласно настройкам"""
+    if not app_config.SLOW_QUERY_ENABLED:
+        return None
+    return SlowQueryRecorder(
+        threshold_seconds=app_config.SLOW_QUERY_THRESHOLD_SECONDS,
+        max_statements=app_config.SLOW_QUERY_MAX_STATEMENTS,
+        explain_sample_rate=app_config.SLOW_QUERY_EXPLAIN_SAMPLE_RATE,
+        explain_interval_seconds=app_config.SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS,
+        explain_timeout_seconds=app_config.SLOW_QUERY_EXPLAIN_TIMEOUT_SECONDS,
+    )
+
+
+slow_query_recorder = build_slow_query_recorder()
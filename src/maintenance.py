@@ -0,0 +1,109 @@
+"""
+Обслуживание базы данных (запуск по расписанию, из src):
+
+    python -m maintenance partitions [--months-ahead N] [--retention-months N]
+    python -m maintenance archive [--older-than-days N] [--batch-size N] [--pause-seconds S] [--max-batches N]
+    python -m maintenance stats
+"""
+
+import argparse
+import asyncio
+from datetime import timedelta
+
+from core.config import app_config
+from core.unit_of_work import primary_uow
+from db.partitions import detach_expired_partitions, ensure_partitions
+from db.session import engine
+from services.incident import IncidentService
+
+
+async def maintain_partitions(months_ahead: int, retention_months: int | None) -> None:
+    """Создать будущие партиции incidents и отсоединить устаревшие"""
+    created = await ensure_partitions(engine, months_ahead)
+    print(f"Created partitions: {', '.join(created) or 'none'}")
+    if retention_months is None:
+        return
+    detached = await detach_expired_partitions(engine, retention_months)
+    print(f"Detached partitions: {', '.join(detached) or 'none'}")
+    if detached:
+        # Инциденты отсоединенных партиций больше не видны: счетчики и версия
+        # коллекции (ETag списков) должны это учесть
+        async with primary_uow() as uow:
+            async with uow:
+                await uow.incidents.rebuild_incident_stats()
+                await uow.incidents.bump_collection_version()
+
+
+async def archive_incidents(
+    older_than_days: int, batch_size: int, pause_seconds: float, max_batches: int | None
+) -> None:
+    """Перенести закрытые инциденты старше older_than_days в архив пакетами"""
+    async with primary_uow() as uow:
+        result = await IncidentService(uow).archive_closed_incidents(
+            timedelta(days=older_than_days), batch_size, pause_seconds, max_batches
+        )
+    remaining = "" if result.done else ", candidates remain"
+    print(f"Archived incidents: {result.archived} in {result.batches} batches{remaining}")
+
+
+async def rebuild_stats() -> None:
+    """Пересчитать счетчики статистики инцидентов (без блокировки записи)"""
+    async with primary_uow() as uow:
+        stats = await IncidentService(uow).rebuild_incident_stats()
+    print(f"Incidents: {stats.total}")
+
+
+async def run(command) -> None:
+    try:
+        await command
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Incident database maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    partitions = commands.add_parser("partitions", help="Create future and detach expired incident partitions")
+    partitions.add_argument(
+        "--months-ahead", type=int, default=app_config.INCIDENT_PARTITION_MONTHS_AHEAD,
+        help="Monthly partitions to create in advance",
+    )
+    partitions.add_argument(
+        "--retention-months", type=int, default=app_config.INCIDENT_PARTITION_RETENTION_MONTHS,
+        help="Detach partitions older than this many months",
+    )
+
+    archive = commands.add_parser("archive", help="Move old resolved and cancelled incidents to the archive")
+    archive.add_argument(
+        "--older-than-days", type=int, default=app_config.INCIDENT_ARCHIVE_AGE_DAYS,
+        help="Archive incidents created earlier than this many days ago",
+    )
+    archive.add_argument(
+        "--batch-size", type=int, default=app_config.INCIDENT_ARCHIVE_BATCH_SIZE,
+        help="Incidents moved by one transaction",
+    )
+    archive.add_argument(
+        "--pause-seconds", type=float, default=app_config.INCIDENT_ARCHIVE_PAUSE_SECONDS,
+        help="Pause between batches",
+    )
+    archive.add_argument(
+        "--max-batches", type=int, default=None,
+        help="Stop after this many batches (the next run continues)",
+    )
+
+    commands.add_parser("stats", help="Rebuild incident statistics counters from the incidents themselves")
+
+    args = parser.parse_args()
+    if args.command == "partitions":
+        asyncio.run(run(maintain_partitions(args.months_ahead, args.retention_months)))
+    elif args.command == "archive":
+        asyncio.run(
+            run(archive_incidents(args.older_than_days, args.batch_size, args.pause_seconds, args.max_batches))
+        )
+    elif args.command == "stats":
+        asyncio.run(run(rebuild_stats()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+from sqlalchemy import UUID, Column, DateTime, Index, PrimaryKeyConstraint, String, func
+from db.session import Base
+
+
+class IncidentIdempotencyKey(Base):
+    """Ключ идемпотентности создания инцидента.
+
+    Ключ уникален в пределах источника: разные интеграции не мешают друг другу.
+    Строка удаляется вместе с инцидентом.
+    """
+
+    __tablename__ = "incident_idempotency_keys"
+
+    source = Column(String(50), nullable=False)
+    key = Column(String(255), nullable=False)
+    incident_id = Column(UUID(as_uuid=True), nullable=False)
+    created_at = Column(DateTime, nullable=False, server_default=func.localtimestamp())
+
+    __table_args__ = (
+        PrimaryKeyConstraint("source", "key"),
+        # Удаление ключа вместе с инцидентом
+        Index("ix_incident_idempotency_keys_incident_id", "incident_id"),
+    )
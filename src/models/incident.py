@@ -1,17 +1,75 @@
 import datetime
 from datetime import timezone
 from email.policy import default
-import uuid
-from sqlalchemy import UUID, Column, String, Text, DateTime, func
-from core.enums import IncidentStatus, IncidentSource
+from sqlalchemy import UUID, BigInteger, Column, Computed, Integer, String, Text, DateTime, Index, func
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred
+from core.enums import ACTIVE_STATUSES, IncidentStatus, IncidentSource
+from core.ids import uuid7
 from db.session import Base
 
 
+# Число строк-шардов счетчика изменений коллекции (как у incident_stats)
+COLLECTION_VERSION_SHARDS = 8
+
+# Конфигурация полнотекстового поиска: описания пишутся на разных языках,
+# поэтому без стемминга и стоп-слов
+SEARCH_CONFIG = "simple"
+
+
 class Incident(Base):
     __tablename__ = "incidents"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=lambda: uuid.uuid4())
+    # UUIDv7: по времени в id поиск отсекает партиции (см. repositories.incident.incident_key)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     description = Column(Text, nullable=False)
     status = Column(String(50), nullable=False, default=IncidentStatus.OPEN.value)
     source = Column(String(50), nullable=False, default=IncidentSource.OPERATOR.value)
-    created_at = Column(DateTime, nullable=False, default=func.now())
+    # Ключ секционирования входит в первичный ключ: этого требует PostgreSQL
+    created_at = Column(DateTime, primary_key=True, nullable=False, default=func.now())
+    # Версия инцидента, увеличивается при каждом изменении (используется в ETag)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # Вектор для полнотекстового поиска; вычисляется БД и не загружается вместе с инцидентом
+    search_vector = deferred(
+        Column(TSVECTOR, Computed(f"to_tsvector('{SEARCH_CONFIG}', description)", persisted=True))
+    )
+
+    __table_args__ = (
+        # Индекс для keyset-пагинации по (created_at, id)
+        Index("ix_incidents_created_at_id", "created_at", "id"),
+        # Фильтр по статусу с сортировкой по дате создания
+        Index("ix_incidents_status_created_at", "status", "created_at", "id"),
+        # Частичный индекс для выборок по активным инцидентам
+        Index(
+            "ix_incidents_active_created_at",
+            "created_at",
+            "id",
+            postgresql_where=status.in_([s.value for s in ACTIVE_STATUSES]),
+        ),
+        # Полнотекстовый поиск по описанию
+        Index("ix_incidents_search_vector", "search_vector", postgresql_using="gin"),
+        # Нечеткий поиск по триграммам (расширение pg_trgm)
+        Index(
+            "ix_incidents_description_trgm",
+            "description",
+            postgresql_using="gin",
+            postgresql_ops={"description": "gin_trgm_ops"},
+        ),
+        # Помесячные партиции создает maintenance.py partitions (см. db/partitions.py);
+        # строки месяцев без партиции попадают в incidents_default
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+
+class IncidentCollectionVersion(Base):
+    """Счетчик изменений коллекции инцидентов - версия для ETag списков.
+
+    Версия - сумма version по шардам. Каждая транзакция записи увеличивает
+    случайный шард в той же транзакции, поэтому версия видна вместе с
+    данными (в том числе на реплике) и не теряется при сбое после коммита.
+    """
+
+    __tablename__ = "incident_collection_version"
+
+    shard = Column(Integer, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
@@ -0,0 +1,20 @@
+from sqlalchemy import UUID, Column, DateTime, Integer, String, Text, func
+from db.session import Base
+
+
+class IncidentArchive(Base):
+    """Решенные и отмененные инциденты, перенесенные из incidents.
+
+    Таблица только для чтения по id: в ней нет поисковых индексов и она
+    не секционирована.
+    """
+
+    __tablename__ = "incidents_archive"
+
+    id = Column(UUID(as_uuid=True), primary_key=True)
+    description = Column(Text, nullable=False)
+    status = Column(String(50), nullable=False)
+    source = Column(String(50), nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    version = Column(Integer, nullable=False)
+    archived_at = Column(DateTime, nullable=False, server_default=func.localtimestamp())
@@ -0,0 +1,60 @@
+from sqlalchemy import UUID, BigInteger, Column, DateTime, Float, Index, String, func
+from core.enums import ACTIVE_STATUSES
+from db.session import Base
+
+
+class IncidentStatusHistory(Base):
+    """Журнал смен статусов (только добавление).
+
+    Внешнего ключа на incidents нет: журнал переживает удаление инцидента.
+    """
+
+    __tablename__ = "incident_status_history"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    incident_id = Column(UUID(as_uuid=True), nullable=False)
+    # NULL - создание инцидента
+    from_status = Column(String(50), nullable=True)
+    to_status = Column(String(50), nullable=False)
+    changed_at = Column(DateTime, nullable=False, server_default=func.localtimestamp())
+
+    __table_args__ = (
+        Index("ix_incident_status_history_incident_id_changed_at", "incident_id", "changed_at"),
+    )
+
+
+class IncidentLifecycle(Base):
+    """Агрегаты жизненного цикла инцидента, обновляемые при каждой смене статуса.
+
+    Время в статусе накапливается при выходе из него; время в текущем
+    статусе - от status_since до текущего момента.
+    """
+
+    __tablename__ = "incident_lifecycle"
+
+    incident_id = Column(UUID(as_uuid=True), primary_key=True)
+    source = Column(String(50), nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    status = Column(String(50), nullable=False)
+    status_since = Column(DateTime, nullable=False)
+    open_seconds = Column(Float, nullable=False, default=0.0, server_default="0")
+    in_progress_seconds = Column(Float, nullable=False, default=0.0, server_default="0")
+    waiting_seconds = Column(Float, nullable=False, default=0.0, server_default="0")
+    resolved_at = Column(DateTime, nullable=True)
+    # Время от создания до решения (для MTTR)
+    resolve_seconds = Column(Float, nullable=True)
+
+    __table_args__ = (
+        Index(
+            "ix_incident_lifecycle_source_resolved_at",
+            "source",
+            "resolved_at",
+            postgresql_where=resolved_at.isnot(None),
+        ),
+    )
+
+
+# Колонка накопленного времени для каждого нефинального статуса
+TIME_IN_STATUS_COLUMNS = {
+    status.value: getattr(IncidentLifecycle, f"{status.value}_seconds") for status in ACTIVE_STATUSES
+}
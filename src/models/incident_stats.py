@@ -0,0 +1,25 @@
+from sqlalchemy import BigInteger, Column, Integer, PrimaryKeyConstraint, String
+from db.session import Base
+
+
+# Число строк-шардов на каждую пару (status, source): конкурентные транзакции
+# обновляют случайный шард и реже ждут блокировку одной и той же строки
+STATS_SHARDS = 8
+
+
+class IncidentStats(Base):
+    """Счетчики инцидентов по статусу и источнику.
+
+    Количество для пары (status, source) - сумма count по всем шардам.
+    """
+
+    __tablename__ = "incident_stats"
+
+    status = Column(String(50), nullable=False)
+    source = Column(String(50), nullable=False)
+    shard = Column(Integer, nullable=False)
+    count = Column(BigInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        PrimaryKeyConstraint("status", "source", "shard"),
+    )
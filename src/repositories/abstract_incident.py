@@ -1,13 +1,56 @@
 from abc import ABC, abstractmethod
+from collections import Counter
+from datetime import datetime, timedelta
 from uuid import UUID
-from typing import Optional, List
+from typing import Any, AsyncIterator, NamedTuple, Optional, List, Sequence
 from models.incident import Incident
+from models.incident_archive import IncidentArchive
 from core.enums import IncidentStatus, IncidentSource
+from core.events import IncidentEvent
+from schemas.incident import IncidentCreate, IncidentFilter
+
+
+# Поля строк, которые быстрый путь чтения отдает вместо сущностей Incident
+INCIDENT_ROW_FIELDS = ("id", "description", "status", "source", "created_at", "version")
+
+
+class GuardedWriteResult(NamedTuple):
+    """Результат условной записи, проверяющей статус инцидента в том же запросе.
+
+    status_before is None - инцидент не найден;
+    applied is False при найденном инциденте - статус не удовлетворил условию.
+    """
+
+    status_before: Optional[IncidentStatus]
+    applied: bool
+    incident: Optional[Incident] = None
+
+
+class SourceMttr(NamedTuple):
+    """Время решения инцидентов одного источника (секунды)"""
+
+    source: str
+    resolved: int
+    p50: float
+    p90: float
+    p99: float
+    avg_open: float
+    avg_in_progress: float
+    avg_waiting: float
 
 
 class AbstractIncidentRepository(ABC):
     """Абстрактный интерфейс репозитория для работы с инцидентами"""
 
+    # id существующих инцидентов, измененных или удаленных в текущей транзакции
+    changed_ids: set[UUID]
+    # id инцидентов, созданных в текущей транзакции
+    created_ids: set[UUID]
+    # Изменения счетчиков по парам (status, source), еще не записанные в БД
+    stats_deltas: Counter[tuple[str, str]]
+    # События изменений текущей транзакции для ленты изменений
+    events: list[IncidentEvent]
+
     @abstractmethod
     async def get_incident_by_id(self, incident_id: UUID) -> Optional[Incident]:
         """Получить инцидент по ID"""
@@ -23,6 +66,50 @@ class AbstractIncidentRepository(ABC):
         """Получить инциденты по статусу"""
         raise NotImplementedError
 
+    @abstractmethod
+    async def get_incidents_page(
+        self,
+        limit: int,
+        after: Optional[tuple[datetime, UUID]] = None,
+        filters: Optional[IncidentFilter] = None,
+    ) -> List[Incident]:
+        """Получить страницу инцидентов, следующих за позицией (created_at, id)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_incident_row(self, incident_id: UUID, fields: Sequence[str]) -> Optional[Any]:
+        """Получить только поля fields инцидента (объект с этими атрибутами)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_incident_rows_page(
+        self,
+        limit: int,
+        after: Optional[tuple[datetime, UUID]] = None,
+        filters: Optional[IncidentFilter] = None,
+        fields: Sequence[str] = INCIDENT_ROW_FIELDS,
+    ) -> Sequence[tuple]:
+        """То же, что get_incidents_page, но именованные кортежи из колонок fields"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def search_incidents(
+        self,
+        query: str,
+        limit: int,
+        after: Optional[tuple[float, UUID]] = None,
+        filters: Optional[IncidentFilter] = None,
+    ) -> List[tuple[Incident, float]]:
+        """Найти инциденты по описанию, по убыванию релевантности"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def stream_incidents(
+        self, chunk_size: int, filters: Optional[IncidentFilter] = None
+    ) -> AsyncIterator[Sequence[Incident]]:
+        """Потоково читать инциденты порциями фиксированного размера"""
+        raise NotImplementedError
+
     @abstractmethod
     async def create_incident(
         self, 
@@ -33,6 +120,19 @@ class AbstractIncidentRepository(ABC):
         """Создать новый инцидент"""
         raise NotImplementedError
 
+    @abstractmethod
+    async def create_incidents_bulk(
+        self,
+        incidents: Sequence[IncidentCreate],
+        status: IncidentStatus = IncidentStatus.OPEN,
+    ) -> List[Incident]:
+        """Создать пакет инцидентов, сохраняя порядок входных данных.
+
+        Для элементов с уже использованным ключом идемпотентности возвращается
+        исходный инцидент (его id не попадает в created_ids).
+        """
+        raise NotImplementedError
+
     @abstractmethod
     async def update_incident(self, incident_id: UUID, **update_data) -> Optional[Incident]:
         """Обновить инцидент"""
@@ -46,4 +146,97 @@ class AbstractIncidentRepository(ABC):
     @abstractmethod
     async def update_incident_status(self, incident_id: UUID, status: IncidentStatus) -> Optional[Incident]:
         """Обновить статус инцидента"""
-        raise NotImplementedError
\ No newline at end of file
+        raise NotImplementedError
+
+    @abstractmethod
+    async def transition_incident_status(
+        self,
+        incident_id: UUID,
+        new_status: IncidentStatus,
+        allowed_from: Sequence[IncidentStatus],
+    ) -> GuardedWriteResult:
+        """Сменить статус, если текущий статус входит в allowed_from"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def transition_incidents_status(
+        self,
+        incident_ids: Sequence[UUID],
+        new_status: IncidentStatus,
+        allowed_from: Sequence[IncidentStatus],
+    ) -> dict[UUID, GuardedWriteResult]:
+        """Сменить статус пакета инцидентов одним запросом.
+
+        Результат по каждому id (без повторов, в порядке incident_ids) - как у
+        transition_incident_status.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def update_incident_description(
+        self,
+        incident_id: UUID,
+        description: str,
+        allowed_statuses: Sequence[IncidentStatus],
+    ) -> GuardedWriteResult:
+        """Обновить описание, если текущий статус входит в allowed_statuses"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete_incident_in_status(
+        self, incident_id: UUID, allowed_statuses: Sequence[IncidentStatus]
+    ) -> GuardedWriteResult:
+        """Удалить инцидент, если текущий статус входит в allowed_statuses"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_incident_version(self, incident_id: UUID) -> Optional[int]:
+        """Получить версию инцидента без чтения остальных полей"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_collection_version(self) -> int:
+        """Получить текущее значение счетчика изменений коллекции"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def bump_collection_version(self) -> None:
+        """Увеличить счетчик изменений коллекции"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def apply_stats_deltas(self) -> None:
+        """Перенести накопленные изменения счетчиков в хранилище"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_incident_stats(self) -> List[tuple[str, str, int]]:
+        """Получить количество инцидентов по парам (status, source)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def rebuild_incident_stats(self) -> None:
+        """Пересчитать счетчики по самим инцидентам (включая архив)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def archive_incidents(self, older_than: timedelta, limit: int) -> int:
+        """Перенести в архив до limit решенных/отмененных инцидентов старше older_than"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_archived_incident(self, incident_id: UUID) -> Optional[IncidentArchive]:
+        """Получить архивный инцидент по ID"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def record_status_history(self, events: Sequence[IncidentEvent]) -> None:
+        """Записать смены статусов в журнал и обновить агрегаты жизненного цикла"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_mttr_by_source(
+        self, resolved_from: Optional[datetime] = None, resolved_to: Optional[datetime] = None
+    ) -> List[SourceMttr]:
+        """Получить перцентили времени решения по источникам"""
+        raise NotImplementedError
@@ -0,0 +1,229 @@
+from collections import Counter
+from datetime import datetime, timedelta
+from uuid import UUID
+from typing import Any, AsyncIterator, Optional, List, Sequence
+from models.incident import Incident
+from models.incident_archive import IncidentArchive
+from core.cache import IncidentCache
+from core.enums import IncidentStatus, IncidentSource
+from core.events import IncidentEvent
+from schemas.incident import IncidentCreate, IncidentFilter, IncidentOut
+from repositories.abstract_incident import (
+    INCIDENT_ROW_FIELDS,
+    AbstractIncidentRepository,
+    GuardedWriteResult,
+    SourceMttr,
+)
+
+
+class CachedIncidentRepository(AbstractIncidentRepository):
+    """Декоратор репозитория: read-through кэш для get_incident_by_id.
+
+    Операции записи делегируются и сразу инвалидируют локальный кэш;
+    рассылка инвалидаций другим воркерам выполняется Unit of Work при коммите.
+    """
+
+    def __init__(
+        self,
+        inner: AbstractIncidentRepository,
+        cache: IncidentCache,
+        fill_quarantine: float = 0.0,
+    ):
+        self._inner = inner
+        self._cache = cache
+        # Для чтений с реплики: не кэшировать недавно измененные инциденты
+        self._fill_quarantine = fill_quarantine
+
+    @property
+    def changed_ids(self) -> set[UUID]:
+        return self._inner.changed_ids
+
+    @property
+    def created_ids(self) -> set[UUID]:
+        return self._inner.created_ids
+
+    @property
+    def stats_deltas(self) -> Counter[tuple[str, str]]:
+        return self._inner.stats_deltas
+
+    @property
+    def events(self) -> list[IncidentEvent]:
+        return self._inner.events
+
+    async def get_incident_by_id(self, incident_id: UUID) -> Optional[IncidentOut]:
+        """Получить инцидент по ID"""
+        cached = self._cache.get(incident_id)
+        if cached is not None:
+            return cached
+        token = self._cache.read_token()
+        incident = await self._inner.get_incident_by_id(incident_id)
+        if incident is None:
+            return None
+        incident_out = IncidentOut.model_validate(incident)
+        self._cache.set(incident_out, token, self._fill_quarantine)
+        return incident_out
+
+    async def get_all_incidents(self) -> List[Incident]:
+        """Получить все инциденты"""
+        return await self._inner.get_all_incidents()
+
+    async def get_incidents_by_status(self, status: IncidentStatus) -> List[Incident]:
+        """Получить инциденты по статусу"""
+        return await self._inner.get_incidents_by_status(status)
+
+    async def get_incidents_page(
+        self,
+        limit: int,
+        after: Optional[tuple[datetime, UUID]] = None,
+        filters: Optional[IncidentFilter] = None,
+    ) -> List[Incident]:
+        """Получить страницу инцидентов, следующих за позицией (created_at, id)"""
+        return await self._inner.get_incidents_page(limit, after, filters)
+
+    async def get_incident_row(self, incident_id: UUID, fields: Sequence[str]) -> Optional[Any]:
+        """Получить только поля fields инцидента (объект с этими атрибутами)"""
+        # В кэше инцидент целиком - при попадании нужные поля в нем уже есть
+        cached = self._cache.get(incident_id)
+        if cached is not None:
+            return cached
+        return await self._inner.get_incident_row(incident_id, fields)
+
+    async def get_incident_rows_page(
+        self,
+        limit: int,
+        after: Optional[tuple[datetime, UUID]] = None,
+        filters: Optional[IncidentFilter] = None,
+        fields: Sequence[str] = INCIDENT_ROW_FIELDS,
+    ) -> Sequence[tuple]:
+        """То же, что get_incidents_page, но именованные кортежи из колонок fields"""
+        return await self._inner.get_incident_rows_page(limit, after, filters, fields)
+
+    async def search_incidents(
+        self,
+        query: str,
+        limit: int,
+        after: Optional[tuple[float, UUID]] = None,
+        filters: Optional[IncidentFilter] = None,
+    ) -> List[tuple[Incident, float]]:
+        """Найти инциденты по описанию, по убыванию релевантности"""
+        return await self._inner.search_incidents(query, limit, after, filters)
+
+    def stream_incidents(
+        self, chunk_size: int, filters: Optional[IncidentFilter] = None
+    ) -> AsyncIterator[Sequence[Incident]]:
+        """Потоково читать инциденты порциями фиксированного размера"""
+        return self._inner.stream_incidents(chunk_size, filters)
+
+    async def create_incident(
+        self,
+        description: str,
+        status: IncidentStatus = IncidentStatus.OPEN,
+        source: IncidentSource = IncidentSource.OPERATOR
+    ) -> Incident:
+        """Создать новый инцидент"""
+        return await self._inner.create_incident(description, status, source)
+
+    async def create_incidents_bulk(
+        self,
+        incidents: Sequence[IncidentCreate],
+        status: IncidentStatus = IncidentStatus.OPEN,
+    ) -> List[Incident]:
+        """Создать пакет инцидентов, сохраняя порядок входных данных"""
+        return await self._inner.create_incidents_bulk(incidents, status)
+
+    async def update_incident(self, incident_id: UUID, **update_data) -> Optional[Incident]:
+        """Обновить инцидент"""
+        self._cache.invalidate([incident_id])
+        return await self._inner.update_incident(incident_id, **update_data)
+
+    async def delete_incident(self, incident_id: UUID) -> bool:
+        """Удалить инцидент"""
+        self._cache.invalidate([incident_id])
+        return await self._inner.delete_incident(incident_id)
+
+    async def update_incident_status(self, incident_id: UUID, status: IncidentStatus) -> Optional[Incident]:
+        """Обновить статус инцидента"""
+        self._cache.invalidate([incident_id])
+        return await self._inner.update_incident_status(incident_id, status)
+
+    async def transition_incident_status(
+        self,
+        incident_id: UUID,
+        new_status: IncidentStatus,
+        allowed_from: Sequence[IncidentStatus],
+    ) -> GuardedWriteResult:
+        """Сменить статус, если текущий статус входит в allowed_from"""
+        self._cache.invalidate([incident_id])
+        return await self._inner.transition_incident_status(incident_id, new_status, allowed_from)
+
+    async def transition_incidents_status(
+        self,
+        incident_ids: Sequence[UUID],
+        new_status: IncidentStatus,
+        allowed_from: Sequence[IncidentStatus],
+    ) -> dict[UUID, GuardedWriteResult]:
+        """Сменить статус пакета инцидентов одним запросом"""
+        self._cache.invalidate(incident_ids)
+        return await self._inner.transition_incidents_status(incident_ids, new_status, allowed_from)
+
+    async def update_incident_description(
+        self,
+        incident_id: UUID,
+        description: str,
+        allowed_statuses: Sequence[IncidentStatus],
+    ) -> GuardedWriteResult:
+        """Обновить описание, если текущий статус входит в allowed_statuses"""
+        self._cache.invalidate([incident_id])
+        return await self._inner.update_incident_description(incident_id, description, allowed_statuses)
+
+    async def delete_incident_in_status(
+        self, incident_id: UUID, allowed_statuses: Sequence[IncidentStatus]
+    ) -> GuardedWriteResult:
+        """Удалить инцидент, если текущий статус входит в allowed_statuses"""
+        self._cache.invalidate([incident_id])
+        return await self._inner.delete_incident_in_status(incident_id, allowed_statuses)
+
+    async def get_incident_version(self, incident_id: UUID) -> Optional[int]:
+        """Получить версию инцидента без чтения остальных полей"""
+        cached = self._cache.get(incident_id)
+        if cached is not None:
+            return cached.version
+        return await self._inner.get_incident_version(incident_id)
+
+    async def get_collection_version(self) -> int:
+        """Получить текущее значение счетчика изменений коллекции"""
+        return await self._inner.get_collection_version()
+
+    async def bump_collection_version(self) -> None:
+        """Увеличить счетчик изменений коллекции"""
+        await self._inner.bump_collection_version()
+
+    async def apply_stats_deltas(self) -> None:
+        """Перенести накопленные изменения счетчиков в хранилище"""
+        await self._inner.apply_stats_deltas()
+
+    async def get_incident_stats(self) -> List[tuple[str, str, int]]:
+        """Получить количество инцидентов по парам (status, source)"""
+        return await self._inner.get_incident_stats()
+
+    async def rebuild_incident_stats(self) -> None:
+        """Пересчитать счетчики по самим инцидентам (включая архив)"""
+        await self._inner.rebuild_incident_stats()
+
+    async def archive_incidents(self, older_than: timedelta, limit: int) -> int:
+        """Перенести в архив до limit решенных/отмененных инцидентов старше older_than"""
+        return await self._inner.archive_incidents(older_than, limit)
+
+    async def get_archived_incident(self, incident_id: UUID) -> Optional[IncidentArchive]:
+        """Получить архивный инцидент по ID"""
+        return await self._inner.get_archived_incident(incident_id)
+
+    async def record_status_history(self, events: Sequence[IncidentEvent]) -> None:
+        """Записать смены статусов в журнал и обновить агрегаты жизненного цикла"""
+        await self._inner.record_status_history(events)
+
+    async def get_mttr_by_source(
+        self, resolved_from: Optional[datetime] = None, resolved_to: Optional[datetime] = None
+    ) -> List[SourceMttr]:
+        """Получить перцентили времени решения по источникам"""
+        return await self._inner.get_mttr_by_source(resolved_from, resolved_to)
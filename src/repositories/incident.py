@@ -1,20 +1,93 @@
+import random
+from collections import Counter
+from datetime import datetime, timedelta
 from uuid import UUID
-from typing import Optional, List
+from typing import Any, AsyncIterator, Optional, List, Sequence
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, delete
+from sqlalchemy import UUID as SA_UUID, BigInteger, Float, Interval, Select, String, and_, bindparam, case, cast, column, delete, func, insert, literal, or_, select, tuple_, union_all, update, values
+from sqlalchemy.dialects.postgresql import REGCONFIG, insert as pg_insert
 from sqlalchemy.exc import NoResultFound
-from models.incident import Incident
-from core.enums import IncidentStatus, IncidentSource
-from repositories.abstract_incident import AbstractIncidentRepository
+from sqlalchemy.orm import aliased
+from models.incident import COLLECTION_VERSION_SHARDS, SEARCH_CONFIG, Incident, IncidentCollectionVersion
+from models.idempotency_key import IncidentIdempotencyKey
+from models.incident_archive import IncidentArchive
+from models.incident_history import TIME_IN_STATUS_COLUMNS, IncidentLifecycle, IncidentStatusHistory
+from models.incident_stats import STATS_SHARDS, IncidentStats
+from core.enums import FINAL_STATUSES, IncidentEventType, IncidentStatus, IncidentSource
+from core.events import IncidentEvent
+from core.idempotency import IdempotencyKeyConflictError
+from core.ids import ID_TIME_TOLERANCE, uuid7, uuid7_time
+from schemas.incident import IncidentCreate, IncidentFilter
+from repositories.abstract_incident import (
+    INCIDENT_ROW_FIELDS,
+    AbstractIncidentRepository,
+    GuardedWriteResult,
+    SourceMttr,
+)
+
+
+def apply_incident_filters(stmt: Select, filters: Optional[IncidentFilter]) -> Select:
+    """Добавить к запросу условия фильтрации инцидентов"""
+    if filters is None:
+        return stmt
+    if filters.statuses:
+        # Значения статусов подставляются литералами, чтобы планировщик мог
+        # доказать совпадение с условием частичного индекса активных статусов
+        statuses = tuple(sorted({status.value for status in filters.statuses}))
+        stmt = stmt.where(
+            Incident.status.in_(bindparam("statuses", statuses, expanding=True, literal_execute=True))
+        )
+    if filters.source:
+        stmt = stmt.where(Incident.source == filters.source.value)
+    # Границы created_at заодно отсекают партиции вне интервала
+    if filters.created_from:
+        stmt = stmt.where(Incident.created_at >= filters.created_from)
+    if filters.created_to:
+        stmt = stmt.where(Incident.created_at < filters.created_to)
+    return stmt
+
+
+def incident_key(incident_id: UUID) -> list:
+    """Условия поиска инцидента по id.
+
+    Первичный ключ - (id, created_at), и по одному id PostgreSQL проверяет
+    индекс каждой партиции. Время из UUIDv7 дает границы created_at, по
+    которым лишние партиции отсекаются. Для id других версий (созданных до
+    перехода на UUIDv7) границ нет.
+    """
+    conditions = [Incident.id == incident_id]
+    created_at = uuid7_time(incident_id)
+    if created_at is not None:
+        conditions += [
+            Incident.created_at >= created_at - ID_TIME_TOLERANCE,
+            Incident.created_at < created_at + ID_TIME_TOLERANCE,
+        ]
+    return conditions
+
+
+def incident_keys(incident_ids: Sequence[UUID]) -> list:
+    """Условия поиска пакета инцидентов: границы created_at, если все id - UUIDv7"""
+    conditions = [Incident.id.in_(incident_ids)]
+    times = [uuid7_time(incident_id) for incident_id in incident_ids]
+    if times and None not in times:
+        conditions += [
+            Incident.created_at >= min(times) - ID_TIME_TOLERANCE,
+            Incident.created_at < max(times) + ID_TIME_TOLERANCE,
+        ]
+    return conditions
 
 
 class IncidentRepository(AbstractIncidentRepository):
     def __init__(self, session: AsyncSession):
         self.session = session
+        self.changed_ids: set[UUID] = set()
+        self.created_ids: set[UUID] = set()
+        self.stats_deltas: Counter[tuple[str, str]] = Counter()
+        self.events: list[IncidentEvent] = []
 
     async def get_incident_by_id(self, incident_id: UUID) -> Optional[Incident]:
         """Получить инцидент по ID"""
-        stmt = select(Incident).where(Incident.id == incident_id)
+        stmt = select(Incident).where(*incident_key(incident_id))
         result = await self.session.execute(stmt)
         return result.scalar_one_or_none()
 
@@ -30,6 +103,116 @@ class IncidentRepository(AbstractIncidentRepository):
         result = await self.session.execute(stmt)
         return result.scalars().all()
 
+    async def get_incidents_page(
+        self,
+        limit: int,
+        after: Optional[tuple[datetime, UUID]] = None,
+        filters: Optional[IncidentFilter] = None,
+    ) -> List[Incident]:
+        """Получить страницу инцидентов, следующих за позицией (created_at, id)"""
+        stmt = self._page_statement(select(Incident), limit, after, filters)
+        result = await self.session.execute(stmt)
+        return result.scalars().all()
+
+    async def get_incident_row(self, incident_id: UUID, fields: Sequence[str]) -> Optional[Any]:
+        """Получить только поля fields инцидента (объект с этими атрибутами)"""
+        stmt = select(*self._columns(fields)).where(*incident_key(incident_id))
+        result = await self.session.execute(stmt)
+        return result.one_or_none()
+
+    async def get_incident_rows_page(
+        self,
+        limit: int,
+        after: Optional[tuple[datetime, UUID]] = None,
+        filters: Optional[IncidentFilter] = None,
+        fields: Sequence[str] = INCIDENT_ROW_FIELDS,
+    ) -> Sequence[tuple]:
+        """То же, что get_incidents_page, но именованные кортежи из колонок fields"""
+        # Колонки вместо сущностей: без identity map и инструментирования атрибутов,
+        # а невостребованные колонки (например, description) не читаются вовсе
+        stmt = self._page_statement(select(*self._columns(fields)), limit, after, filters)
+        result = await self.session.execute(stmt)
+        return result.all()
+
+    @staticmethod
+    def _columns(fields: Sequence[str]) -> list:
+        unknown = set(fields).difference(INCIDENT_ROW_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown incident fields: {', '.join(sorted(unknown))}")
+        return [getattr(Incident, field) for field in fields]
+
+    @staticmethod
+    def _page_statement(
+        stmt: Select,
+        limit: int,
+        after: Optional[tuple[datetime, UUID]],
+        filters: Optional[IncidentFilter],
+    ) -> Select:
+        stmt = apply_incident_filters(stmt, filters)
+        if after:
+            # Сравнение кортежей использует индекс (created_at, id) без OFFSET.
+            # Избыточное условие на один created_at позволяет планировщику
+            # отбросить партиции новее курсора: сравнение кортежей он не разбирает
+            stmt = stmt.where(
+                tuple_(Incident.created_at, Incident.id) < tuple_(*after),
+                Incident.created_at <= after[0],
+            )
+        return stmt.order_by(Incident.created_at.desc(), Incident.id.desc()).limit(limit)
+
+    async def search_incidents(
+        self,
+        query: str,
+        limit: int,
+        after: Optional[tuple[float, UUID]] = None,
+        filters: Optional[IncidentFilter] = None,
+    ) -> List[tuple[Incident, float]]:
+        """Найти инциденты по описанию, по убыванию релевантности.
+
+        Совпадением считается совпадение слов (GIN по search_vector) или
+        похожий фрагмент описания (триграммный GIN, оператор %>).
+        Релевантность - сумма ts_rank_cd и word_similarity.
+        """
+        ts_query = func.websearch_to_tsquery(cast(SEARCH_CONFIG, REGCONFIG), query)
+        rank = (
+            func.ts_rank_cd(Incident.search_vector, ts_query)
+            + func.word_similarity(query, Incident.description)
+        )
+        stmt = apply_incident_filters(
+            select(Incident, rank.label("rank")).where(
+                or_(
+                    Incident.search_vector.bool_op("@@")(ts_query),
+                    Incident.description.bool_op("%>")(query),
+                )
+            ),
+            filters,
+        )
+        if after:
+            after_rank, after_id = after
+            stmt = stmt.where(tuple_(rank, Incident.id) < tuple_(literal(after_rank, Float), after_id))
+        stmt = stmt.order_by(rank.desc(), Incident.id.desc()).limit(limit)
+        result = await self.session.execute(stmt)
+        return [(incident, float(incident_rank)) for incident, incident_rank in result.all()]
+
+    async def stream_incidents(
+        self, chunk_size: int, filters: Optional[IncidentFilter] = None
+    ) -> AsyncIterator[Sequence[Incident]]:
+        """Потоково читать инциденты порциями фиксированного размера"""
+        # Выбираем колонки, а не сущности: строки не попадают в identity map сессии
+        stmt = apply_incident_filters(
+            select(
+                Incident.id,
+                Incident.description,
+                Incident.status,
+                Incident.source,
+                Incident.created_at,
+            ),
+            filters,
+        ).order_by(Incident.created_at.desc(), Incident.id.desc())
+        # yield_per включает серверный курсор asyncpg вместо загрузки всего результата
+        result = await self.session.stream(stmt.execution_options(yield_per=chunk_size))
+        async for partition in result.partitions():
+            yield partition
+
     async def create_incident(
         self, 
         description: str, 
@@ -45,22 +228,130 @@ class IncidentRepository(AbstractIncidentRepository):
         self.session.add(incident)
         await self.session.flush()  # Используем flush вместо commit
         await self.session.refresh(incident)
+        self.created_ids.add(incident.id)
+        self.stats_deltas[(incident.status, incident.source)] += 1
+        self.events.append(IncidentEvent.of(IncidentEventType.CREATED, incident))
         return incident
 
+    async def create_incidents_bulk(
+        self,
+        incidents: Sequence[IncidentCreate],
+        status: IncidentStatus = IncidentStatus.OPEN,
+    ) -> List[Incident]:
+        """Создать пакет инцидентов, сохраняя порядок входных данных.
+
+        Для элемента с уже занятым ключом идемпотентности возвращается исходный
+        инцидент; он не попадает в created_ids.
+        """
+        rows = [
+            {
+                "id": uuid7(),
+                "description": incident.description,
+                "status": status.value,
+                "source": incident.source.value,
+            }
+            for incident in incidents
+        ]
+        replayed, duplicate_of = await self._claim_idempotency_keys(incidents, rows)
+        new_rows = [
+            row for index, row in enumerate(rows) if index not in replayed and index not in duplicate_of
+        ]
+        created: Sequence[Incident] = []
+        if new_rows:
+            # Многострочный INSERT ... RETURNING (insertmanyvalues) вместо add/flush/refresh
+            # на каждую запись; порядок RETURNING совпадает с порядком параметров
+            stmt = insert(Incident).returning(Incident, sort_by_parameter_order=True)
+            result = await self.session.scalars(stmt, new_rows)
+            created = result.all()
+            self.created_ids.update(row["id"] for row in new_rows)
+            self.stats_deltas.update((row["status"], row["source"]) for row in new_rows)
+            self.events.extend(IncidentEvent.of(IncidentEventType.CREATED, incident) for incident in created)
+        if len(created) == len(rows):
+            return created
+        created_by_id = {incident.id: incident for incident in created}
+        return [
+            replayed[index] if index in replayed else created_by_id[rows[duplicate_of.get(index, index)]["id"]]
+            for index in range(len(rows))
+        ]
+
+    async def _claim_idempotency_keys(
+        self, incidents: Sequence[IncidentCreate], rows: Sequence[dict]
+    ) -> tuple[dict[int, Incident], dict[int, int]]:
+        """Занять ключи идемпотентности пакета одним INSERT ... ON CONFLICT DO NOTHING.
+
+        Возвращает исходные инциденты для ключей, занятых раньше, и для
+        повторов ключа внутри пакета - индекс первого элемента с этим ключом.
+        Конкурентная транзакция с тем же ключом ждет коммита первой и
+        получает ее инцидент.
+        """
+        first_index: dict[tuple[str, str], int] = {}
+        duplicate_of: dict[int, int] = {}
+        for index, (incident, row) in enumerate(zip(incidents, rows)):
+            if incident.idempotency_key is None:
+                continue
+            key = (row["source"], incident.idempotency_key)
+            if key in first_index:
+                duplicate_of[index] = first_index[key]
+            else:
+                first_index[key] = index
+        if not first_index:
+            return {}, duplicate_of
+        stmt = (
+            pg_insert(IncidentIdempotencyKey)
+            .values([
+                {"source": source, "key": key, "incident_id": rows[index]["id"]}
+                for (source, key), index in sorted(first_index.items())
+            ])
+            .on_conflict_do_nothing()
+            .returning(IncidentIdempotencyKey.incident_id)
+        )
+        claimed = set((await self.session.scalars(stmt)).all())
+        taken = {key: index for key, index in first_index.items() if rows[index]["id"] not in claimed}
+        if not taken:
+            return {}, duplicate_of
+        stmt = (
+            select(IncidentIdempotencyKey.source, IncidentIdempotencyKey.key, Incident)
+            .join(Incident, Incident.id == IncidentIdempotencyKey.incident_id)
+            .where(tuple_(IncidentIdempotencyKey.source, IncidentIdempotencyKey.key).in_(list(taken)))
+        )
+        originals = {(source, key): incident for source, key, incident in (await self.session.execute(stmt)).all()}
+        replayed: dict[int, Incident] = {}
+        for key, index in taken.items():
+            if key not in originals:
+                # Исходный инцидент удален после проверки ключа
+                raise IdempotencyKeyConflictError(key[1], "belongs to an incident that was just deleted")
+            replayed[index] = originals[key]
+        for index, first in list(duplicate_of.items()):
+            if first in replayed:
+                replayed[index] = replayed[first]
+                del duplicate_of[index]
+        return replayed, duplicate_of
+
     async def update_incident(self, incident_id: UUID, **update_data) -> Optional[Incident]:
         """Обновить инцидент"""
         # Получаем инцидент для проверки существования
         incident = await self.get_incident_by_id(incident_id)
         if not incident:
             return None
+        counted_as = (incident.status, incident.source)
+        description_before = incident.description
 
         # Обновляем только переданные поля
         for field, value in update_data.items():
             if hasattr(incident, field):
                 setattr(incident, field, value)
+        incident.version = Incident.version + 1
 
         await self.session.flush()  # Используем flush вместо commit
         await self.session.refresh(incident)
+        self.changed_ids.add(incident_id)
+        self._move_stats(counted_as, (incident.status, incident.source))
+        if incident.status != counted_as[0]:
+            self.events.append(
+                IncidentEvent.of(IncidentEventType.STATUS_CHANGED, incident, previous_status=counted_as[0])
+            )
+        if incident.description != description_before:
+            self.events.append(IncidentEvent.of(IncidentEventType.DESCRIPTION_CHANGED, incident))
         return incident
 
     async def delete_incident(self, incident_id: UUID) -> bool:
@@ -70,9 +361,418 @@ class IncidentRepository(AbstractIncidentRepository):
             return False
 
         await self.session.delete(incident)
+        await self.session.execute(
+            delete(IncidentIdempotencyKey).where(IncidentIdempotencyKey.incident_id == incident_id)
+        )
         await self.session.flush()  # Используем flush вместо commit
+        self.changed_ids.add(incident_id)
+        self.stats_deltas[(incident.status, incident.source)] -= 1
+        self.events.append(IncidentEvent.of(IncidentEventType.DELETED, incident))
         return True
 
     async def update_incident_status(self, incident_id: UUID, status: IncidentStatus) -> Optional[Incident]:
         """Обновить статус инцидента"""
         return await self.update_incident(incident_id, status=status.value)
+
+    async def transition_incident_status(
+        self,
+        incident_id: UUID,
+        new_status: IncidentStatus,
+        allowed_from: Sequence[IncidentStatus],
+    ) -> GuardedWriteResult:
+        """Сменить статус, если текущий статус входит в allowed_from"""
+        return await self._guarded_update(incident_id, allowed_from, status=new_status.value)
+
+    async def transition_incidents_status(
+        self,
+        incident_ids: Sequence[UUID],
+        new_status: IncidentStatus,
+        allowed_from: Sequence[IncidentStatus],
+    ) -> dict[UUID, GuardedWriteResult]:
+        """Сменить статус пакета инцидентов одним UPDATE.
+
+        Как и в _guarded_update, внешний SELECT видит статусы до изменения, так
+        что по каждому id сразу понятно, найден ли он и применилась ли смена.
+        Строки блокируются в порядке id: параллельные пакеты с пересекающимися
+        наборами инцидентов не попадают во взаимную блокировку.
+        """
+        ids = list(dict.fromkeys(incident_ids))
+        allowed = [status.value for status in allowed_from]
+        locked = (
+            select(Incident.id, Incident.created_at)
+            .where(*incident_keys(ids), Incident.status.in_(allowed))
+            .order_by(Incident.id)
+            .with_for_update()
+        )
+        written = (
+            update(Incident)
+            .where(tuple_(Incident.id, Incident.created_at).in_(locked), Incident.status.in_(allowed))
+            .values(status=new_status.value, version=Incident.version + 1)
+            .returning(*Incident.__table__.c)
+            .cte("written")
+        )
+        written_incident = aliased(Incident, written)
+        stmt = (
+            select(Incident.id, Incident.status, written_incident)
+            .outerjoin(written_incident, written_incident.id == Incident.id)
+            .where(*incident_keys(ids))
+            .execution_options(populate_existing=True)
+        )
+        results = dict.fromkeys(ids, GuardedWriteResult(status_before=None, applied=False))
+        for incident_id, status_before, incident in (await self.session.execute(stmt)).all():
+            if incident is not None:
+                self.changed_ids.add(incident_id)
+                self._move_stats((status_before, incident.source), (incident.status, incident.source))
+                self.events.append(
+                    IncidentEvent.of(IncidentEventType.STATUS_CHANGED, incident, previous_status=status_before)
+                )
+            results[incident_id] = GuardedWriteResult(IncidentStatus(status_before), incident is not None, incident)
+        return results
+
+    async def update_incident_description(
+        self,
+        incident_id: UUID,
+        description: str,
+        allowed_statuses: Sequence[IncidentStatus],
+    ) -> GuardedWriteResult:
+        """Обновить описание, если текущий статус входит в allowed_statuses"""
+        return await self._guarded_update(incident_id, allowed_statuses, description=description)
+
+    async def delete_incident_in_status(
+        self, incident_id: UUID, allowed_statuses: Sequence[IncidentStatus]
+    ) -> GuardedWriteResult:
+        """Удалить инцидент, если текущий статус входит в allowed_statuses"""
+        deleted = (
+            delete(Incident)
+            .where(
+                *incident_key(incident_id),
+                Incident.status.in_([status.value for status in allowed_statuses]),
+            )
+            .returning(Incident.id)
+            .cte("deleted")
+        )
+        # Ключ идемпотентности освобождается тем же запросом
+        released = (
+            delete(IncidentIdempotencyKey)
+            .where(IncidentIdempotencyKey.incident_id.in_(select(deleted.c.id)))
+            .cte("released")
+        )
+        stmt = (
+            select(Incident.status, Incident.source, deleted.c.id)
+            .outerjoin(deleted, deleted.c.id == Incident.id)
+            .where(*incident_key(incident_id))
+            .add_cte(released)
+        )
+        row = (await self.session.execute(stmt)).one_or_none()
+        if row is None:
+            return GuardedWriteResult(status_before=None, applied=False)
+        status_before, source, deleted_id = row
+        if deleted_id is not None:
+            self.changed_ids.add(incident_id)
+            self.stats_deltas[(status_before, source)] -= 1
+            self.events.append(IncidentEvent(IncidentEventType.DELETED, incident_id, status_before, source))
+        return GuardedWriteResult(IncidentStatus(status_before), deleted_id is not None)
+
+    async def get_incident_version(self, incident_id: UUID) -> Optional[int]:
+        """Получить версию инцидента без чтения остальных полей"""
+        stmt = select(Incident.version).where(*incident_key(incident_id))
+        return await self.session.scalar(stmt)
+
+    async def get_collection_version(self) -> int:
+        """Получить текущее значение счетчика изменений коллекции"""
+        stmt = select(func.coalesce(func.sum(IncidentCollectionVersion.version), 0))
+        return int(await self.session.scalar(stmt))
+
+    async def bump_collection_version(self) -> None:
+        """Увеличить счетчик изменений коллекции в текущей транзакции (случайный шард)"""
+        stmt = pg_insert(IncidentCollectionVersion).values(
+            shard=random.randrange(COLLECTION_VERSION_SHARDS), version=1
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[IncidentCollectionVersion.shard],
+            set_={"version": IncidentCollectionVersion.version + 1},
+        )
+        await self.session.execute(stmt)
+
+    async def apply_stats_deltas(self) -> None:
+        """Перенести накопленные изменения счетчиков в incident_stats.
+
+        Все изменения транзакции пишутся одним INSERT ... ON CONFLICT в
+        случайный шард. Строки упорядочены, чтобы конкурентные транзакции
+        блокировали их в одном порядке и не попадали во взаимоблокировку.
+        """
+        shard = random.randrange(STATS_SHARDS)
+        rows = [
+            {"status": status, "source": source, "shard": shard, "count": delta}
+            for (status, source), delta in sorted(self.stats_deltas.items())
+            if delta
+        ]
+        self.stats_deltas.clear()
+        if not rows:
+            return
+        stmt = pg_insert(IncidentStats).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[IncidentStats.status, IncidentStats.source, IncidentStats.shard],
+            set_={"count": IncidentStats.count + stmt.excluded.count},
+        )
+        await self.session.execute(stmt)
+
+    async def get_incident_stats(self) -> List[tuple[str, str, int]]:
+        """Получить количество инцидентов по парам (status, source)"""
+        stmt = (
+            select(IncidentStats.status, IncidentStats.source, func.sum(IncidentStats.count))
+            .group_by(IncidentStats.status, IncidentStats.source)
+        )
+        result = await self.session.execute(stmt)
+        return [(status, source, int(count)) for status, source, count in result.all()]
+
+    async def rebuild_incident_stats(self) -> None:
+        """Пересчитать счетчики по таблицам incidents и incidents_archive без блокировки таблиц.
+
+        Один запрос: подсчет по таблицам и текущие суммы счетчиков читаются
+        из одного снимка, а разница добавляется к счетчикам через ON CONFLICT
+        DO UPDATE - то есть к последней версии строки. Изменения, закоммиченные
+        после снимка, не видны подсчету, но уже учтены в счетчиках своими
+        дельтами, поэтому пересчет не мешает записи и не теряет ее.
+        """
+        counted = union_all(
+            select(Incident.status, Incident.source),
+            select(IncidentArchive.status, IncidentArchive.source),
+        ).subquery()
+        actual = (
+            select(counted.c.status, counted.c.source, func.count().label("count"))
+            .group_by(counted.c.status, counted.c.source)
+            .cte("actual")
+        )
+        recorded = (
+            select(
+                IncidentStats.status,
+                IncidentStats.source,
+                cast(func.sum(IncidentStats.count), BigInteger).label("count"),
+            )
+            .group_by(IncidentStats.status, IncidentStats.source)
+            .cte("recorded")
+        )
+        correction = func.coalesce(actual.c.count, 0) - func.coalesce(recorded.c.count, 0)
+        corrections = (
+            select(
+                func.coalesce(actual.c.status, recorded.c.status),
+                func.coalesce(actual.c.source, recorded.c.source),
+                literal(0),
+                correction,
+            )
+            .select_from(
+                actual.join(
+                    recorded,
+                    and_(actual.c.status == recorded.c.status, actual.c.source == recorded.c.source),
+                    full=True,
+                )
+            )
+            .where(correction != 0)
+        )
+        stmt = pg_insert(IncidentStats).from_select(["status", "source", "shard", "count"], corrections)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[IncidentStats.status, IncidentStats.source, IncidentStats.shard],
+            set_={"count": IncidentStats.count + stmt.excluded.count},
+        )
+        await self.session.execute(stmt)
+        self.stats_deltas.clear()
+
+    async def archive_incidents(self, older_than: timedelta, limit: int) -> int:
+        """Перенести пакет решенных/отмененных инцидентов в incidents_archive.
+
+        Один запрос: DELETE ... RETURNING переносит строки во вставку в архив
+        и освобождает их ключи идемпотентности. FOR UPDATE SKIP LOCKED
+        пропускает строки, которые сейчас меняют другие транзакции, поэтому
+        пакет не ждет чужих блокировок. Возраст отсчитывается от created_at:
+        условие использует индекс (status, created_at) и отсекает новые партиции.
+        Счетчики статистики не меняются - архивные инциденты в них учитываются.
+        """
+        columns = ["id", "description", "status", "source", "created_at", "version"]
+        cutoff = func.localtimestamp() - bindparam("older_than", older_than, type_=Interval)
+        # Порядок не важен: без сортировки LIMIT останавливает просмотр индекса
+        candidates = (
+            select(Incident.id, Incident.created_at)
+            .where(
+                Incident.status.in_([status.value for status in FINAL_STATUSES]),
+                Incident.created_at < cutoff,
+            )
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        moved = (
+            delete(Incident)
+            .where(tuple_(Incident.id, Incident.created_at).in_(candidates))
+            .returning(*(getattr(Incident, column) for column in columns))
+            .cte("moved")
+        )
+        released = (
+            delete(IncidentIdempotencyKey)
+            .where(IncidentIdempotencyKey.incident_id.in_(select(moved.c.id)))
+            .cte("released")
+        )
+        stmt = (
+            insert(IncidentArchive)
+            .from_select(columns, select(*(moved.c[column] for column in columns)))
+            .returning(IncidentArchive.id)
+            .add_cte(released)
+        )
+        archived = (await self.session.scalars(stmt)).all()
+        self.changed_ids.update(archived)
+        return len(archived)
+
+    async def get_archived_incident(self, incident_id: UUID) -> Optional[IncidentArchive]:
+        """Получить архивный инцидент по ID"""
+        return await self.session.get(IncidentArchive, incident_id)
+
+    async def record_status_history(self, events: Sequence[IncidentEvent]) -> None:
+        """Записать смены статусов в журнал и обновить incident_lifecycle.
+
+        Агрегаты обновляются инкрементально одним UPDATE ... FROM (VALUES ...)
+        на транзакцию: время в покидаемом статусе прибавляется к накопленному,
+        при переходе в resolved фиксируется время решения. localtimestamp
+        постоянен в пределах транзакции, поэтому несколько переходов одного
+        инцидента схлопываются в один без потери точности.
+        """
+        created = [event for event in events if event.type == IncidentEventType.CREATED]
+        # incident_id -> (статус до первого перехода, статус после последнего)
+        moves: dict[UUID, tuple[str, str]] = {}
+        history = [
+            {"incident_id": event.id, "from_status": None, "to_status": event.status}
+            for event in created
+        ]
+        for event in events:
+            if event.type != IncidentEventType.STATUS_CHANGED:
+                continue
+            history.append(
+                {"incident_id": event.id, "from_status": event.previous_status, "to_status": event.status}
+            )
+            from_status = moves[event.id][0] if event.id in moves else event.previous_status
+            moves[event.id] = (from_status, event.status)
+        if not history:
+            return
+        await self.session.execute(insert(IncidentStatusHistory), history)
+        if created:
+            await self.session.execute(
+                insert(IncidentLifecycle),
+                [
+                    {
+                        "incident_id": event.id,
+                        "source": event.source,
+                        "created_at": event.created_at,
+                        "status": event.status,
+                        "status_since": event.created_at,
+                    }
+                    for event in created
+                ],
+            )
+        if moves:
+            await self.session.execute(self._lifecycle_update(moves))
+
+    @staticmethod
+    def _lifecycle_update(moves: dict[UUID, tuple[str, str]]):
+        now = func.localtimestamp()
+        moved = values(
+            column("incident_id", SA_UUID(as_uuid=True)),
+            column("from_status", String),
+            column("to_status", String),
+            name="moved",
+        ).data(
+            [(incident_id, from_status, to_status) for incident_id, (from_status, to_status) in sorted(moves.items())]
+        )
+        in_status = func.extract("epoch", now - IncidentLifecycle.status_since)
+        resolved = moved.c.to_status == IncidentStatus.RESOLVED.value
+        return (
+            update(IncidentLifecycle)
+            .where(IncidentLifecycle.incident_id == moved.c.incident_id)
+            .values(
+                **{
+                    seconds.key: case((moved.c.from_status == status, seconds + in_status), else_=seconds)
+                    for status, seconds in TIME_IN_STATUS_COLUMNS.items()
+                },
+                status=moved.c.to_status,
+                status_since=now,
+                resolved_at=case((resolved, now), else_=IncidentLifecycle.resolved_at),
+                resolve_seconds=case(
+                    (resolved, func.extract("epoch", now - IncidentLifecycle.created_at)),
+                    else_=IncidentLifecycle.resolve_seconds,
+                ),
+            )
+        )
+
+    async def get_mttr_by_source(
+        self, resolved_from: Optional[datetime] = None, resolved_to: Optional[datetime] = None
+    ) -> List[SourceMttr]:
+        """Перцентили времени решения по источникам.
+
+        Читаются только готовые агрегаты incident_lifecycle по частичному
+        индексу решенных инцидентов, без обхода журнала переходов.
+        """
+        resolve_seconds = IncidentLifecycle.resolve_seconds
+        stmt = (
+            select(
+                IncidentLifecycle.source,
+                func.count(),
+                *(
+                    func.percentile_cont(fraction).within_group(resolve_seconds)
+                    for fraction in (0.5, 0.9, 0.99)
+                ),
+                *(func.avg(seconds) for seconds in TIME_IN_STATUS_COLUMNS.values()),
+            )
+            .where(IncidentLifecycle.resolved_at.isnot(None))
+            .group_by(IncidentLifecycle.source)
+            .order_by(IncidentLifecycle.source)
+        )
+        if resolved_from:
+            stmt = stmt.where(IncidentLifecycle.resolved_at >= resolved_from)
+        if resolved_to:
+            stmt = stmt.where(IncidentLifecycle.resolved_at < resolved_to)
+        result = await self.session.execute(stmt)
+        return [SourceMttr(*row) for row in result.all()]
+
+    def _move_stats(self, before: tuple[str, str], after: tuple[str, str]) -> None:
+        if before != after:
+            self.stats_deltas[before] -= 1
+            self.stats_deltas[after] += 1
+
+    async def _guarded_update(
+        self, incident_id: UUID, allowed_statuses: Sequence[IncidentStatus], **values
+    ) -> GuardedWriteResult:
+        """UPDATE ... WHERE status IN (...) RETURNING одним запросом.
+
+        Внешний SELECT видит снимок таблицы до изменения, поэтому из одной строки
+        результата понятно, найден ли инцидент, каким был его статус и применилось
+        ли изменение. Условие на статус перепроверяется при блокировке строки,
+        что исключает гонку между чтением и записью.
+        """
+        written = (
+            update(Incident)
+            .where(
+                *incident_key(incident_id),
+                Incident.status.in_([status.value for status in allowed_statuses]),
+            )
+            .values(**values, version=Incident.version + 1)
+            .returning(*Incident.__table__.c)
+            .cte("written")
+        )
+        written_incident = aliased(Incident, written)
+        stmt = (
+            select(Incident.status, written_incident)
+            .outerjoin(written_incident, written_incident.id == Incident.id)
+            .where(*incident_key(incident_id))
+            .execution_options(populate_existing=True)
+        )
+        row = (await self.session.execute(stmt)).one_or_none()
+        if row is None:
+            return GuardedWriteResult(status_before=None, applied=False)
+        status_before, incident = row
+        if incident is not None:
+            self.changed_ids.add(incident_id)
+            self._move_stats((status_before, incident.source), (incident.status, incident.source))
+            if "status" in values:
+                self.events.append(
+                    IncidentEvent.of(IncidentEventType.STATUS_CHANGED, incident, previous_status=status_before)
+                )
+            if "description" in values:
+                self.events.append(IncidentEvent.of(IncidentEventType.DESCRIPTION_CHANGED, incident))
+        return GuardedWriteResult(IncidentStatus(status_before), incident is not None, incident)
@@ -0,0 +1,355 @@
+import heapq
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List, Optional, Sequence
+from uuid import UUID
+
+from core.enums import FINAL_STATUSES, IncidentEventType, IncidentSource, IncidentStatus
+from core.events import IncidentEvent
+from core.ids import uuid7
+from models.incident_archive import IncidentArchive
+from repositories.abstract_incident import GuardedWriteResult
+from repositories.mock_incident import MockIncidentRepository, as_utc
+from schemas.incident import IncidentCreate, IncidentFilter
+
+
+# Ключ упорядочивания, как у индекса (created_at, id) в БД
+SortKey = tuple[datetime, UUID]
+
+_MIN_UUID = UUID(int=0)
+
+
+class IncidentRecord:
+    """Инцидент в памяти: те же атрибуты, что у сущности Incident, без __dict__"""
+
+    __slots__ = ("id", "description", "status", "source", "created_at", "version")
+
+    def __init__(
+        self,
+        id: UUID,
+        description: str,
+        status: str,
+        source: str,
+        created_at: datetime,
+        version: int = 1,
+    ):
+        self.id = id
+        self.description = description
+        self.status = status
+        self.source = source
+        self.created_at = created_at
+        self.version = version
+
+    @property
+    def sort_key(self) -> SortKey:
+        return self.created_at, self.id
+
+    def copy(self) -> "IncidentRecord":
+        return IncidentRecord(self.id, self.description, self.status, self.source, self.created_at, self.version)
+
+    def __repr__(self) -> str:
+        return f"IncidentRecord(id={self.id}, status={self.status}, source={self.source})"
+
+
+class InMemoryIncidentRepository(MockIncidentRepository):
+    """Репозиторий в памяти с индексами для встраиваемого использования.
+
+    Порядок, фильтры и пагинация - как у IncidentRepository: по убыванию
+    (created_at, id). Вторичные индексы status -> ключи и source -> ключи
+    упорядочены по времени и обновляются при каждой записи, поэтому выборки
+    по статусу и страницы с фильтром не просматривают все инциденты.
+
+    Записи меняются только через методы репозитория: прямое присваивание
+    атрибутов возвращенной записи не обновит индексы. Изменения после begin()
+    отменяет rollback_changes() (см. InMemoryUnitOfWork). Журнал статусов,
+    MTTR и счетчики унаследованы от MockIncidentRepository.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._incidents: dict[UUID, IncidentRecord] = {}
+        self._order: list[SortKey] = []
+        self._by_status: dict[str, list[SortKey]] = {}
+        self._by_source: dict[str, list[SortKey]] = {}
+        self._key_by_incident: dict[UUID, tuple[str, str]] = {}
+        # Журнал отмены открытой транзакции: состояние до первого изменения
+        # (None - инцидента не было); вне транзакции не ведется
+        self._undo: Optional[dict[UUID, Optional[tuple[IncidentRecord, Optional[tuple[str, str]]]]]] = None
+
+    # Индексы
+
+    def _index(self, record: IncidentRecord) -> None:
+        key = record.sort_key
+        insort(self._order, key)
+        insort(self._by_status.setdefault(record.status, []), key)
+        insort(self._by_source.setdefault(record.source, []), key)
+
+    def _unindex(self, record: IncidentRecord) -> None:
+        key = record.sort_key
+        for keys in (self._order, self._by_status[record.status], self._by_source[record.source]):
+            del keys[bisect_left(keys, key)]
+
+    def _put(self, record: IncidentRecord) -> None:
+        self._incidents[record.id] = record
+        self._index(record)
+
+    def _remove(self, incident_id: UUID) -> Optional[IncidentRecord]:
+        record = self._incidents.pop(incident_id, None)
+        if record is not None:
+            self._unindex(record)
+            self._release_idempotency_key(incident_id)
+        return record
+
+    def _set_fields(self, record: IncidentRecord, values: dict) -> None:
+        """Изменить поля записи, переставив ее в индексах"""
+        self._unindex(record)
+        for field, value in values.items():
+            setattr(record, field, value)
+        # Ключи индексов сравнимы, только если все время - с часовым поясом
+        record.created_at = as_utc(record.created_at)
+        record.version += 1
+        self._index(record)
+
+    @staticmethod
+    def _descending(keys: list[SortKey], before: Optional[SortKey]) -> Iterator[SortKey]:
+        """Ключи меньше before по убыванию"""
+        position = len(keys) if before is None else bisect_left(keys, before)
+        for index in range(position - 1, -1, -1):
+            yield keys[index]
+
+    def _scan(self, after: Optional[SortKey], filters: Optional[IncidentFilter]) -> Iterator[IncidentRecord]:
+        """Инциденты по убыванию (created_at, id) строго после after, удовлетворяющие filters"""
+        before = (as_utc(after[0]), after[1]) if after is not None else None
+        if filters is not None and filters.created_to is not None:
+            upper = (as_utc(filters.created_to), _MIN_UUID)
+            before = upper if before is None else min(before, upper)
+        if filters is not None and filters.statuses:
+            # Слияние упорядоченных индексов нескольких статусов
+            keys = heapq.merge(
+                *(
+                    self._descending(self._by_status.get(status.value, []), before)
+                    for status in dict.fromkeys(filters.statuses)
+                ),
+                reverse=True,
+            )
+        elif filters is not None and filters.source is not None:
+            keys = self._descending(self._by_source.get(filters.source.value, []), before)
+        else:
+            keys = self._descending(self._order, before)
+        created_from = as_utc(filters.created_from) if filters is not None and filters.created_from else None
+        for created_at, incident_id in keys:
+            if created_from is not None and created_at < created_from:
+                return
+            record = self._incidents[incident_id]
+            if self._matches(record, filters):
+                yield record
+
+    # Чтение
+
+    async def get_all_incidents(self) -> List[IncidentRecord]:
+        """Получить все инциденты"""
+        return [self._incidents[incident_id] for _, incident_id in reversed(self._order)]
+
+    async def get_incidents_by_status(self, status: IncidentStatus) -> List[IncidentRecord]:
+        """Получить инциденты по статусу"""
+        keys = self._by_status.get(status.value, [])
+        return [self._incidents[incident_id] for _, incident_id in reversed(keys)]
+
+    async def get_incidents_page(
+        self,
+        limit: int,
+        after: Optional[SortKey] = None,
+        filters: Optional[IncidentFilter] = None,
+    ) -> List[IncidentRecord]:
+        """Получить страницу инцидентов, следующих за позицией (created_at, id)"""
+        page = []
+        for record in self._scan(after, filters):
+            if len(page) == limit:
+                break
+            page.append(record)
+        return page
+
+    # Запись
+
+    def _touch(self, incident_id: UUID) -> None:
+        """Запомнить состояние инцидента до первого изменения в транзакции"""
+        if self._undo is None or incident_id in self._undo:
+            return
+        record = self._incidents.get(incident_id)
+        self._undo[incident_id] = None if record is None else (record.copy(), self._key_by_incident.get(incident_id))
+
+    async def create_incident(
+        self,
+        description: str,
+        status: IncidentStatus = IncidentStatus.OPEN,
+        source: IncidentSource = IncidentSource.OPERATOR
+    ) -> IncidentRecord:
+        """Создать новый инцидент"""
+        record = IncidentRecord(uuid7(), description, status.value, source.value, datetime.now(timezone.utc))
+        self._touch(record.id)
+        self._put(record)
+        self.created_ids.add(record.id)
+        self.stats_deltas[(record.status, record.source)] += 1
+        self.events.append(IncidentEvent.of(IncidentEventType.CREATED, record))
+        return record
+
+    async def create_incidents_bulk(
+        self,
+        incidents: Sequence[IncidentCreate],
+        status: IncidentStatus = IncidentStatus.OPEN,
+    ) -> List[IncidentRecord]:
+        """Создать пакет инцидентов, сохраняя порядок входных данных"""
+        created = []
+        for incident in incidents:
+            key = (incident.source.value, incident.idempotency_key)
+            if incident.idempotency_key is not None and key in self._idempotency_keys:
+                created.append(self._incidents[self._idempotency_keys[key]])
+                continue
+            record = await self.create_incident(incident.description, status, incident.source)
+            if incident.idempotency_key is not None:
+                self._idempotency_keys[key] = record.id
+                self._key_by_incident[record.id] = key
+            created.append(record)
+        return created
+
+    async def update_incident(self, incident_id: UUID, **update_data) -> Optional[IncidentRecord]:
+        """Обновить инцидент"""
+        record = self._incidents.get(incident_id)
+        if record is None:
+            return None
+        counted_as = (record.status, record.source)
+        description_before = record.description
+        self._touch(incident_id)
+        self._set_fields(
+            record, {field: value for field, value in update_data.items() if field in IncidentRecord.__slots__}
+        )
+        self.changed_ids.add(incident_id)
+        self._move_stats(counted_as, (record.status, record.source))
+        if record.status != counted_as[0]:
+            self.events.append(
+                IncidentEvent.of(IncidentEventType.STATUS_CHANGED, record, previous_status=counted_as[0])
+            )
+        if record.description != description_before:
+            self.events.append(IncidentEvent.of(IncidentEventType.DESCRIPTION_CHANGED, record))
+        return record
+
+    async def delete_incident(self, incident_id: UUID) -> bool:
+        """Удалить инцидент"""
+        if incident_id not in self._incidents:
+            return False
+        self._touch(incident_id)
+        record = self._remove(incident_id)
+        self.changed_ids.add(incident_id)
+        self.stats_deltas[(record.status, record.source)] -= 1
+        self.events.append(IncidentEvent.of(IncidentEventType.DELETED, record))
+        return True
+
+    async def delete_incident_in_status(
+        self, incident_id: UUID, allowed_statuses: Sequence[IncidentStatus]
+    ) -> GuardedWriteResult:
+        """Удалить инцидент, если текущий статус входит в allowed_statuses"""
+        record = self._incidents.get(incident_id)
+        if record is None:
+            return GuardedWriteResult(status_before=None, applied=False)
+        status_before = IncidentStatus(record.status)
+        if status_before not in allowed_statuses:
+            return GuardedWriteResult(status_before, applied=False)
+        await self.delete_incident(incident_id)
+        return GuardedWriteResult(status_before, applied=True)
+
+    async def archive_incidents(self, older_than: timedelta, limit: int) -> int:
+        """Перенести в архив до limit решенных/отмененных инцидентов старше older_than"""
+        now = datetime.now(timezone.utc)
+        cutoff = (now - older_than, _MIN_UUID)
+        # Самые старые первыми: префиксы индексов закрытых статусов до cutoff
+        final_keys = [self._by_status.get(status.value, []) for status in FINAL_STATUSES]
+        candidates = list(heapq.merge(*(keys[:bisect_left(keys, cutoff)] for keys in final_keys)))[:limit]
+        for _, incident_id in candidates:
+            self._touch(incident_id)
+            record = self._remove(incident_id)
+            self._archive[incident_id] = IncidentArchive(
+                id=record.id,
+                description=record.description,
+                status=record.status,
+                source=record.source,
+                created_at=record.created_at,
+                version=record.version,
+                archived_at=now,
+            )
+            self.changed_ids.add(incident_id)
+        return len(candidates)
+
+    def _release_idempotency_key(self, incident_id: UUID) -> None:
+        key = self._key_by_incident.pop(incident_id, None)
+        if key is not None:
+            del self._idempotency_keys[key]
+
+    def _guarded_update(
+        self, incident_id: UUID, allowed_statuses: Sequence[IncidentStatus], **values
+    ) -> GuardedWriteResult:
+        record = self._incidents.get(incident_id)
+        if record is None:
+            return GuardedWriteResult(status_before=None, applied=False)
+        status_before = IncidentStatus(record.status)
+        if status_before not in allowed_statuses:
+            return GuardedWriteResult(status_before, applied=False)
+        counted_as = (record.status, record.source)
+        self._touch(incident_id)
+        self._set_fields(record, values)
+        self.changed_ids.add(incident_id)
+        self._move_stats(counted_as, (record.status, record.source))
+        if "status" in values:
+            self.events.append(
+                IncidentEvent.of(IncidentEventType.STATUS_CHANGED, record, previous_status=counted_as[0])
+            )
+        if "description" in values:
+            self.events.append(IncidentEvent.of(IncidentEventType.DESCRIPTION_CHANGED, record))
+        return GuardedWriteResult(status_before, applied=True, incident=record)
+
+    # Транзакции
+
+    def begin(self) -> None:
+        """Начать транзакцию: дальнейшие изменения можно отменить"""
+        self._undo = {}
+
+    def commit_changes(self) -> None:
+        """Закрепить изменения транзакции"""
+        self._undo = None
+
+    def rollback_changes(self) -> None:
+        """Вернуть инциденты, архив и ключи идемпотентности к началу транзакции"""
+        for incident_id, before in (self._undo or {}).items():
+            self._remove(incident_id)
+            self._archive.pop(incident_id, None)
+            if before is not None:
+                record, idempotency_key = before
+                self._put(record)
+                if idempotency_key is not None:
+                    self._idempotency_keys[idempotency_key] = incident_id
+                    self._key_by_incident[incident_id] = idempotency_key
+        self._undo = None
+
+    # Дополнительные методы для тестирования
+    def clear(self):
+        """Очистить все данные"""
+        super().clear()
+        self._order.clear()
+        self._by_status.clear()
+        self._by_source.clear()
+        self._idempotency_keys.clear()
+        self._key_by_incident.clear()
+        self._undo = None
+
+    def add_incident(self, incident):
+        """Добавить инцидент напрямую (для setup тестов)"""
+        self._remove(incident.id)
+        self._put(
+            IncidentRecord(
+                incident.id,
+                incident.description,
+                incident.status,
+                incident.source,
+                as_utc(incident.created_at),
+                incident.version or 1,
+            )
+        )
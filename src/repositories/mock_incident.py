@@ -1,9 +1,27 @@
-from uuid import UUID, uuid4
-from typing import Optional, List
-from datetime import datetime, timezone
-from repositories.abstract_incident import AbstractIncidentRepository
+from collections import Counter, namedtuple
+from uuid import UUID
+from typing import Any, AsyncIterator, Optional, List, Sequence
+from datetime import datetime, timedelta, timezone
+from repositories.abstract_incident import (
+    INCIDENT_ROW_FIELDS,
+    AbstractIncidentRepository,
+    GuardedWriteResult,
+    SourceMttr,
+)
 from models.incident import Incident
-from core.enums import IncidentStatus, IncidentSource
+from models.incident_archive import IncidentArchive
+from core.enums import ACTIVE_STATUSES, FINAL_STATUSES, IncidentEventType, IncidentStatus, IncidentSource
+from core.events import IncidentEvent
+from core.ids import uuid7
+from schemas.incident import IncidentCreate, IncidentFilter
+
+
+IncidentRow = namedtuple("IncidentRow", INCIDENT_ROW_FIELDS)
+
+
+def as_utc(value: datetime) -> datetime:
+    """Время с часовым поясом: наивные значения (как в колонках БД) считаются UTC"""
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
 
 
 class MockIncidentRepository(AbstractIncidentRepository):
@@ -11,6 +29,16 @@ class MockIncidentRepository(AbstractIncidentRepository):
     
     def __init__(self):
         self._incidents: dict[UUID, Incident] = {}
+        self.changed_ids: set[UUID] = set()
+        self.created_ids: set[UUID] = set()
+        self._collection_version = 1
+        self.stats_deltas: Counter[tuple[str, str]] = Counter()
+        self._stats: Counter[tuple[str, str]] = Counter()
+        self.events: list[IncidentEvent] = []
+        self.status_history: list[tuple[UUID, Optional[str], str, datetime]] = []
+        self.lifecycle: dict[UUID, dict[str, Any]] = {}
+        self._idempotency_keys: dict[tuple[str, str], UUID] = {}
+        self._archive: dict[UUID, IncidentArchive] = {}
 
     async def get_incident_by_id(self, incident_id: UUID) -> Optional[Incident]:
         """Получить инцидент по ID"""
@@ -27,6 +55,90 @@ class MockIncidentRepository(AbstractIncidentRepository):
             if incident.status == status.value
         ]
 
+    async def get_incidents_page(
+        self,
+        limit: int,
+        after: Optional[tuple[datetime, UUID]] = None,
+        filters: Optional[IncidentFilter] = None,
+    ) -> List[Incident]:
+        """Получить страницу инцидентов, следующих за позицией (created_at, id)"""
+        incidents = sorted(
+            (
+                incident for incident in self._incidents.values()
+                if self._matches(incident, filters)
+            ),
+            key=lambda incident: (incident.created_at, incident.id),
+            reverse=True,
+        )
+        if after:
+            incidents = [
+                incident for incident in incidents
+                if (incident.created_at, incident.id) < after
+            ]
+        return incidents[:limit]
+
+    async def get_incident_row(self, incident_id: UUID, fields: Sequence[str]) -> Optional[Any]:
+        """Получить только поля fields инцидента (объект с этими атрибутами)"""
+        incident = self._incidents.get(incident_id)
+        if incident is None:
+            return None
+        return namedtuple("IncidentRow", fields)(*(getattr(incident, field) for field in fields))
+
+    async def get_incident_rows_page(
+        self,
+        limit: int,
+        after: Optional[tuple[datetime, UUID]] = None,
+        filters: Optional[IncidentFilter] = None,
+        fields: Sequence[str] = INCIDENT_ROW_FIELDS,
+    ) -> Sequence[tuple]:
+        """То же, что get_incidents_page, но именованные кортежи из колонок fields"""
+        incidents = await self.get_incidents_page(limit, after, filters)
+        row_type = IncidentRow if tuple(fields) == INCIDENT_ROW_FIELDS else namedtuple("IncidentRow", fields)
+        return [row_type(*(getattr(incident, field) for field in fields)) for incident in incidents]
+
+    @staticmethod
+    def _matches(incident: Incident, filters: Optional[IncidentFilter]) -> bool:
+        if filters is None:
+            return True
+        if filters.statuses and incident.status not in {s.value for s in filters.statuses}:
+            return False
+        if filters.source and incident.source != filters.source.value:
+            return False
+        if filters.created_from and as_utc(incident.created_at) < as_utc(filters.created_from):
+            return False
+        if filters.created_to and as_utc(incident.created_at) >= as_utc(filters.created_to):
+            return False
+        return True
+
+    async def search_incidents(
+        self,
+        query: str,
+        limit: int,
+        after: Optional[tuple[float, UUID]] = None,
+        filters: Optional[IncidentFilter] = None,
+    ) -> List[tuple[Incident, float]]:
+        """Найти инциденты по описанию, по убыванию релевантности"""
+        # Упрощенная релевантность: доля слов запроса, встречающихся в описании
+        words = query.lower().split()
+        hits = []
+        for incident in self._incidents.values():
+            if not self._matches(incident, filters):
+                continue
+            description = incident.description.lower()
+            rank = sum(word in description for word in words) / len(words)
+            if rank and (after is None or (rank, incident.id) < after):
+                hits.append((incident, rank))
+        hits.sort(key=lambda hit: (hit[1], hit[0].id), reverse=True)
+        return hits[:limit]
+
+    async def stream_incidents(
+        self, chunk_size: int, filters: Optional[IncidentFilter] = None
+    ) -> AsyncIterator[Sequence[Incident]]:
+        """Потоково читать инциденты порциями фиксированного размера"""
+        incidents = await self.get_incidents_page(len(self._incidents), filters=filters)
+        for start in range(0, len(incidents), chunk_size):
+            yield incidents[start:start + chunk_size]
+
     async def create_incident(
         self, 
         description: str, 
@@ -34,7 +146,7 @@ class MockIncidentRepository(AbstractIncidentRepository):
         source: IncidentSource = IncidentSource.OPERATOR
     ) -> Incident:
         """Создать новый инцидент"""
-        incident_id = uuid4()
+        incident_id = uuid7()
         
         # Создаем mock объект с нужными атрибутами
         incident = type('MockIncident', (), {
@@ -42,29 +154,69 @@ class MockIncidentRepository(AbstractIncidentRepository):
             'description': description,
             'status': status.value,
             'source': source.value,
-            'created_at': datetime.now(timezone.utc)
+            'created_at': datetime.now(timezone.utc),
+            'version': 1,
         })()
         
         self._incidents[incident_id] = incident
+        self.created_ids.add(incident_id)
+        self.stats_deltas[(incident.status, incident.source)] += 1
+        self.events.append(IncidentEvent.of(IncidentEventType.CREATED, incident))
         return incident
 
+    async def create_incidents_bulk(
+        self,
+        incidents: Sequence[IncidentCreate],
+        status: IncidentStatus = IncidentStatus.OPEN,
+    ) -> List[Incident]:
+        """Создать пакет инцидентов, сохраняя порядок входных данных"""
+        created = []
+        for incident in incidents:
+            key = (incident.source.value, incident.idempotency_key)
+            if incident.idempotency_key is not None and key in self._idempotency_keys:
+                created.append(self._incidents[self._idempotency_keys[key]])
+                continue
+            created.append(
+                await self.create_incident(
+                    description=incident.description, status=status, source=incident.source
+                )
+            )
+            if incident.idempotency_key is not None:
+                self._idempotency_keys[key] = created[-1].id
+        return created
+
     async def update_incident(self, incident_id: UUID, **update_data) -> Optional[Incident]:
         """Обновить инцидент"""
         incident = self._incidents.get(incident_id)
         if not incident:
             return None
+        counted_as = (incident.status, incident.source)
+        description_before = incident.description
 
         # Обновляем атрибуты
         for field, value in update_data.items():
             if hasattr(incident, field):
                 setattr(incident, field, value)
+        incident.version += 1
 
+        self.changed_ids.add(incident_id)
+        self._move_stats(counted_as, (incident.status, incident.source))
+        if incident.status != counted_as[0]:
+            self.events.append(
+                IncidentEvent.of(IncidentEventType.STATUS_CHANGED, incident, previous_status=counted_as[0])
+            )
+        if incident.description != description_before:
+            self.events.append(IncidentEvent.of(IncidentEventType.DESCRIPTION_CHANGED, incident))
         return incident
 
     async def delete_incident(self, incident_id: UUID) -> bool:
         """Удалить инцидент"""
         if incident_id in self._incidents:
-            del self._incidents[incident_id]
+            incident = self._incidents.pop(incident_id)
+            self._release_idempotency_key(incident_id)
+            self.changed_ids.add(incident_id)
+            self.stats_deltas[(incident.status, incident.source)] -= 1
+            self.events.append(IncidentEvent.of(IncidentEventType.DELETED, incident))
             return True
         return False
 
@@ -72,10 +224,215 @@ class MockIncidentRepository(AbstractIncidentRepository):
         """Обновить статус инцидента"""
         return await self.update_incident(incident_id, status=status.value)
 
+    async def transition_incident_status(
+        self,
+        incident_id: UUID,
+        new_status: IncidentStatus,
+        allowed_from: Sequence[IncidentStatus],
+    ) -> GuardedWriteResult:
+        """Сменить статус, если текущий статус входит в allowed_from"""
+        return self._guarded_update(incident_id, allowed_from, status=new_status.value)
+
+    async def transition_incidents_status(
+        self,
+        incident_ids: Sequence[UUID],
+        new_status: IncidentStatus,
+        allowed_from: Sequence[IncidentStatus],
+    ) -> dict[UUID, GuardedWriteResult]:
+        """Сменить статус пакета инцидентов одним запросом"""
+        return {
+            incident_id: self._guarded_update(incident_id, allowed_from, status=new_status.value)
+            for incident_id in dict.fromkeys(incident_ids)
+        }
+
+    async def update_incident_description(
+        self,
+        incident_id: UUID,
+        description: str,
+        allowed_statuses: Sequence[IncidentStatus],
+    ) -> GuardedWriteResult:
+        """Обновить описание, если текущий статус входит в allowed_statuses"""
+        return self._guarded_update(incident_id, allowed_statuses, description=description)
+
+    async def delete_incident_in_status(
+        self, incident_id: UUID, allowed_statuses: Sequence[IncidentStatus]
+    ) -> GuardedWriteResult:
+        """Удалить инцидент, если текущий статус входит в allowed_statuses"""
+        incident = self._incidents.get(incident_id)
+        if not incident:
+            return GuardedWriteResult(status_before=None, applied=False)
+        status_before = IncidentStatus(incident.status)
+        if status_before not in allowed_statuses:
+            return GuardedWriteResult(status_before, applied=False)
+        del self._incidents[incident_id]
+        self._release_idempotency_key(incident_id)
+        self.changed_ids.add(incident_id)
+        self.stats_deltas[(incident.status, incident.source)] -= 1
+        self.events.append(IncidentEvent.of(IncidentEventType.DELETED, incident))
+        return GuardedWriteResult(status_before, applied=True)
+
+    async def get_incident_version(self, incident_id: UUID) -> Optional[int]:
+        """Получить версию инцидента без чтения остальных полей"""
+        incident = self._incidents.get(incident_id)
+        return incident.version if incident else None
+
+    async def get_collection_version(self) -> int:
+        """Получить текущее значение счетчика изменений коллекции"""
+        return self._collection_version
+
+    async def bump_collection_version(self) -> None:
+        """Увеличить счетчик изменений коллекции"""
+        self._collection_version += 1
+
+    async def apply_stats_deltas(self) -> None:
+        """Перенести накопленные изменения счетчиков в хранилище"""
+        self._stats.update(self.stats_deltas)
+        self.stats_deltas.clear()
+
+    async def get_incident_stats(self) -> List[tuple[str, str, int]]:
+        """Получить количество инцидентов по парам (status, source)"""
+        return [(status, source, count) for (status, source), count in self._stats.items()]
+
+    async def rebuild_incident_stats(self) -> None:
+        """Пересчитать счетчики по самим инцидентам (включая архив)"""
+        self._stats = Counter(
+            (incident.status, incident.source)
+            for incident in (*self._incidents.values(), *self._archive.values())
+        )
+        self.stats_deltas.clear()
+
+    async def archive_incidents(self, older_than: timedelta, limit: int) -> int:
+        """Перенести в архив до limit решенных/отмененных инцидентов старше older_than"""
+        cutoff = datetime.now(timezone.utc) - older_than
+        final = {status.value for status in FINAL_STATUSES}
+        candidates = [
+            incident for incident in self._incidents.values()
+            if incident.status in final and incident.created_at < cutoff
+        ][:limit]
+        for incident in candidates:
+            del self._incidents[incident.id]
+            self._release_idempotency_key(incident.id)
+            self._archive[incident.id] = IncidentArchive(
+                id=incident.id,
+                description=incident.description,
+                status=incident.status,
+                source=incident.source,
+                created_at=incident.created_at,
+                version=incident.version,
+                archived_at=datetime.now(timezone.utc),
+            )
+            self.changed_ids.add(incident.id)
+        return len(candidates)
+
+    async def get_archived_incident(self, incident_id: UUID) -> Optional[IncidentArchive]:
+        """Получить архивный инцидент по ID"""
+        return self._archive.get(incident_id)
+
+    async def record_status_history(self, events: Sequence[IncidentEvent]) -> None:
+        """Записать смены статусов в журнал и обновить агрегаты жизненного цикла"""
+        now = datetime.now(timezone.utc)
+        for event in events:
+            if event.type == IncidentEventType.CREATED:
+                self.status_history.append((event.id, None, event.status, now))
+                self.lifecycle[event.id] = {
+                    "source": event.source,
+                    "created_at": event.created_at,
+                    "status": event.status,
+                    "status_since": event.created_at,
+                    **{f"{status.value}_seconds": 0.0 for status in ACTIVE_STATUSES},
+                    "resolved_at": None,
+                    "resolve_seconds": None,
+                }
+            elif event.type == IncidentEventType.STATUS_CHANGED:
+                self.status_history.append((event.id, event.previous_status, event.status, now))
+                record = self.lifecycle.get(event.id)
+                if record is None:
+                    continue
+                if event.previous_status in {status.value for status in ACTIVE_STATUSES}:
+                    in_status = (now - record["status_since"]).total_seconds()
+                    record[f"{event.previous_status}_seconds"] += in_status
+                record["status"] = event.status
+                record["status_since"] = now
+                if event.status == IncidentStatus.RESOLVED.value:
+                    record["resolved_at"] = now
+                    record["resolve_seconds"] = (now - record["created_at"]).total_seconds()
+
+    async def get_mttr_by_source(
+        self, resolved_from: Optional[datetime] = None, resolved_to: Optional[datetime] = None
+    ) -> List[SourceMttr]:
+        """Получить перцентили времени решения по источникам"""
+        by_source: dict[str, list[dict[str, Any]]] = {}
+        for record in self.lifecycle.values():
+            resolved_at = record["resolved_at"]
+            if resolved_at is None:
+                continue
+            if resolved_from and resolved_at < resolved_from:
+                continue
+            if resolved_to and resolved_at >= resolved_to:
+                continue
+            by_source.setdefault(record["source"], []).append(record)
+        result = []
+        for source, records in sorted(by_source.items()):
+            seconds = sorted(record["resolve_seconds"] for record in records)
+            result.append(
+                SourceMttr(
+                    source,
+                    len(records),
+                    *(self._percentile(seconds, fraction) for fraction in (0.5, 0.9, 0.99)),
+                    *(
+                        sum(record[f"{status.value}_seconds"] for record in records) / len(records)
+                        for status in ACTIVE_STATUSES
+                    ),
+                )
+            )
+        return result
+
+    @staticmethod
+    def _percentile(values: Sequence[float], fraction: float) -> float:
+        """Перцентиль с линейной интерполяцией, как percentile_cont"""
+        position = fraction * (len(values) - 1)
+        lower = int(position)
+        upper = min(lower + 1, len(values) - 1)
+        return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+    def _release_idempotency_key(self, incident_id: UUID) -> None:
+        self._idempotency_keys = {
+            key: owner for key, owner in self._idempotency_keys.items() if owner != incident_id
+        }
+
+    def _move_stats(self, before: tuple[str, str], after: tuple[str, str]) -> None:
+        if before != after:
+            self.stats_deltas[before] -= 1
+            self.stats_deltas[after] += 1
+
+    def _guarded_update(
+        self, incident_id: UUID, allowed_statuses: Sequence[IncidentStatus], **values
+    ) -> GuardedWriteResult:
+        incident = self._incidents.get(incident_id)
+        if not incident:
+            return GuardedWriteResult(status_before=None, applied=False)
+        status_before = IncidentStatus(incident.status)
+        if status_before not in allowed_statuses:
+            return GuardedWriteResult(status_before, applied=False)
+        counted_as = (incident.status, incident.source)
+        for field, value in values.items():
+            setattr(incident, field, value)
+        incident.version += 1
+        self.changed_ids.add(incident_id)
+        self._move_stats(counted_as, (incident.status, incident.source))
+        if "status" in values:
+            self.events.append(
+                IncidentEvent.of(IncidentEventType.STATUS_CHANGED, incident, previous_status=counted_as[0])
+            )
+        if "description" in values:
+            self.events.append(IncidentEvent.of(IncidentEventType.DESCRIPTION_CHANGED, incident))
+        return GuardedWriteResult(status_before, applied=True, incident=incident)
+
     # Дополнительные методы для тестирования
     def clear(self):
         """Очистить все данные"""
         self._incidents.clear()
+        self._archive.clear()
 
     def add_incident(self, incident: Incident):
         """Добавить инцидент напрямую (для setup тестов)"""
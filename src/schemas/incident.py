@@ -1,13 +1,33 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+from functools import lru_cache
+from pydantic import BaseModel, Field, create_model, field_validator, model_validator
+from typing import Any, Dict, List, Optional
 from uuid import UUID
-from datetime import datetime
+from datetime import datetime, timezone
 from core.enums import IncidentStatus, IncidentSource
 
 
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+
 class IncidentCreate(BaseModel):
     description: str = Field(..., min_length=1, max_length=4000)
     source: IncidentSource
+    # Повтор с тем же ключом (в пределах источника) возвращает исходный инцидент
+    idempotency_key: Optional[str] = Field(None, min_length=1, max_length=IDEMPOTENCY_KEY_MAX_LENGTH)
+
+
+BULK_CREATE_MAX_ITEMS = 5000
+
+
+class IncidentBulkCreate(BaseModel):
+    # Элементы валидируются по схеме IncidentCreate по отдельности,
+    # чтобы одна некорректная запись не отклоняла весь пакет
+    items: List[Dict[str, Any]] = Field(
+        ...,
+        min_length=1,
+        max_length=BULK_CREATE_MAX_ITEMS,
+        description="Список объектов IncidentCreate",
+    )
 
 
 class IncidentOut(BaseModel):
@@ -16,14 +36,173 @@ class IncidentOut(BaseModel):
     status: IncidentStatus
     source: IncidentSource
     created_at: datetime
+    version: int
 
     model_config = {
         "from_attributes": True,
     }
 
 
+INCIDENT_FIELDS = tuple(IncidentOut.model_fields)
+
+
+def parse_incident_fields(raw: str) -> tuple[str, ...]:
+    """Разобрать параметр fields ("id,status") в поля в порядке IncidentOut"""
+    requested = {name.strip() for name in raw.split(",") if name.strip()}
+    if not requested:
+        raise ValueError("fields must list at least one field")
+    unknown = requested.difference(INCIDENT_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(name for name in INCIDENT_FIELDS if name in requested)
+
+
+def with_fields(fields: tuple[str, ...], *required: str) -> tuple[str, ...]:
+    """Поля fields плюс обязательные, в порядке IncidentOut"""
+    wanted = set(fields).union(required)
+    return tuple(name for name in INCIDENT_FIELDS if name in wanted)
+
+
+@lru_cache(maxsize=2 ** len(INCIDENT_FIELDS))
+def incident_projection_model(fields: tuple[str, ...]) -> type[BaseModel]:
+    """Схема IncidentOut только с полями fields; создается один раз на набор полей"""
+    return create_model(
+        "IncidentOut_" + "_".join(fields),
+        __config__={"from_attributes": True},
+        **{
+            name: (IncidentOut.model_fields[name].annotation, IncidentOut.model_fields[name])
+            for name in fields
+        },
+    )
+
+
+class IncidentBulkItemResult(BaseModel):
+    index: int
+    success: bool
+    incident: Optional[IncidentOut] = None
+    error: Optional[str] = None
+    # Инцидент создан ранее запросом с тем же ключом идемпотентности
+    replayed: bool = False
+
+
+class IncidentBulkResult(BaseModel):
+    created: int
+    failed: int
+    replayed: int = 0
+    items: List[IncidentBulkItemResult]
+
+
+class IncidentFilter(BaseModel):
+    statuses: Optional[List[IncidentStatus]] = None
+    source: Optional[IncidentSource] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+
+    @field_validator("created_from", "created_to")
+    @classmethod
+    def to_naive_utc(cls, value: Optional[datetime]) -> Optional[datetime]:
+        # incidents.created_at - timestamp without time zone в UTC: asyncpg не
+        # сравнивает его со значением с часовым поясом
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+    @model_validator(mode="after")
+    def check_created_range(self) -> "IncidentFilter":
+        if self.created_from and self.created_to and self.created_from > self.created_to:
+            raise ValueError("created_from must not be later than created_to")
+        return self
+
+
+class IncidentPage(BaseModel):
+    items: List[IncidentOut]
+    next_cursor: Optional[str] = None
+
+
+SEARCH_QUERY_MIN_LENGTH = 3
+SEARCH_QUERY_MAX_LENGTH = 200
+
+
+class IncidentSearchHit(IncidentOut):
+    """Найденный инцидент с релевантностью"""
+    rank: float
+
+
+class IncidentSearchPage(BaseModel):
+    items: List[IncidentSearchHit]
+    next_cursor: Optional[str] = None
+
+
 class IncidentStatusUpdate(BaseModel):
     status: IncidentStatus
 
+
+BULK_STATUS_MAX_ITEMS = 1000
+
+
+class IncidentBulkStatusUpdate(BaseModel):
+    ids: List[UUID] = Field(..., min_length=1, max_length=BULK_STATUS_MAX_ITEMS)
+    status: IncidentStatus
+
+
+class IncidentStatusRejected(BaseModel):
+    """Инцидент, из текущего статуса которого переход недопустим"""
+    id: UUID
+    status: IncidentStatus
+
+
+class IncidentBulkStatusResult(BaseModel):
+    """Итог пакетной смены статуса"""
+    changed: List[UUID]
+    invalid: List[IncidentStatusRejected]
+    missing: List[UUID]
+
+
 class IncidentDescriptionUpdate(BaseModel):
-    new_description: str = Field(..., min_length=1, max_length=500)
\ No newline at end of file
+    new_description: str = Field(..., min_length=1, max_length=500)
+
+
+class IncidentStatsItem(BaseModel):
+    """Количество инцидентов для пары статус/источник"""
+    status: IncidentStatus
+    source: IncidentSource
+    count: int
+
+
+class IncidentStatsOut(BaseModel):
+    """Статистика инцидентов по статусам и источникам"""
+    total: int
+    by_status: Dict[IncidentStatus, int]
+    by_source: Dict[IncidentSource, int]
+    items: List[IncidentStatsItem]
+
+
+class SourceMttrOut(BaseModel):
+    """Время решения инцидентов источника, секунды"""
+    source: IncidentSource
+    resolved: int
+    p50: float
+    p90: float
+    p99: float
+    # Среднее время, проведенное решенными инцидентами в каждом статусе
+    avg_time_in_status: Dict[IncidentStatus, float]
+
+
+class MttrReport(BaseModel):
+    """MTTR по источникам за интервал решения"""
+    resolved_from: Optional[datetime] = None
+    resolved_to: Optional[datetime] = None
+    items: List[SourceMttrOut]
+
+
+class IncidentArchivedOut(IncidentOut):
+    """Инцидент из архива"""
+    archived_at: datetime
+
+
+class ArchiveResult(BaseModel):
+    """Итог переноса закрытых инцидентов в архив"""
+    archived: int
+    batches: int
+    # False - остановились по max_batches, кандидаты еще остались
+    done: bool
@@ -0,0 +1,59 @@
+"""
+Кодирование порций инцидентов для потоковой выгрузки
+"""
+
+import csv
+import io
+import json
+from typing import Callable, Sequence
+
+from core.enums import ExportFormat
+from models.incident import Incident
+
+
+EXPORT_COLUMNS = ("id", "description", "status", "source", "created_at")
+
+EXPORT_MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv; charset=utf-8",
+}
+
+
+def _row_values(incident: Incident) -> tuple:
+    return (
+        str(incident.id),
+        incident.description,
+        incident.status,
+        incident.source,
+        incident.created_at.isoformat(),
+    )
+
+
+def encode_ndjson_chunk(incidents: Sequence[Incident]) -> bytes:
+    """Закодировать порцию инцидентов в NDJSON (по объекту на строку)"""
+    lines = [
+        json.dumps(dict(zip(EXPORT_COLUMNS, _row_values(incident))), ensure_ascii=False)
+        for incident in incidents
+    ]
+    return ("\n".join(lines) + "\n").encode()
+
+
+def encode_csv_chunk(incidents: Sequence[Incident]) -> bytes:
+    """Закодировать порцию инцидентов в строки CSV"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(_row_values(incident) for incident in incidents)
+    return buffer.getvalue().encode()
+
+
+def csv_header() -> bytes:
+    """Строка заголовка CSV"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(EXPORT_COLUMNS)
+    return buffer.getvalue().encode()
+
+
+CHUNK_ENCODERS: dict[ExportFormat, Callable[[Sequence[Incident]], bytes]] = {
+    ExportFormat.NDJSON: encode_ndjson_chunk,
+    ExportFormat.CSV: encode_csv_chunk,
+}
@@ -1,11 +1,40 @@
+import asyncio
+from datetime import datetime, timedelta
 from uuid import UUID
-from typing import List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
+from pydantic import BaseModel, ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from core.idempotency import IdempotencyKeyConflictError, check_replay, recent_idempotency_keys
 from core.unit_of_work import AbstractUnitOfWork
-from schemas.incident import IncidentCreate, IncidentOut, IncidentStatusUpdate
+from core.pagination import decode_cursor, decode_search_cursor, encode_cursor, encode_search_cursor
+from schemas.incident import (
+    ArchiveResult,
+    IncidentArchivedOut,
+    IncidentBulkItemResult,
+    IncidentBulkResult,
+    IncidentBulkStatusResult,
+    IncidentBulkStatusUpdate,
+    IncidentCreate,
+    IncidentFilter,
+    IncidentOut,
+    IncidentPage,
+    IncidentSearchHit,
+    IncidentSearchPage,
+    IncidentStatsItem,
+    IncidentStatsOut,
+    IncidentStatusRejected,
+    IncidentStatusUpdate,
+    MttrReport,
+    SourceMttrOut,
+    INCIDENT_FIELDS,
+    incident_projection_model,
+    with_fields,
+)
 from models.incident import Incident
-from core.enums import IncidentStatus, IncidentSource
+from services.export import CHUNK_ENCODERS, csv_header
+from services.serialization import encode_incident_page
+from core.enums import ACTIVE_STATUSES, FINAL_STATUSES, ExportFormat, IncidentStatus, IncidentSource
 
 
 class IncidentNotFoundError(Exception):
@@ -27,6 +56,88 @@ class IncidentService:
                 raise IncidentNotFoundError(incident_id)
             return IncidentOut.model_validate(incident)
 
+    async def get_incident_version(self, incident_id: UUID) -> int:
+        """Получить версию инцидента для ETag"""
+        async with self.uow:
+            version = await self.uow.incidents.get_incident_version(incident_id)
+            if version is None:
+                raise IncidentNotFoundError(incident_id)
+            return version
+
+    async def get_collection_version(self) -> int:
+        """Получить версию коллекции инцидентов для ETag"""
+        async with self.uow:
+            return await self.uow.incidents.get_collection_version()
+
+    async def get_incident_stats(self) -> IncidentStatsOut:
+        """Получить статистику инцидентов из таблицы счетчиков"""
+        async with self.uow:
+            rows = await self.uow.incidents.get_incident_stats()
+        return self._build_stats(rows)
+
+    async def rebuild_incident_stats(self) -> IncidentStatsOut:
+        """Пересчитать счетчики с нуля и вернуть новую статистику"""
+        async with self.uow:
+            await self.uow.incidents.rebuild_incident_stats()
+            rows = await self.uow.incidents.get_incident_stats()
+        return self._build_stats(rows)
+
+    async def archive_closed_incidents(
+        self,
+        older_than: timedelta,
+        batch_size: int,
+        pause_seconds: float = 0.0,
+        max_batches: Optional[int] = None,
+    ) -> ArchiveResult:
+        """Перенести решенные и отмененные инциденты старше older_than в архив.
+
+        Каждый пакет - отдельная короткая транзакция, между пакетами пауза,
+        чтобы перенос не вытеснял обычную нагрузку.
+        """
+        archived = batches = 0
+        while max_batches is None or batches < max_batches:
+            async with self.uow:
+                moved = await self.uow.incidents.archive_incidents(older_than, batch_size)
+            archived += moved
+            batches += 1
+            if moved < batch_size:
+                return ArchiveResult(archived=archived, batches=batches, done=True)
+            if pause_seconds:
+                await asyncio.sleep(pause_seconds)
+        return ArchiveResult(archived=archived, batches=batches, done=False)
+
+    async def get_archived_incident(self, incident_id: UUID) -> IncidentArchivedOut:
+        """Получить инцидент из архива"""
+        async with self.uow:
+            incident = await self.uow.incidents.get_archived_incident(incident_id)
+            if not incident:
+                raise IncidentNotFoundError(incident_id)
+            return IncidentArchivedOut.model_validate(incident)
+
+    async def get_mttr_report(
+        self, resolved_from: Optional[datetime] = None, resolved_to: Optional[datetime] = None
+    ) -> MttrReport:
+        """Получить MTTR по источникам из агрегатов жизненного цикла"""
+        if resolved_from and resolved_to and resolved_from >= resolved_to:
+            raise ValueError("resolved_from must be earlier than resolved_to")
+        async with self.uow:
+            rows = await self.uow.incidents.get_mttr_by_source(resolved_from, resolved_to)
+        items = [
+            SourceMttrOut(
+                source=row.source,
+                resolved=row.resolved,
+                p50=row.p50,
+                p90=row.p90,
+                p99=row.p99,
+                avg_time_in_status={
+                    status: seconds
+                    for status, seconds in zip(ACTIVE_STATUSES, (row.avg_open, row.avg_in_progress, row.avg_waiting))
+                },
+            )
+            for row in rows
+        ]
+        return MttrReport(resolved_from=resolved_from, resolved_to=resolved_to, items=items)
+
     async def get_all_incidents(self) -> List[IncidentOut]:
         """Получить все инциденты"""
         async with self.uow:
@@ -39,6 +150,103 @@ class IncidentService:
             incidents = await self.uow.incidents.get_incidents_by_status(status)
             return [IncidentOut.model_validate(incident) for incident in incidents]
 
+    async def get_incidents_page(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        filters: Optional[IncidentFilter] = None,
+    ) -> IncidentPage:
+        """Получить страницу инцидентов с курсором на следующую"""
+        after = decode_cursor(cursor) if cursor else None
+        async with self.uow:
+            # Запрашиваем на одну запись больше, чтобы узнать, есть ли следующая страница
+            incidents = await self.uow.incidents.get_incidents_page(
+                limit=limit + 1, after=after, filters=filters
+            )
+            items = [IncidentOut.model_validate(incident) for incident in incidents[:limit]]
+            next_cursor = None
+            if len(incidents) > limit:
+                last = items[-1]
+                next_cursor = encode_cursor(last.created_at, last.id)
+            return IncidentPage(items=items, next_cursor=next_cursor)
+
+    async def get_incidents_page_json(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        filters: Optional[IncidentFilter] = None,
+        fields: Optional[tuple[str, ...]] = None,
+    ) -> bytes:
+        """То же, что get_incidents_page, но сразу JSON-ответ.
+
+        Строки читаются кортежами и кодируются без сущностей ORM и моделей
+        Pydantic: данные из БД уже соответствуют схеме IncidentPage.
+        fields - поля элементов ответа; из БД читаются только они и ключ курсора.
+        """
+        after = decode_cursor(cursor) if cursor else None
+        columns = with_fields(fields, "created_at", "id") if fields else INCIDENT_FIELDS
+        async with self.uow:
+            rows = await self.uow.incidents.get_incident_rows_page(
+                limit=limit + 1, after=after, filters=filters, fields=columns
+            )
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = encode_cursor(last.created_at, last.id)
+        return encode_incident_page(rows[:limit], next_cursor, columns, fields)
+
+    async def get_incident_fields(
+        self, incident_id: UUID, fields: tuple[str, ...]
+    ) -> tuple[BaseModel, int]:
+        """Получить только поля fields инцидента и его версию (для ETag)"""
+        async with self.uow:
+            row = await self.uow.incidents.get_incident_row(
+                incident_id, with_fields(fields, "version")
+            )
+            if row is None:
+                raise IncidentNotFoundError(incident_id)
+            return incident_projection_model(fields).model_validate(row), row.version
+
+    async def search_incidents(
+        self,
+        query: str,
+        limit: int,
+        cursor: Optional[str] = None,
+        filters: Optional[IncidentFilter] = None,
+    ) -> IncidentSearchPage:
+        """Найти инциденты по описанию с курсором на следующую страницу"""
+        after = decode_search_cursor(cursor) if cursor else None
+        async with self.uow:
+            hits = await self.uow.incidents.search_incidents(
+                query, limit=limit + 1, after=after, filters=filters
+            )
+            items = [
+                IncidentSearchHit.model_validate(
+                    {**IncidentOut.model_validate(incident).model_dump(), "rank": rank}
+                )
+                for incident, rank in hits[:limit]
+            ]
+            next_cursor = None
+            if len(hits) > limit:
+                last = items[-1]
+                next_cursor = encode_search_cursor(last.rank, last.id)
+            return IncidentSearchPage(items=items, next_cursor=next_cursor)
+
+    async def export_incidents(
+        self,
+        export_format: ExportFormat,
+        chunk_size: int,
+        filters: Optional[IncidentFilter] = None,
+    ) -> AsyncIterator[bytes]:
+        """Потоково выгрузить инциденты в формате NDJSON или CSV"""
+        encode_chunk = CHUNK_ENCODERS[export_format]
+        if export_format == ExportFormat.CSV:
+            # Заголовок отдаем сразу, не дожидаясь первой порции из БД
+            yield csv_header()
+        async with self.uow:
+            async for chunk in self.uow.incidents.stream_incidents(chunk_size, filters):
+                yield encode_chunk(chunk)
+
     async def create_incident(self, incident_data: IncidentCreate) -> IncidentOut:
         """Создать новый инцидент"""
         async with self.uow:
@@ -49,56 +257,175 @@ class IncidentService:
             )
             return IncidentOut.model_validate(incident)
 
+    async def find_replay(self, incident_data: IncidentCreate) -> Optional[IncidentOut]:
+        """Ответ на повтор по недавно использованному ключу идемпотентности.
+
+        Инцидент читается через кэш, без транзакции записи. None - ключ не
+        встречался этому процессу, и его проверит create_incident_idempotent.
+        """
+        if incident_data.idempotency_key is None:
+            return None
+        incident_id = recent_idempotency_keys.get(incident_data.source, incident_data.idempotency_key)
+        if incident_id is None:
+            return None
+        async with self.uow:
+            incident = await self.uow.incidents.get_incident_by_id(incident_id)
+        if incident is None:
+            return None
+        check_replay(incident_data, incident)
+        return IncidentOut.model_validate(incident)
+
+    async def create_incident_idempotent(self, incident_data: IncidentCreate) -> tuple[IncidentOut, bool]:
+        """Создать инцидент с учетом ключа идемпотентности.
+
+        Возвращает инцидент и признак того, что он создан этим запросом
+        (False - повтор, возвращен исходный инцидент).
+        """
+        if incident_data.idempotency_key is None:
+            return await self.create_incident(incident_data), True
+        async with self.uow:
+            (incident,) = await self.uow.incidents.create_incidents_bulk(
+                [incident_data], status=IncidentStatus.OPEN
+            )
+            created = incident.id in self.uow.incidents.created_ids
+            if not created:
+                check_replay(incident_data, incident)
+            result = IncidentOut.model_validate(incident)
+        recent_idempotency_keys.add(incident_data.source, incident_data.idempotency_key, result.id)
+        return result, created
+
+    async def create_incidents_bulk(self, items: List[Dict[str, Any]]) -> IncidentBulkResult:
+        """Создать пакет инцидентов с результатом по каждому элементу"""
+        results: List[Optional[IncidentBulkItemResult]] = [None] * len(items)
+        valid: List[tuple[int, IncidentCreate]] = []
+        for index, item in enumerate(items):
+            try:
+                valid.append((index, IncidentCreate.model_validate(item)))
+            except ValidationError as e:
+                results[index] = IncidentBulkItemResult(
+                    index=index, success=False, error=self._format_validation_error(e)
+                )
+
+        if valid:
+            async with self.uow:
+                incidents = await self.uow.incidents.create_incidents_bulk(
+                    [incident_data for _, incident_data in valid],
+                    status=IncidentStatus.OPEN,  # Новые инциденты всегда открыты
+                )
+                seen: set[UUID] = set()
+                for (index, incident_data), incident in zip(valid, incidents):
+                    results[index] = self._bulk_item_result(index, incident_data, incident, seen)
+                    seen.add(incident.id)
+            for index, incident_data in valid:
+                if incident_data.idempotency_key is not None and results[index].success:
+                    recent_idempotency_keys.add(
+                        incident_data.source, incident_data.idempotency_key, results[index].incident.id
+                    )
+
+        succeeded = [result for result in results if result.success]
+        replayed = sum(result.replayed for result in succeeded)
+        return IncidentBulkResult(
+            created=len(succeeded) - replayed,
+            failed=len(items) - len(succeeded),
+            replayed=replayed,
+            items=results,
+        )
+
+    def _bulk_item_result(
+        self, index: int, incident_data: IncidentCreate, incident: Incident, seen: set[UUID]
+    ) -> IncidentBulkItemResult:
+        """Результат элемента пакета; повтор ключа проверяется на совпадение с исходным запросом"""
+        replayed = incident_data.idempotency_key is not None and (
+            incident.id in seen or incident.id not in self.uow.incidents.created_ids
+        )
+        if replayed:
+            try:
+                check_replay(incident_data, incident)
+            except IdempotencyKeyConflictError as e:
+                return IncidentBulkItemResult(index=index, success=False, error=str(e))
+        return IncidentBulkItemResult(
+            index=index, success=True, incident=IncidentOut.model_validate(incident), replayed=replayed
+        )
+
     async def update_incident_status(self, incident_id: UUID, status_update: IncidentStatusUpdate) -> IncidentOut:
         """Обновить статус инцидента"""
+        new_status = status_update.status
         async with self.uow:
-            # Проверяем существование инцидента
-            existing_incident = await self.uow.incidents.get_incident_by_id(incident_id)
-            if not existing_incident:
+            # Проверка перехода выполняется в самом UPDATE: статусы, из которых
+            # допустим переход в new_status, передаются условием WHERE
+            result = await self.uow.incidents.transition_incident_status(
+                incident_id, new_status, self._allowed_source_statuses(new_status)
+            )
+            if result.status_before is None:
                 raise IncidentNotFoundError(incident_id)
+            if not result.applied:
+                raise ValueError(f"Invalid status transition from {result.status_before} to {new_status}")
+            return IncidentOut.model_validate(result.incident)
 
-            # Проверяем валидность перехода статуса
-            current_status = IncidentStatus(existing_incident.status)
-            new_status = status_update.status
-            
-            if not self._is_valid_status_transition(current_status, new_status):
-                raise ValueError(f"Invalid status transition from {current_status} to {new_status}")
-
-            # Обновляем статус
-            updated_incident = await self.uow.incidents.update_incident_status(incident_id, new_status)
-            return IncidentOut.model_validate(updated_incident)
+    async def update_incidents_status(self, status_update: IncidentBulkStatusUpdate) -> IncidentBulkStatusResult:
+        """Сменить статус пакета инцидентов в одной транзакции"""
+        new_status = status_update.status
+        async with self.uow:
+            results = await self.uow.incidents.transition_incidents_status(
+                status_update.ids, new_status, self._allowed_source_statuses(new_status)
+            )
+        changed, invalid, missing = [], [], []
+        for incident_id, result in results.items():
+            if result.status_before is None:
+                missing.append(incident_id)
+            elif result.applied:
+                changed.append(incident_id)
+            else:
+                invalid.append(IncidentStatusRejected(id=incident_id, status=result.status_before))
+        return IncidentBulkStatusResult(changed=changed, invalid=invalid, missing=missing)
 
     async def delete_incident(self, incident_id: UUID) -> bool:
         """Удалить инцидент"""
         async with self.uow:
-            # Проверяем существование инцидента
-            existing_incident = await self.uow.incidents.get_incident_by_id(incident_id)
-            if not existing_incident:
+            # Удалять можно только отмененные или решенные инциденты
+            result = await self.uow.incidents.delete_incident_in_status(incident_id, FINAL_STATUSES)
+            if result.status_before is None:
                 raise IncidentNotFoundError(incident_id)
-
-            # Проверяем, можно ли удалить инцидент (например, только отмененные или решенные)
-            current_status = IncidentStatus(existing_incident.status)
-            if current_status not in [IncidentStatus.RESOLVED, IncidentStatus.CANCELLED]:
-                raise ValueError(f"Cannot delete incident with status {current_status}. Only resolved or cancelled incidents can be deleted.")
-
-            return await self.uow.incidents.delete_incident(incident_id)
+            if not result.applied:
+                raise ValueError(f"Cannot delete incident with status {result.status_before}. Only resolved or cancelled incidents can be deleted.")
+            return True
 
     async def update_incident_description(self, incident_id: UUID, new_description: str) -> IncidentOut:
         """Обновить описание инцидента"""
         async with self.uow:
-            # Проверяем существование инцидента
-            existing_incident = await self.uow.incidents.get_incident_by_id(incident_id)
-            if not existing_incident:
+            # Изменять описание можно только у незакрытых инцидентов
+            result = await self.uow.incidents.update_incident_description(
+                incident_id, new_description, ACTIVE_STATUSES
+            )
+            if result.status_before is None:
                 raise IncidentNotFoundError(incident_id)
+            if not result.applied:
+                raise ValueError(f"Cannot update description for incident with status {result.status_before}")
+            return IncidentOut.model_validate(result.incident)
 
-            # Проверяем, можно ли изменить описание (только для открытых инцидентов)
-            current_status = IncidentStatus(existing_incident.status)
-            if current_status in [IncidentStatus.RESOLVED, IncidentStatus.CANCELLED]:
-                raise ValueError(f"Cannot update description for incident with status {current_status}")
+    @staticmethod
+    def _build_stats(rows: List[tuple[str, str, int]]) -> IncidentStatsOut:
+        by_status = {status: 0 for status in IncidentStatus}
+        by_source = {source: 0 for source in IncidentSource}
+        items = []
+        for status, source, count in rows:
+            if not count:
+                continue
+            item = IncidentStatsItem(status=status, source=source, count=count)
+            by_status[item.status] += count
+            by_source[item.source] += count
+            items.append(item)
+        items.sort(key=lambda item: (item.status.value, item.source.value))
+        return IncidentStatsOut(
+            total=sum(by_status.values()), by_status=by_status, by_source=by_source, items=items
+        )
 
-            # Обновляем описание
-            updated_incident = await self.uow.incidents.update_incident(incident_id, description=new_description)
-            return IncidentOut.model_validate(updated_incident)
+    @staticmethod
+    def _format_validation_error(error: ValidationError) -> str:
+        return "; ".join(
+            f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}"
+            for err in error.errors()
+        )
 
     def _is_valid_status_transition(self, current_status: IncidentStatus, new_status: IncidentStatus) -> bool:
         """Проверить валидность перехода между статусами"""
@@ -115,3 +442,9 @@ class IncidentService:
         allowed_statuses = valid_transitions.get(current_status, [])
         return new_status in allowed_statuses
 
+    def _allowed_source_statuses(self, new_status: IncidentStatus) -> List[IncidentStatus]:
+        """Статусы, из которых допустим переход в new_status"""
+        return [
+            status for status in IncidentStatus
+            if self._is_valid_status_transition(status, new_status)
+        ]
@@ -0,0 +1,210 @@
+"""
+Очередь создания инцидентов с записью микропакетами (write-behind)
+"""
+
+import asyncio
+import logging
+from typing import AsyncContextManager, Callable, Optional
+
+from sqlalchemy.exc import OperationalError, TimeoutError as SQLAlchemyTimeoutError
+
+from core.config import app_config
+from core.enums import IncidentStatus
+from core.idempotency import IdempotencyKeyConflictError, check_replay, recent_idempotency_keys
+from core.unit_of_work import AbstractUnitOfWork, primary_uow
+from schemas.incident import IncidentCreate, IncidentOut
+
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionQueueFullError(Exception):
+    """Очередь создания переполнена, запрос нужно повторить позже"""
+
+
+class IngestionStoppedError(Exception):
+    """Очередь остановлена и новые инциденты не принимает"""
+
+
+class IncidentIngestionQueue:
+    """Объединяет одиночные создания инцидентов в многострочные INSERT.
+
+    Запрос кладет инцидент в ограниченную очередь и ждет future с результатом.
+    Единственный фоновый обработчик забирает до batch_size элементов (ждет
+    остальных не дольше flush_seconds после первого) и создает их одной
+    транзакцией через create_incidents_bulk, поэтому во время всплеска
+    создания занимают одно соединение пула вместо соединения на запрос.
+    Ошибка отдельного элемента возвращается только его отправителю.
+    Если клиент отключился, инцидент все равно будет создан.
+    """
+
+    def __init__(
+        self,
+        uow_factory: Callable[[], AsyncContextManager[AbstractUnitOfWork]],
+        queue_size: int,
+        batch_size: int,
+        flush_seconds: float,
+    ):
+        self._uow_factory = uow_factory
+        self._batch_size = batch_size
+        self._flush_seconds = flush_seconds
+        self._queue: asyncio.Queue[tuple[IncidentCreate, asyncio.Future]] = asyncio.Queue(queue_size)
+        # Взводится, когда набран полный пакет и ждать больше незачем
+        self._batch_ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopped = False
+        self.batches = 0
+        self.created = 0
+        self.replayed = 0
+        self.rejected = 0
+        self.failed = 0
+
+    async def submit(self, incident_data: IncidentCreate) -> tuple[IncidentOut, bool]:
+        """Поставить инцидент в очередь и дождаться его создания.
+
+        Как и IncidentService.create_incident_idempotent, возвращает инцидент
+        и признак того, что он создан этим запросом, а не найден по ключу
+        идемпотентности.
+        """
+        if self._stopped:
+            raise IngestionStoppedError("Incident ingestion is shutting down")
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((incident_data, future))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise IngestionQueueFullError("Incident ingestion queue is full")
+        if self._batch_is_full():
+            self._batch_ready.set()
+        # shield: отмена запроса не должна отменять future, которую выставит обработчик
+        return await asyncio.shield(future)
+
+    async def start(self) -> None:
+        """Запустить фоновый обработчик"""
+        self._stopped = False
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Перестать принимать инциденты, записать накопленные и остановить обработчик"""
+        self._stopped = True
+        if self._task is None:
+            return
+        self._batch_ready.set()
+        await self._queue.join()
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            self._batch_ready.clear()
+            if not self._batch_is_full() and not self._stopped:
+                try:
+                    await asyncio.wait_for(self._batch_ready.wait(), self._flush_seconds)
+                except asyncio.TimeoutError:
+                    pass
+            while len(batch) < self._batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._flush(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _batch_is_full(self) -> bool:
+        # Первый элемент пакета обработчик уже забрал из очереди
+        return self._queue.qsize() + 1 >= self._batch_size
+
+    async def _flush(self, batch: list[tuple[IncidentCreate, asyncio.Future]]) -> None:
+        """Записать пакет; при ошибке - половины пакета по отдельности.
+
+        Ошибка одного элемента (конфликт ключа идемпотентности, недопустимая
+        строка) откатывает всю транзакцию, поэтому пакет делится пополам, пока
+        ошибка не останется только у виновных элементов. Ошибки соединения
+        с БД относятся ко всему пакету и сразу возвращаются всем ожидающим.
+        """
+        try:
+            results = await self._write(batch)
+        except Exception as e:
+            if len(batch) == 1 or self._is_batch_wide(e):
+                logger.exception("Failed to insert a batch of %d incidents", len(batch))
+                self.failed += len(batch)
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            middle = len(batch) // 2
+            await self._flush(batch[:middle])
+            await self._flush(batch[middle:])
+            return
+        self.batches += 1
+        for (incident_data, future), (incident, created) in zip(batch, results):
+            if incident_data.idempotency_key is not None:
+                recent_idempotency_keys.add(incident_data.source, incident_data.idempotency_key, incident.id)
+            if created:
+                self.created += 1
+            else:
+                self.replayed += 1
+            if future.done():
+                continue
+            try:
+                if not created:
+                    check_replay(incident_data, incident)
+            except IdempotencyKeyConflictError as e:
+                future.set_exception(e)
+            else:
+                future.set_result((incident, created))
+
+    async def _write(self, batch: list[tuple[IncidentCreate, asyncio.Future]]) -> list[tuple[IncidentOut, bool]]:
+        async with self._uow_factory() as uow:
+            async with uow:
+                incidents = await uow.incidents.create_incidents_bulk(
+                    [incident_data for incident_data, _ in batch],
+                    status=IncidentStatus.OPEN,  # Новые инциденты всегда открыты
+                )
+                results = []
+                seen = set()
+                for incident in incidents:
+                    # Повтор ключа внутри пакета получает уже созданный инцидент
+                    created = incident.id in uow.incidents.created_ids and incident.id not in seen
+                    seen.add(incident.id)
+                    results.append((IncidentOut.model_validate(incident), created))
+        return results
+
+    @staticmethod
+    def _is_batch_wide(error: Exception) -> bool:
+        """Ошибка не зависит от содержимого пакета: повтор по частям бесполезен"""
+        return (
+            isinstance(error, (OperationalError, SQLAlchemyTimeoutError, OSError))
+            or getattr(error, "connection_invalidated", False)
+        )
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "max_queue_size": self._queue.maxsize,
+            "batch_size": self._batch_size,
+            "flush_seconds": self._flush_seconds,
+            "batches": self.batches,
+            "created": self.created,
+            "replayed": self.replayed,
+            "avg_batch": (self.created + self.replayed) / self.batches if self.batches else 0.0,
+            "rejected": self.rejected,
+            "failed": self.failed,
+        }
+
+
+def build_incident_ingestion() -> Optional[IncidentIngestionQueue]:
+    """Создать очередь создания инцидентов согласно настройкам"""
+    if not app_config.INCIDENT_INGESTION_ENABLED:
+        return None
+    return IncidentIngestionQueue(
+        primary_uow,
+        app_config.INCIDENT_INGESTION_QUEUE_SIZE,
+        app_config.INCIDENT_INGESTION_BATCH_SIZE,
+        app_config.INCIDENT_INGESTION_FLUSH_SECONDS,
+    )
+
+
+incident_ingestion = build_incident_ingestion()
@@ -0,0 +1,38 @@
+"""
+Сериализация ответов в JSON без промежуточных моделей
+"""
+
+from typing import Any, Optional, Sequence
+
+import orjson
+
+from repositories.abstract_incident import INCIDENT_ROW_FIELDS
+
+
+# Формат дат совпадает с Pydantic: UTC как "Z", наивные даты без смещения
+JSON_OPTIONS = orjson.OPT_UTC_Z
+
+
+def dumps(content: Any) -> bytes:
+    """Закодировать в JSON (UUID и datetime поддерживаются нативно)"""
+    return orjson.dumps(content, option=JSON_OPTIONS)
+
+
+def encode_incident_page(
+    rows: Sequence[tuple],
+    next_cursor: Optional[str],
+    columns: Sequence[str] = INCIDENT_ROW_FIELDS,
+    fields: Optional[Sequence[str]] = None,
+) -> bytes:
+    """Закодировать страницу строк в JSON схемы IncidentPage.
+
+    columns - колонки строк, fields - поля ответа (подмножество columns,
+    по умолчанию все колонки).
+    """
+    if fields is None or tuple(fields) == tuple(columns):
+        # dict(zip(...)) заметно быстрее Row._asdict()
+        items = [dict(zip(columns, row)) for row in rows]
+    else:
+        positions = [(field, columns.index(field)) for field in fields]
+        items = [{field: row[position] for field, position in positions} for row in rows]
+    return dumps({"items": items, "next_cursor": next_cursor})
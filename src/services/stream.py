@@ -0,0 +1,27 @@
+"""
+Форматирование ленты изменений для Server-Sent Events
+"""
+
+import asyncio
+from typing import AsyncIterator
+
+from core.events import Subscription
+
+
+# Через сколько миллисекунд браузер переподключается после обрыва
+SSE_RETRY_MS = 3000
+
+
+async def sse_messages(subscription: Subscription, heartbeat_seconds: float) -> AsyncIterator[str]:
+    """Сообщения SSE подписки; при простое - комментарий keep-alive.
+
+    Keep-alive не дает прокси закрыть простаивающее соединение.
+    """
+    yield f"retry: {SSE_RETRY_MS}\n\n"
+    while True:
+        try:
+            event_type, data = await asyncio.wait_for(subscription.get(), heartbeat_seconds)
+        except asyncio.TimeoutError:
+            yield ": keep-alive\n\n"
+            continue
+        yield f"event: {event_type}\ndata: {data}\n\n"
@@ -0,0 +1,213 @@
+import json
+import pytest
+from core.admission import (
+    FORWARDED_FOR_HEADER,
+    UNIDENTIFIED_SOURCE,
+    AdmissionController,
+    AdmissionMiddleware,
+    AdmissionRejectedError,
+    TokenBucket,
+)
+
+
+class FakeClock:
+    """Управляемые часы для проверки пополнения корзин"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_controller(clock, pool_saturated=lambda: False, **overrides) -> AdmissionController:
+    options = dict(
+        source_rates={"partner": 1.0},
+        default_source_rate=None,
+        unidentified_rate=None,
+        client_sources={"10.0.0.1": "partner", "10.0.0.2": "operator"},
+        client_rate=None,
+        burst_seconds=2.0,
+        max_clients=2,
+        max_in_flight=None,
+        pool_saturated=pool_saturated,
+        retry_after_seconds=1.0,
+        clock=clock,
+    )
+    options.update(overrides)
+    return AdmissionController(**options)
+
+
+class TestTokenBucket:
+    """Тесты корзины токенов"""
+
+    def test_burst_then_refill(self):
+        """Тест: всплеск до burst, затем токены пополняются со скоростью rate"""
+        bucket = TokenBucket(rate=2.0, burst=2.0, now=0.0)
+
+        assert bucket.acquire(0.0) == 0.0
+        assert bucket.acquire(0.0) == 0.0
+        assert bucket.acquire(0.0) == pytest.approx(0.5)
+        assert bucket.acquire(0.5) == 0.0
+
+
+class TestAdmissionController:
+    """Тесты решений о допуске запросов"""
+
+    def test_source_limit_does_not_affect_other_sources(self):
+        """Тест: лимит партнера не ограничивает операторов"""
+        clock = FakeClock()
+        controller = make_controller(clock)
+        controller.admit("partner", None)
+        controller.admit("partner", None)
+
+        with pytest.raises(AdmissionRejectedError) as exc_info:
+            controller.admit("partner", None)
+        controller.admit("operator", None)
+        controller.admit(UNIDENTIFIED_SOURCE, None)
+
+        assert exc_info.value.status_code == 429
+        assert exc_info.value.retry_after == pytest.approx(1.0)
+        assert controller.stats()["rejected_source"] == 1
+
+    def test_unidentified_clients_do_not_share_operator_bucket(self):
+        """Тест: клиенты без источника делят свою корзину, у оператора - отдельная"""
+        controller = make_controller(FakeClock(), default_source_rate=1.0, unidentified_rate=1.0)
+        controller.admit(UNIDENTIFIED_SOURCE, None)
+        controller.admit(UNIDENTIFIED_SOURCE, None)
+
+        with pytest.raises(AdmissionRejectedError) as exc_info:
+            controller.admit(UNIDENTIFIED_SOURCE, None)
+
+        assert str(exc_info.value) == "Rate limit exceeded for source unidentified"
+        controller.admit("operator", None)
+        controller.admit("operator", None)
+
+    def test_source_comes_only_from_address(self):
+        """Тест: источник определяется только настройкой адреса"""
+        controller = make_controller(FakeClock(), client_sources={"10.0.0.1": "Partner"})
+
+        assert controller.resolve_source("10.0.0.1") == "partner"
+        assert controller.resolve_source("10.0.0.9") == UNIDENTIFIED_SOURCE
+        assert controller.resolve_source(None) == UNIDENTIFIED_SOURCE
+
+    def test_client_limit_with_bounded_buckets(self):
+        """Тест: лимит на клиента, число хранимых корзин ограничено"""
+        clock = FakeClock()
+        controller = make_controller(clock, client_rate=0.5)
+        controller.admit(UNIDENTIFIED_SOURCE, "a")
+        with pytest.raises(AdmissionRejectedError):
+            controller.admit(UNIDENTIFIED_SOURCE, "a")
+
+        controller.admit(UNIDENTIFIED_SOURCE, "b")
+        controller.admit(UNIDENTIFIED_SOURCE, "c")
+
+        assert controller.stats()["tracked_clients"] == 2
+        # Корзина "a" вытеснена, клиент снова начинает с полной корзины
+        controller.admit(UNIDENTIFIED_SOURCE, "a")
+
+    def test_client_rejection_keeps_source_tokens(self):
+        """Тест: запрос, отклоненный по лимиту клиента, не расходует токен источника"""
+        # Корзина партнера вмещает два запроса
+        controller = make_controller(FakeClock(), client_rate=0.5)
+        controller.admit("partner", "a")
+        for _ in range(3):
+            with pytest.raises(AdmissionRejectedError, match="client"):
+                controller.admit("partner", "a")
+
+        controller.admit("partner", "b")
+
+        assert controller.stats()["rejected_source"] == 0
+
+    def test_sheds_load_only_when_pool_is_saturated(self):
+        """Тест: сверх лимита одновременных запросов 503 - только при исчерпанном пуле"""
+        clock = FakeClock()
+        saturated = False
+        controller = make_controller(clock, max_in_flight=1, pool_saturated=lambda: saturated)
+        controller.admit(UNIDENTIFIED_SOURCE, None)
+        controller.admit(UNIDENTIFIED_SOURCE, None)
+
+        saturated = True
+        with pytest.raises(AdmissionRejectedError) as exc_info:
+            controller.admit(UNIDENTIFIED_SOURCE, None)
+        controller.release()
+        controller.release()
+        controller.admit(UNIDENTIFIED_SOURCE, None)
+
+        assert exc_info.value.status_code == 503
+        assert controller.stats()["shed"] == 1
+        assert controller.in_flight == 1
+
+
+class TestAdmissionMiddleware:
+    """Тесты ASGI middleware контроля допуска"""
+
+    @staticmethod
+    async def call(middleware, path: str, headers: dict, address: str = "10.0.0.1") -> list[dict]:
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": path,
+            "headers": [(key.lower().encode(), value.encode()) for key, value in headers.items()],
+            "client": (address, 5000),
+        }
+        messages = []
+
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        async def send(message):
+            messages.append(message)
+
+        await middleware(scope, receive, send)
+        return messages
+
+    @staticmethod
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    @pytest.mark.asyncio
+    async def test_rejects_with_retry_after(self):
+        """Тест: запрос сверх лимита получает 429 с Retry-After и не доходит до приложения"""
+        calls = []
+
+        async def app(scope, receive, send):
+            calls.append(scope["path"])
+            await self.app(scope, receive, send)
+
+        controller = make_controller(FakeClock(), source_rates={"partner": 0.5})
+        middleware = AdmissionMiddleware(app, controller, exempt_paths=["/health"])
+
+        await self.call(middleware, "/incidents/", {})
+        rejected = await self.call(middleware, "/incidents/", {})
+        await self.call(middleware, "/health", {})
+
+        assert rejected[0]["status"] == 429
+        assert (b"retry-after", b"2") in rejected[0]["headers"]
+        assert json.loads(rejected[1]["body"])["detail"] == "Rate limit exceeded for source partner"
+        assert calls == ["/incidents/", "/health"]
+        assert controller.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_headers_do_not_change_source_or_client(self):
+        """Тест: заголовки источника и клиента не снимают ограничения партнера"""
+        controller = make_controller(FakeClock(), source_rates={"partner": 0.5}, client_rate=0.5)
+        middleware = AdmissionMiddleware(self.app, controller)
+
+        await self.call(middleware, "/incidents/", {"X-Incident-Source": "operator", "X-Client-Id": "one"})
+        rejected = await self.call(middleware, "/incidents/", {"X-Incident-Source": "operator", "X-Client-Id": "two"})
+
+        assert rejected[0]["status"] == 429
+        assert controller.stats()["tracked_clients"] == 1
+
+    def test_forwarded_for_only_from_trusted_proxy(self):
+        """Тест: X-Forwarded-For учитывается только от доверенного прокси"""
+        middleware = AdmissionMiddleware(self.app, make_controller(FakeClock()), trusted_proxies=["10.0.0.254"])
+
+        def scope(address: str, forwarded: str) -> dict:
+            return {"client": (address, 5000), "headers": [(FORWARDED_FOR_HEADER.lower().encode(), forwarded.encode())]}
+
+        # Левую часть списка клиент может подставить сам, берется адрес, добавленный прокси
+        assert middleware.client_address(scope("10.0.0.254", "10.0.0.2, 203.0.113.7")) == "203.0.113.7"
+        assert middleware.client_address(scope("203.0.113.7", "10.0.0.2")) == "203.0.113.7"
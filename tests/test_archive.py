@@ -0,0 +1,143 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+from sqlalchemy.dialects import postgresql
+from core.enums import IncidentStatus, IncidentSource
+from repositories.incident import IncidentRepository
+from repositories.mock_incident import MockIncidentRepository
+from schemas.incident import IncidentCreate
+from services.incident import IncidentNotFoundError, IncidentService
+
+
+class _UnitOfWork:
+    """Минимальный Unit of Work вокруг mock-репозитория"""
+
+    def __init__(self, incidents):
+        self.incidents = incidents
+        self.transactions = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.transactions += 1
+        return False
+
+
+class TestArchiveClosedIncidents:
+    """Тесты переноса закрытых инцидентов в архив"""
+
+    @pytest.fixture
+    def repository(self):
+        return MockIncidentRepository()
+
+    async def _create(self, repository, status: IncidentStatus, age_days: int):
+        incident = await repository.create_incident("Test incident", source=IncidentSource.PARTNER)
+        incident.status = status.value
+        incident.created_at = datetime.now(timezone.utc) - timedelta(days=age_days)
+        return incident
+
+    @pytest.mark.asyncio
+    async def test_only_old_closed_incidents_are_archived(self, repository):
+        """Тест: переносятся только старые решенные и отмененные инциденты"""
+        resolved = await self._create(repository, IncidentStatus.RESOLVED, 100)
+        cancelled = await self._create(repository, IncidentStatus.CANCELLED, 100)
+        active = await self._create(repository, IncidentStatus.IN_PROGRESS, 100)
+        recent = await self._create(repository, IncidentStatus.RESOLVED, 10)
+        repository.changed_ids.clear()
+
+        moved = await repository.archive_incidents(timedelta(days=90), limit=10)
+
+        assert moved == 2
+        assert {incident.id for incident in await repository.get_all_incidents()} == {active.id, recent.id}
+        assert repository.changed_ids == {resolved.id, cancelled.id}
+        archived = await repository.get_archived_incident(resolved.id)
+        assert archived.status == "resolved"
+        assert archived.archived_at is not None
+
+    @pytest.mark.asyncio
+    async def test_archived_incidents_stay_in_stats(self, repository):
+        """Тест: пересчет статистики учитывает архив"""
+        await self._create(repository, IncidentStatus.RESOLVED, 100)
+        await repository.archive_incidents(timedelta(days=90), limit=10)
+
+        await repository.rebuild_incident_stats()
+
+        assert await repository.get_incident_stats() == [("resolved", "partner", 1)]
+
+    @pytest.mark.asyncio
+    async def test_archiving_releases_idempotency_key(self, repository):
+        """Тест: ключ идемпотентности архивного инцидента можно использовать снова"""
+        incident, = await repository.create_incidents_bulk(
+            [IncidentCreate(description="Keyed", source=IncidentSource.PARTNER, idempotency_key="k-1")]
+        )
+        incident.status = IncidentStatus.RESOLVED.value
+        incident.created_at -= timedelta(days=100)
+        await repository.archive_incidents(timedelta(days=90), limit=10)
+
+        retried, = await repository.create_incidents_bulk(
+            [IncidentCreate(description="Keyed", source=IncidentSource.PARTNER, idempotency_key="k-1")]
+        )
+
+        assert retried.id != incident.id
+
+    @pytest.mark.asyncio
+    async def test_service_moves_in_batches(self, repository):
+        """Тест: сервис переносит пакетами, каждый в своей транзакции"""
+        for _ in range(5):
+            await self._create(repository, IncidentStatus.RESOLVED, 100)
+        uow = _UnitOfWork(repository)
+
+        result = await IncidentService(uow).archive_closed_incidents(timedelta(days=90), batch_size=2)
+
+        assert (result.archived, result.batches, result.done) == (5, 3, True)
+        assert uow.transactions == 3
+        assert repository.get_count() == 0
+
+    @pytest.mark.asyncio
+    async def test_service_stops_after_max_batches(self, repository):
+        """Тест: max_batches ограничивает работу одного вызова"""
+        for _ in range(5):
+            await self._create(repository, IncidentStatus.CANCELLED, 100)
+
+        result = await IncidentService(_UnitOfWork(repository)).archive_closed_incidents(
+            timedelta(days=90), batch_size=2, max_batches=1
+        )
+
+        assert (result.archived, result.batches, result.done) == (2, 1, False)
+        assert repository.get_count() == 3
+
+    @pytest.mark.asyncio
+    async def test_get_archived_incident(self, repository):
+        """Тест: архивный инцидент читается по id, отсутствующий - ошибка"""
+        incident = await self._create(repository, IncidentStatus.RESOLVED, 100)
+        await repository.archive_incidents(timedelta(days=90), limit=10)
+        service = IncidentService(_UnitOfWork(repository))
+
+        archived = await service.get_archived_incident(incident.id)
+
+        assert archived.id == incident.id
+        assert archived.status == IncidentStatus.RESOLVED
+        with pytest.raises(IncidentNotFoundError):
+            await service.get_archived_incident(uuid4())
+
+
+class TestArchiveStatement:
+    """Тесты SQL переноса в архив"""
+
+    @pytest.mark.asyncio
+    async def test_single_statement_with_skip_locked(self):
+        """Тест: перенос - один запрос DELETE ... RETURNING во вставку в архив"""
+        session = MagicMock()
+        session.scalars = AsyncMock(return_value=MagicMock(all=MagicMock(return_value=[uuid4()])))
+        repository = IncidentRepository(session)
+
+        assert await repository.archive_incidents(timedelta(days=90), limit=500) == 1
+
+        sql = str(session.scalars.await_args.args[0].compile(dialect=postgresql.dialect()))
+        assert sql.count("DELETE FROM incidents ") == 1
+        assert "DELETE FROM incident_idempotency_keys" in sql
+        assert "INSERT INTO incidents_archive" in sql
+        assert "FOR UPDATE SKIP LOCKED" in sql
+        assert len(repository.changed_ids) == 1
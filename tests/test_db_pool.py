@@ -0,0 +1,58 @@
+import pytest
+from pydantic import ValidationError
+from core.config import Settings
+from db.pool import CheckoutWaitStats
+
+
+class TestCheckoutWaitStats:
+    """Тесты статистики ожидания соединения из пула"""
+
+    def test_snapshot_buckets_are_cumulative(self):
+        """Тест кумулятивной гистограммы ожиданий"""
+        stats = CheckoutWaitStats()
+        for seconds in (0.0005, 0.003, 0.2, 20.0):
+            stats.observe(seconds)
+
+        snapshot = stats.snapshot()
+
+        assert snapshot["count"] == 4
+        assert snapshot["max_seconds"] == 20.0
+        assert snapshot["buckets"]["0.001"] == 1
+        assert snapshot["buckets"]["0.005"] == 2
+        assert snapshot["buckets"]["0.25"] == 3
+        assert snapshot["buckets"]["10.0"] == 3
+        assert snapshot["buckets"]["inf"] == 4
+
+
+class TestEngineConfig:
+    """Тесты профиля движка БД"""
+
+    def test_transaction_pooler_disables_prepared_statement_caches(self):
+        """Тест совместимости с PgBouncer в режиме transaction pooling"""
+        config = Settings(
+            DB_TRANSACTION_POOLER=True, DATABASE_LISTENER_URL="postgresql://backend@db:5432/incidents_db"
+        ).get_engine_config()
+
+        connect_args = config["connect_args"]
+        assert connect_args["statement_cache_size"] == 0
+        assert connect_args["prepared_statement_cache_size"] == 0
+        assert connect_args["prepared_statement_name_func"]() != connect_args["prepared_statement_name_func"]()
+
+    def test_transaction_pooler_requires_direct_listener(self):
+        """Тест: LISTEN/NOTIFY за transaction pooler требует прямого подключения"""
+        with pytest.raises(ValidationError, match="DATABASE_LISTENER_URL"):
+            Settings(DB_TRANSACTION_POOLER=True, INCIDENT_EVENTS_TRANSPORT="local")
+
+        Settings(DB_TRANSACTION_POOLER=True, INCIDENT_CACHE_INVALIDATION="local", INCIDENT_EVENTS_TRANSPORT="local")
+        listener = Settings(
+            DB_TRANSACTION_POOLER=True, DATABASE_LISTENER_URL="postgresql+asyncpg://backend@db:5432/incidents_db"
+        )
+        assert listener.get_listener_dsn() == "postgresql://backend@db:5432/incidents_db"
+
+    def test_default_profile(self):
+        """Тест профиля по умолчанию: без логирования SQL"""
+        config = Settings(DB_STATEMENT_CACHE_SIZE=500).get_engine_config()
+
+        assert config["echo"] is False
+        assert config["pool_size"] == 5
+        assert config["connect_args"] == {"statement_cache_size": 500}
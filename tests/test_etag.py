@@ -0,0 +1,93 @@
+import pytest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+from uuid import uuid4
+from pydantic import ValidationError
+from core.etag import etag_matches, make_collection_etag, make_incident_etag
+from core.unit_of_work import SQLAlchemyUnitOfWork
+from repositories.mock_incident import MockIncidentRepository
+from schemas.incident import IncidentOut
+
+
+class TestETag:
+    """Тесты построения и сравнения ETag"""
+
+    def test_incident_etag_changes_with_version(self):
+        """Тест: ETag инцидента меняется вместе с версией"""
+        incident_id = uuid4()
+        assert make_incident_etag(incident_id, 1) != make_incident_etag(incident_id, 2)
+
+    def test_collection_etag_depends_on_query(self):
+        """Тест: ETag списка зависит от параметров, но не от их порядка"""
+        first = make_collection_etag(7, [("status", "open"), ("limit", "10")])
+        reordered = make_collection_etag(7, [("limit", "10"), ("status", "open")])
+        other_query = make_collection_etag(7, [("status", "waiting"), ("limit", "10")])
+        other_version = make_collection_etag(8, [("status", "open"), ("limit", "10")])
+
+        assert first == reordered
+        assert first != other_query
+        assert first != other_version
+
+    def test_etag_matches(self):
+        """Тест разбора заголовка If-None-Match"""
+        etag = make_incident_etag(uuid4(), 3)
+
+        assert etag_matches(etag, etag)
+        assert etag_matches(f'"other", W/{etag}', etag)
+        assert etag_matches("*", etag)
+        assert not etag_matches('"other"', etag)
+        assert not etag_matches(None, etag)
+
+    def test_incident_out_requires_version(self):
+        """Тест: без версии инцидент не сериализуется, а не получает версию 1 и чужой ETag"""
+        incident = SimpleNamespace(
+            id=uuid4(), description="Disk full", status="open", source="operator", created_at=datetime(2025, 11, 19)
+        )
+
+        with pytest.raises(ValidationError, match="version"):
+            IncidentOut.model_validate(incident)
+
+    @pytest.mark.asyncio
+    async def test_mock_repository_sets_version(self):
+        """Тест: mock-репозиторий выдает версию и увеличивает ее при изменении"""
+        repository = MockIncidentRepository()
+        incident = await repository.create_incident("Disk full")
+        assert IncidentOut.model_validate(incident).version == 1
+
+        await repository.update_incident(incident.id, description="Disk almost full")
+
+        assert IncidentOut.model_validate(incident).version == 2
+
+
+class TestCollectionVersion:
+    """Тесты версии коллекции при коммите"""
+
+    @pytest.mark.asyncio
+    async def test_version_is_bumped_inside_write_transaction(self):
+        """Тест: версия коллекции увеличивается до коммита, в той же транзакции"""
+        calls = MagicMock()
+        session = MagicMock(commit=AsyncMock(side_effect=lambda: calls.commit()))
+        uow = SQLAlchemyUnitOfWork(session)
+        uow._cache = None
+        uow._events = MagicMock()
+        uow.incidents = MockIncidentRepository()
+        uow.incidents.bump_collection_version = AsyncMock(side_effect=lambda: calls.bump())
+
+        await uow.incidents.create_incident("Test incident")
+        uow.incidents.events.clear()
+        await uow.commit()
+
+        assert [name for name, *_ in calls.mock_calls] == ["bump", "commit"]
+
+    @pytest.mark.asyncio
+    async def test_read_only_commit_keeps_version(self):
+        """Тест: транзакция без изменений не меняет версию коллекции"""
+        uow = SQLAlchemyUnitOfWork(MagicMock(commit=AsyncMock()))
+        uow._cache = None
+        uow._events = MagicMock()
+        uow.incidents = MockIncidentRepository()
+
+        await uow.commit()
+
+        assert await uow.incidents.get_collection_version() == 1
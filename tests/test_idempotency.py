@@ -0,0 +1,94 @@
+import pytest
+from core.enums import IncidentSource
+from core.idempotency import IdempotencyKeyConflictError, recent_idempotency_keys
+from repositories.mock_incident import MockIncidentRepository
+from schemas.incident import IncidentCreate
+from services.incident import IncidentService
+
+
+class _UnitOfWork:
+    """Минимальный Unit of Work вокруг mock-репозитория"""
+
+    def __init__(self, incidents):
+        self.incidents = incidents
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.incidents.created_ids.clear()
+        return False
+
+
+class TestIdempotentCreate:
+    """Тесты идемпотентного создания инцидентов"""
+
+    @pytest.fixture
+    def repository(self):
+        return MockIncidentRepository()
+
+    @pytest.fixture
+    def service(self, repository):
+        return IncidentService(_UnitOfWork(repository))
+
+    @pytest.mark.asyncio
+    async def test_retry_returns_original(self, service, repository):
+        """Тест: повтор с тем же ключом возвращает исходный инцидент"""
+        incident_data = IncidentCreate(
+            description="Disk full", source=IncidentSource.PARTNER, idempotency_key="retry-1"
+        )
+
+        first, first_created = await service.create_incident_idempotent(incident_data)
+        second, second_created = await service.create_incident_idempotent(incident_data)
+
+        assert first_created and not second_created
+        assert second.id == first.id
+        assert repository.get_count() == 1
+
+    @pytest.mark.asyncio
+    async def test_key_is_scoped_by_source(self, service, repository):
+        """Тест: одинаковые ключи разных источников не конфликтуют"""
+        for source in (IncidentSource.PARTNER, IncidentSource.MONITORING):
+            _, created = await service.create_incident_idempotent(
+                IncidentCreate(description="Disk full", source=source, idempotency_key="same-key")
+            )
+            assert created
+        assert repository.get_count() == 2
+
+    @pytest.mark.asyncio
+    async def test_key_reuse_with_other_description_conflicts(self, service):
+        """Тест: ключ нельзя использовать для другого описания"""
+        await service.create_incident_idempotent(
+            IncidentCreate(description="Disk full", source=IncidentSource.PARTNER, idempotency_key="reused")
+        )
+
+        with pytest.raises(IdempotencyKeyConflictError):
+            await service.create_incident_idempotent(
+                IncidentCreate(description="CPU high", source=IncidentSource.PARTNER, idempotency_key="reused")
+            )
+
+    @pytest.mark.asyncio
+    async def test_recent_key_answers_without_write(self, service, repository):
+        """Тест: недавний ключ отвечается из памяти процесса без создания"""
+        incident_data = IncidentCreate(
+            description="Disk full", source=IncidentSource.OPERATOR, idempotency_key="recent-1"
+        )
+        created, _ = await service.create_incident_idempotent(incident_data)
+        repository.create_incidents_bulk = None  # запись не должна понадобиться
+
+        replay = await service.find_replay(incident_data)
+
+        assert replay.id == created.id
+        assert recent_idempotency_keys.get(IncidentSource.OPERATOR, "recent-1") == created.id
+
+    @pytest.mark.asyncio
+    async def test_bulk_reports_replays(self, service, repository):
+        """Тест: пакет помечает повторы ключей и не создает дубликаты"""
+        item = {"description": "Disk full", "source": "monitoring", "idempotency_key": "bulk-1"}
+
+        result = await service.create_incidents_bulk([item, item, {**item, "idempotency_key": "bulk-2"}])
+
+        assert (result.created, result.replayed, result.failed) == (2, 1, 0)
+        assert [item.replayed for item in result.items] == [False, True, False]
+        assert result.items[0].incident.id == result.items[1].incident.id
+        assert repository.get_count() == 2
@@ -0,0 +1,119 @@
+import pytest
+from uuid import uuid4
+from core.cache import IncidentCache, LRUTTLCache, LocalInvalidationChannel
+from core.enums import IncidentStatus, IncidentSource
+from repositories.cached_incident import CachedIncidentRepository
+from repositories.mock_incident import MockIncidentRepository
+
+
+class FakeClock:
+    """Управляемые часы для проверки TTL"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestLRUTTLCache:
+    """Тесты LRU+TTL кэша"""
+
+    def test_lru_eviction(self):
+        """Тест вытеснения давно не используемой записи"""
+        cache = LRUTTLCache(max_size=2, ttl_seconds=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        assert cache.get("a") == 1  # "a" становится самой свежей
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.evictions == 1
+
+    def test_ttl_expiration(self):
+        """Тест истечения времени жизни записи"""
+        clock = FakeClock()
+        cache = LRUTTLCache(max_size=10, ttl_seconds=5, clock=clock)
+        cache.set("a", 1)
+
+        clock.now = 4.9
+        assert cache.get("a") == 1
+        clock.now = 5.0
+        assert cache.get("a") is None
+        assert cache.expirations == 1
+        assert cache.stats()["size"] == 0
+
+    def test_stale_read_is_not_cached_after_invalidation(self):
+        """Тест: значение, прочитанное до инвалидации, не попадает в кэш"""
+        cache = LRUTTLCache(max_size=10, ttl_seconds=60)
+        token = cache.read_token()
+        cache.invalidate(["a"])
+
+        assert cache.set("a", "stale", token) is False
+        assert cache.get("a") is None
+        assert cache.set("a", "fresh", cache.read_token()) is True
+
+    def test_quarantine_rejects_recently_invalidated_key(self):
+        """Тест: значение с реплики не кэшируется сразу после инвалидации ключа"""
+        clock = FakeClock()
+        cache = LRUTTLCache(max_size=10, ttl_seconds=60, clock=clock, invalidation_memory_seconds=5)
+        cache.invalidate(["a"])
+
+        clock.now = 4.0
+        assert cache.set("a", "replica", cache.read_token(), quarantine=5) is False
+        assert cache.set("b", "replica", cache.read_token(), quarantine=5) is True
+        clock.now = 5.0
+        assert cache.set("a", "replica", cache.read_token(), quarantine=5) is True
+
+
+class TestCachedIncidentRepository:
+    """Тесты кэширующего декоратора репозитория"""
+
+    @pytest.fixture
+    def cache(self):
+        return IncidentCache(LRUTTLCache(max_size=100, ttl_seconds=60), LocalInvalidationChannel())
+
+    @pytest.fixture
+    def inner(self):
+        return MockIncidentRepository()
+
+    @pytest.fixture
+    def repository(self, inner, cache):
+        return CachedIncidentRepository(inner, cache)
+
+    @pytest.mark.asyncio
+    async def test_read_through(self, repository, inner, cache):
+        """Тест: повторное чтение обслуживается из кэша"""
+        incident = await inner.create_incident("Test incident", source=IncidentSource.PARTNER)
+
+        first = await repository.get_incident_by_id(incident.id)
+        inner.clear()
+        second = await repository.get_incident_by_id(incident.id)
+
+        assert first.description == "Test incident"
+        assert second == first
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    @pytest.mark.asyncio
+    async def test_missing_incident_is_not_cached(self, repository, cache):
+        """Тест: отсутствующий инцидент не кэшируется"""
+        assert await repository.get_incident_by_id(uuid4()) is None
+        assert cache.stats()["size"] == 0
+
+    @pytest.mark.asyncio
+    async def test_write_invalidates(self, repository, inner):
+        """Тест: запись инвалидирует кэш и помечает инцидент измененным"""
+        incident = await inner.create_incident("Test incident")
+        await repository.get_incident_by_id(incident.id)
+
+        result = await repository.transition_incident_status(
+            incident.id, IncidentStatus.IN_PROGRESS, [IncidentStatus.OPEN]
+        )
+        refreshed = await repository.get_incident_by_id(incident.id)
+
+        assert result.applied
+        assert refreshed.status == IncidentStatus.IN_PROGRESS
+        assert repository.changed_ids == {incident.id}
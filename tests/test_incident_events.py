@@ -0,0 +1,90 @@
+import json
+import pytest
+from datetime import datetime, timezone
+from uuid import uuid4
+from core.enums import IncidentEventType, IncidentSource, IncidentStatus
+from core.events import EventBroadcaster, IncidentEvent, LocalEventTransport, PostgresEventTransport
+from services.stream import sse_messages
+
+
+def make_event(status: str = "open", source: str = "operator", previous_status: str = None) -> IncidentEvent:
+    event_type = IncidentEventType.STATUS_CHANGED if previous_status else IncidentEventType.CREATED
+    return IncidentEvent(
+        event_type, uuid4(), status, source, 1, datetime.now(timezone.utc), previous_status
+    )
+
+
+class TestEventBroadcaster:
+    """Тесты рассылки событий подписчикам"""
+
+    @pytest.fixture
+    def broadcaster(self):
+        return EventBroadcaster(LocalEventTransport(), queue_size=2)
+
+    @pytest.mark.asyncio
+    async def test_filters_by_status_and_source(self, broadcaster):
+        """Тест: подписчик получает события своих статусов (текущих или прежних) и источников"""
+        subscription = broadcaster.subscribe(
+            statuses=[IncidentStatus.OPEN], sources=[IncidentSource.PARTNER]
+        )
+        left_open = make_event("in_progress", "partner", previous_status="open")
+        broadcaster.broadcast([
+            make_event("open", "operator"),
+            make_event("resolved", "partner", previous_status="in_progress"),
+            left_open,
+        ])
+
+        event_type, data = await subscription.get()
+        assert event_type == IncidentEventType.STATUS_CHANGED
+        assert json.loads(data)["id"] == str(left_open.id)
+        assert broadcaster.stats()["delivered"] == 1
+
+    @pytest.mark.asyncio
+    async def test_slow_consumer_gets_resync(self, broadcaster):
+        """Тест: при переполнении очереди клиент получает resync вместо старых событий"""
+        subscription = broadcaster.subscribe()
+        broadcaster.broadcast([make_event() for _ in range(3)])
+        latest = make_event()
+        broadcaster.broadcast([latest])
+
+        assert (await subscription.get())[0] == IncidentEventType.RESYNC
+        assert json.loads((await subscription.get())[1])["id"] == str(latest.id)
+        assert subscription.dropped == 3
+
+        broadcaster.unsubscribe(subscription)
+        assert broadcaster.stats() == {"subscribers": 0, "delivered": 4, "dropped": 3}
+
+
+class TestPostgresEventTransport:
+    """Тесты упаковки событий в NOTIFY"""
+
+    def test_batches_fit_notify_limit_and_round_trip(self):
+        """Тест: пакеты не превышают лимит NOTIFY и раскодируются обратно"""
+        events = [make_event(previous_status="open") for _ in range(100)]
+
+        batches = list(PostgresEventTransport._batches(event.to_json() for event in events))
+        decoded = [
+            PostgresEventTransport._decode(item) for batch in batches for item in json.loads(batch)
+        ]
+
+        assert len(batches) > 1
+        assert all(len(batch.encode()) <= PostgresEventTransport.MAX_PAYLOAD_BYTES for batch in batches)
+        assert decoded == events
+
+
+class TestServerSentEvents:
+    """Тесты форматирования SSE"""
+
+    @pytest.mark.asyncio
+    async def test_messages_and_keep_alive(self):
+        """Тест: события оформляются кадрами SSE, при простое идет keep-alive"""
+        broadcaster = EventBroadcaster(LocalEventTransport(), queue_size=10)
+        subscription = broadcaster.subscribe()
+        event = make_event()
+        broadcaster.broadcast([event])
+        messages = sse_messages(subscription, heartbeat_seconds=0.01)
+
+        assert (await anext(messages)).startswith("retry:")
+        assert await anext(messages) == f"event: created\ndata: {event.to_json().decode()}\n\n"
+        assert await anext(messages) == ": keep-alive\n\n"
+        await messages.aclose()
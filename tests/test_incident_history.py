@@ -0,0 +1,99 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from core.enums import IncidentStatus, IncidentSource
+from repositories.mock_incident import MockIncidentRepository
+from services.incident import IncidentService
+
+
+class TestStatusHistory:
+    """Тесты журнала статусов и агрегатов жизненного цикла"""
+
+    @pytest.fixture
+    def repository(self):
+        return MockIncidentRepository()
+
+    async def _commit(self, repository):
+        events = list(repository.events)
+        repository.events.clear()
+        await repository.record_status_history(events)
+
+    @pytest.mark.asyncio
+    async def test_transitions_accumulate_time_in_status(self, repository):
+        """Тест: переходы пишутся в журнал, время в статусах накапливается"""
+        incident = await repository.create_incident("Test incident", source=IncidentSource.PARTNER)
+        await self._commit(repository)
+        record = repository.lifecycle[incident.id]
+        record["created_at"] -= timedelta(seconds=100)
+        record["status_since"] -= timedelta(seconds=100)
+
+        await repository.transition_incident_status(
+            incident.id, IncidentStatus.IN_PROGRESS, [IncidentStatus.OPEN]
+        )
+        await self._commit(repository)
+        record["status_since"] -= timedelta(seconds=50)
+        await repository.transition_incident_status(
+            incident.id, IncidentStatus.RESOLVED, [IncidentStatus.IN_PROGRESS]
+        )
+        await self._commit(repository)
+
+        assert [(from_status, to_status) for _, from_status, to_status, _ in repository.status_history] == [
+            (None, "open"),
+            ("open", "in_progress"),
+            ("in_progress", "resolved"),
+        ]
+        assert record["open_seconds"] == pytest.approx(100, abs=1)
+        assert record["in_progress_seconds"] == pytest.approx(50, abs=1)
+        assert record["resolve_seconds"] == pytest.approx(100, abs=1)
+        assert record["resolved_at"] is not None
+
+    @pytest.mark.asyncio
+    async def test_mttr_by_source(self, repository):
+        """Тест: MTTR считается только по решенным инцидентам, по источникам"""
+        for source, seconds in [
+            (IncidentSource.OPERATOR, 10),
+            (IncidentSource.OPERATOR, 30),
+            (IncidentSource.PARTNER, 60),
+        ]:
+            incident = await repository.create_incident("Resolved", source=source)
+            await self._commit(repository)
+            repository.lifecycle[incident.id]["created_at"] -= timedelta(seconds=seconds)
+            await repository.transition_incident_status(
+                incident.id, IncidentStatus.RESOLVED, [IncidentStatus.OPEN]
+            )
+        await repository.create_incident("Open", source=IncidentSource.PARTNER)
+        await self._commit(repository)
+
+        report = await IncidentService(_UnitOfWork(repository)).get_mttr_report()
+
+        operator, partner = report.items
+        assert operator.source == IncidentSource.OPERATOR
+        assert operator.resolved == 2
+        assert operator.p50 == pytest.approx(20, abs=1)
+        assert operator.p90 == pytest.approx(28, abs=1)
+        assert partner.resolved == 1
+        assert partner.p99 == pytest.approx(60, abs=1)
+        assert set(partner.avg_time_in_status) == {
+            IncidentStatus.OPEN, IncidentStatus.IN_PROGRESS, IncidentStatus.WAITING
+        }
+
+    @pytest.mark.asyncio
+    async def test_mttr_rejects_empty_interval(self, repository):
+        """Тест: пустой интервал решения отклоняется"""
+        service = IncidentService(_UnitOfWork(repository))
+        now = datetime.now(timezone.utc)
+
+        with pytest.raises(ValueError):
+            await service.get_mttr_report(resolved_from=now, resolved_to=now)
+
+
+class _UnitOfWork:
+    """Минимальный Unit of Work вокруг mock-репозитория"""
+
+    def __init__(self, incidents):
+        self.incidents = incidents
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
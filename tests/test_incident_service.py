@@ -1,11 +1,27 @@
+import json
 import pytest
 from uuid import uuid4
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from typing import List
 from unittest.mock import MagicMock, AsyncMock
 from services.incident import IncidentService, IncidentNotFoundError
-from schemas.incident import IncidentCreate, IncidentStatusUpdate
-from core.enums import IncidentStatus, IncidentSource
+from core.pagination import (
+    InvalidCursorError,
+    decode_cursor,
+    decode_search_cursor,
+    encode_cursor,
+)
+from schemas.incident import (
+    IncidentCreate,
+    IncidentFilter,
+    IncidentBulkStatusUpdate,
+    IncidentStatusUpdate,
+    incident_projection_model,
+    parse_incident_fields,
+)
+from core.enums import ACTIVE_STATUSES, FINAL_STATUSES, ExportFormat, IncidentStatus, IncidentSource
+from repositories.abstract_incident import GuardedWriteResult
+from repositories.mock_incident import MockIncidentRepository
 
 
 def create_mock_incident(incident_id: str = None, description: str = "Test incident", 
@@ -19,6 +35,7 @@ def create_mock_incident(incident_id: str = None, description: str = "Test incid
     mock_incident.status = status
     mock_incident.source = source
     mock_incident.created_at = created_at or datetime.now()
+    mock_incident.version = 1
     return mock_incident
 
 
@@ -32,7 +49,17 @@ class MockUnitOfWork:
         self.incidents.get_incident_by_id = AsyncMock()
         self.incidents.get_all_incidents = AsyncMock()
         self.incidents.get_incidents_by_status = AsyncMock()
+        self.incidents.get_incidents_page = AsyncMock()
+        self.incidents.create_incidents_bulk = AsyncMock()
+        self.incidents.transition_incident_status = AsyncMock()
+        self.incidents.transition_incidents_status = AsyncMock()
+        self.incidents.update_incident_description = AsyncMock()
+        self.incidents.delete_incident_in_status = AsyncMock()
+        self.incidents.get_incident_version = AsyncMock()
+        self.incidents.get_collection_version = AsyncMock()
         self.incidents.update_incident_status = AsyncMock()
+        self.incidents.get_incident_stats = AsyncMock()
+        self.incidents.search_incidents = AsyncMock()
         self.committed = False
         self.rolled_back = False
 
@@ -83,6 +110,7 @@ class TestIncidentService:
         mock_incident.status = IncidentStatus.OPEN
         mock_incident.source = IncidentSource.OPERATOR
         mock_incident.created_at = created_at
+        mock_incident.version = 1
         uow.incidents.create_incident.return_value = mock_incident
 
         incident_data = IncidentCreate(
@@ -108,6 +136,40 @@ class TestIncidentService:
         assert uow.committed == True
         uow.incidents.create_incident.assert_called_once()
 
+    @pytest.mark.asyncio
+    async def test_create_incidents_bulk_partial_failure(self, service, uow):
+        """Тест пакетного создания: некорректные элементы не мешают корректным"""
+        created = [
+            create_mock_incident(description="Disk full", source=IncidentSource.MONITORING),
+            create_mock_incident(description="CPU high", source=IncidentSource.MONITORING),
+        ]
+        uow.incidents.create_incidents_bulk.return_value = created
+
+        result = await service.create_incidents_bulk([
+            {"description": "Disk full", "source": "monitoring"},
+            {"description": "", "source": "monitoring"},
+            {"description": "CPU high", "source": "monitoring"},
+        ])
+
+        assert result.created == 2
+        assert result.failed == 1
+        assert [item.success for item in result.items] == [True, False, True]
+        assert result.items[0].incident.description == "Disk full"
+        assert result.items[2].incident.description == "CPU high"
+        assert "description" in result.items[1].error
+        payloads = uow.incidents.create_incidents_bulk.call_args.args[0]
+        assert [payload.description for payload in payloads] == ["Disk full", "CPU high"]
+        assert uow.committed
+
+    @pytest.mark.asyncio
+    async def test_create_incidents_bulk_all_invalid(self, service, uow):
+        """Тест пакетного создания без корректных элементов: запрос к БД не выполняется"""
+        result = await service.create_incidents_bulk([{"source": "unknown"}])
+
+        assert result.created == 0
+        assert result.failed == 1
+        uow.incidents.create_incidents_bulk.assert_not_called()
+
     @pytest.mark.asyncio
     async def test_get_incident_by_id_found(self, service, uow):
         """Тест получения существующего инцидента по ID"""
@@ -137,6 +199,23 @@ class TestIncidentService:
         assert str(non_existent_id) in str(exc_info.value)
         uow.incidents.get_incident_by_id.assert_called_once_with(non_existent_id)
 
+    @pytest.mark.asyncio
+    async def test_get_incident_version(self, service, uow):
+        """Тест получения версии инцидента для ETag"""
+        incident_id = uuid4()
+        uow.incidents.get_incident_version.return_value = 3
+
+        assert await service.get_incident_version(incident_id) == 3
+        uow.incidents.get_incident_version.assert_called_once_with(incident_id)
+
+    @pytest.mark.asyncio
+    async def test_get_incident_version_not_found(self, service, uow):
+        """Тест получения версии несуществующего инцидента"""
+        uow.incidents.get_incident_version.return_value = None
+
+        with pytest.raises(IncidentNotFoundError):
+            await service.get_incident_version(uuid4())
+
     @pytest.mark.asyncio
     async def test_get_all_incidents(self, service, uow):
         """Тест получения всех инцидентов"""
@@ -173,21 +252,154 @@ class TestIncidentService:
         assert uow.committed
         uow.incidents.get_incidents_by_status.assert_called_once_with(IncidentStatus.OPEN)
 
+    @pytest.mark.asyncio
+    async def test_get_incidents_page_with_next_cursor(self, service, uow):
+        """Тест получения страницы инцидентов с курсором на следующую"""
+        mock_incidents = [
+            create_mock_incident(description=f"Incident {i}") for i in range(3)
+        ]
+        uow.incidents.get_incidents_page.return_value = mock_incidents
+
+        result = await service.get_incidents_page(limit=2)
+
+        assert len(result.items) == 2
+        assert decode_cursor(result.next_cursor) == (
+            mock_incidents[1].created_at, mock_incidents[1].id
+        )
+        uow.incidents.get_incidents_page.assert_called_once_with(
+            limit=3, after=None, filters=None
+        )
+
+    @pytest.mark.asyncio
+    async def test_get_incidents_page_last_page(self, service, uow):
+        """Тест последней страницы: курсор на следующую отсутствует"""
+        incident = create_mock_incident()
+        uow.incidents.get_incidents_page.return_value = [incident]
+        cursor = encode_cursor(datetime(2025, 1, 1), uuid4())
+
+        filters = IncidentFilter(
+            statuses=[IncidentStatus.OPEN, IncidentStatus.WAITING],
+            source=IncidentSource.PARTNER,
+        )
+        result = await service.get_incidents_page(limit=2, cursor=cursor, filters=filters)
+
+        assert len(result.items) == 1
+        assert result.next_cursor is None
+        uow.incidents.get_incidents_page.assert_called_once_with(
+            limit=3, after=decode_cursor(cursor), filters=filters
+        )
+
+    @pytest.mark.asyncio
+    async def test_get_incidents_page_invalid_cursor(self, service, uow):
+        """Тест передачи некорректного курсора"""
+        with pytest.raises(InvalidCursorError):
+            await service.get_incidents_page(limit=2, cursor="not-a-cursor")
+
+        uow.incidents.get_incidents_page.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_search_incidents_with_next_cursor(self, service, uow):
+        """Тест поиска: результаты с релевантностью и курсор (rank, id)"""
+        incidents = [create_mock_incident(description=f"Disk full {i}") for i in range(3)]
+        uow.incidents.search_incidents.return_value = list(zip(incidents, [0.9, 0.75, 0.5]))
+        filters = IncidentFilter(source=IncidentSource.MONITORING)
+
+        page = await service.search_incidents("disk full", limit=2, filters=filters)
+
+        assert [item.rank for item in page.items] == [0.9, 0.75]
+        assert decode_search_cursor(page.next_cursor) == (0.75, incidents[1].id)
+        uow.incidents.search_incidents.assert_called_once_with(
+            "disk full", limit=3, after=None, filters=filters
+        )
+
+    @pytest.mark.asyncio
+    async def test_search_incidents_invalid_cursor(self, service, uow):
+        """Тест поиска с курсором обычного списка"""
+        with pytest.raises(InvalidCursorError):
+            await service.search_incidents(
+                "disk", limit=10, cursor=encode_cursor(datetime.now(), uuid4())
+            )
+
+    def test_incident_filter_invalid_created_range(self):
+        """Тест фильтра с перепутанными границами интервала"""
+        with pytest.raises(ValueError):
+            IncidentFilter(created_from=datetime(2025, 2, 1), created_to=datetime(2025, 1, 1))
+
+    def test_incident_filter_normalizes_to_naive_utc(self):
+        """Тест: границы с часовым поясом приводятся к наивному UTC, как колонка created_at"""
+        filters = IncidentFilter(
+            created_from=datetime(2025, 1, 1, 3, tzinfo=timezone(timedelta(hours=3))),
+            created_to=datetime(2025, 1, 2),
+        )
+
+        assert filters.created_from == datetime(2025, 1, 1, 0)
+        assert filters.created_to == datetime(2025, 1, 2)
+
+    @pytest.mark.asyncio
+    async def test_mock_repository_filters_by_naive_bounds(self):
+        """Тест: наивные границы фильтра сравниваются со временем инцидентов в UTC"""
+        repository = MockIncidentRepository()
+        incident = await repository.create_incident("Test incident")
+        created_at = incident.created_at.replace(tzinfo=None)
+
+        inside = await repository.get_incidents_page(
+            limit=10, filters=IncidentFilter(created_from=created_at, created_to=created_at + timedelta(seconds=1))
+        )
+        outside = await repository.get_incidents_page(
+            limit=10, filters=IncidentFilter(created_to=created_at)
+        )
+
+        assert inside == [incident]
+        assert outside == []
+
+    @pytest.mark.asyncio
+    async def test_export_incidents_ndjson(self, service, uow):
+        """Тест потоковой выгрузки в NDJSON порциями"""
+        chunks = [
+            [create_mock_incident(description="Incident 1"), create_mock_incident(description="Incident 2")],
+            [create_mock_incident(description="Incident 3")],
+        ]
+
+        async def stream_incidents(chunk_size, filters):
+            for chunk in chunks:
+                yield chunk
+
+        uow.incidents.stream_incidents = stream_incidents
+
+        parts = [part async for part in service.export_incidents(ExportFormat.NDJSON, 2)]
+
+        assert len(parts) == 2
+        rows = [json.loads(line) for line in b"".join(parts).decode().splitlines()]
+        assert [row["description"] for row in rows] == ["Incident 1", "Incident 2", "Incident 3"]
+        assert rows[0]["status"] == IncidentStatus.OPEN
+        assert uow.committed
+
+    @pytest.mark.asyncio
+    async def test_export_incidents_csv(self, service, uow):
+        """Тест потоковой выгрузки в CSV с заголовком"""
+        async def stream_incidents(chunk_size, filters):
+            yield [create_mock_incident(description='Quoted "description", with comma')]
+
+        uow.incidents.stream_incidents = stream_incidents
+
+        parts = [part async for part in service.export_incidents(ExportFormat.CSV, 100)]
+
+        lines = b"".join(parts).decode().splitlines()
+        assert lines[0] == "id,description,status,source,created_at"
+        assert '"Quoted ""description"", with comma"' in lines[1]
+
     @pytest.mark.asyncio
     async def test_update_incident_status_valid(self, service, uow):
         """Тест обновления статуса инцидента с допустимым переходом"""
         incident_id = uuid4()
-        mock_incident = create_mock_incident(
-            incident_id=incident_id, 
-            status=IncidentStatus.OPEN  # Начальный статус OPEN
-        )
         updated_incident = create_mock_incident(
             incident_id=incident_id,
             status=IncidentStatus.IN_PROGRESS  # Обновленный статус
         )
 
-        uow.incidents.get_incident_by_id.return_value = mock_incident
-        uow.incidents.update_incident_status.return_value = updated_incident
+        uow.incidents.transition_incident_status.return_value = GuardedWriteResult(
+            IncidentStatus.OPEN, applied=True, incident=updated_incident
+        )
 
         status_update = IncidentStatusUpdate(status=IncidentStatus.IN_PROGRESS)
         result = await service.update_incident_status(incident_id, status_update)
@@ -195,35 +407,208 @@ class TestIncidentService:
         assert result.id == incident_id
         assert result.status == IncidentStatus.IN_PROGRESS
         assert uow.committed
-        uow.incidents.get_incident_by_id.assert_called_once_with(incident_id)
-        uow.incidents.update_incident_status.assert_called_once()
+        uow.incidents.transition_incident_status.assert_called_once_with(
+            incident_id,
+            IncidentStatus.IN_PROGRESS,
+            [IncidentStatus.OPEN, IncidentStatus.WAITING],
+        )
+        uow.incidents.get_incident_by_id.assert_not_called()
 
     @pytest.mark.asyncio
     async def test_update_incident_status_not_found(self, service, uow):
         """Тест обновления статуса несуществующего инцидента"""
-        uow.incidents.get_incident_by_id.return_value = None
+        uow.incidents.transition_incident_status.return_value = GuardedWriteResult(
+            None, applied=False
+        )
         incident_id = uuid4()
 
         status_update = IncidentStatusUpdate(status=IncidentStatus.IN_PROGRESS)
         with pytest.raises(IncidentNotFoundError):
             await service.update_incident_status(incident_id, status_update)
 
-        uow.incidents.get_incident_by_id.assert_called_once_with(incident_id)
-        uow.incidents.update_incident_status.assert_not_called()
+        uow.incidents.transition_incident_status.assert_called_once()
+        assert uow.rolled_back
 
     @pytest.mark.asyncio
     async def test_invalid_status_transition(self, service, uow):
         """Тест недопустимого перехода статуса"""
         incident_id = uuid4()
-        mock_incident = MagicMock()
-        mock_incident.id = incident_id
-        mock_incident.status = IncidentStatus.RESOLVED.value
-
-        uow.incidents.get_incident_by_id.return_value = mock_incident
+        uow.incidents.transition_incident_status.return_value = GuardedWriteResult(
+            IncidentStatus.RESOLVED, applied=False
+        )
 
         status_update = IncidentStatusUpdate(status=IncidentStatus.OPEN)
         with pytest.raises(ValueError) as exc_info:
             await service.update_incident_status(incident_id, status_update)
 
         assert "Invalid status transition" in str(exc_info.value)
-        uow.incidents.update_incident_status.assert_not_called()
\ No newline at end of file
+        assert "resolved" in str(exc_info.value)
+        # В OPEN нельзя перейти ни из одного статуса
+        uow.incidents.transition_incident_status.assert_called_once_with(
+            incident_id, IncidentStatus.OPEN, []
+        )
+
+    @pytest.mark.asyncio
+    async def test_update_incidents_status(self, service, uow):
+        """Тест пакетной смены статуса: измененные, недопустимые и отсутствующие"""
+        changed_id, invalid_id, missing_id = uuid4(), uuid4(), uuid4()
+        uow.incidents.transition_incidents_status.return_value = {
+            changed_id: GuardedWriteResult(
+                IncidentStatus.IN_PROGRESS, applied=True, incident=create_mock_incident(changed_id)
+            ),
+            invalid_id: GuardedWriteResult(IncidentStatus.CANCELLED, applied=False),
+            missing_id: GuardedWriteResult(None, applied=False),
+        }
+
+        result = await service.update_incidents_status(
+            IncidentBulkStatusUpdate(ids=[changed_id, invalid_id, missing_id], status=IncidentStatus.RESOLVED)
+        )
+
+        assert result.changed == [changed_id]
+        assert [(item.id, item.status) for item in result.invalid] == [(invalid_id, IncidentStatus.CANCELLED)]
+        assert result.missing == [missing_id]
+        assert uow.committed
+        uow.incidents.transition_incidents_status.assert_called_once_with(
+            [changed_id, invalid_id, missing_id],
+            IncidentStatus.RESOLVED,
+            [IncidentStatus.IN_PROGRESS, IncidentStatus.WAITING],
+        )
+
+    @pytest.mark.asyncio
+    async def test_update_incident_description(self, service, uow):
+        """Тест обновления описания незакрытого инцидента"""
+        incident_id = uuid4()
+        updated_incident = create_mock_incident(incident_id=incident_id, description="New")
+        uow.incidents.update_incident_description.return_value = GuardedWriteResult(
+            IncidentStatus.OPEN, applied=True, incident=updated_incident
+        )
+
+        result = await service.update_incident_description(incident_id, "New")
+
+        assert result.description == "New"
+        uow.incidents.update_incident_description.assert_called_once_with(
+            incident_id, "New", ACTIVE_STATUSES
+        )
+
+    @pytest.mark.asyncio
+    async def test_update_incident_description_closed(self, service, uow):
+        """Тест запрета изменения описания закрытого инцидента"""
+        uow.incidents.update_incident_description.return_value = GuardedWriteResult(
+            IncidentStatus.CANCELLED, applied=False
+        )
+
+        with pytest.raises(ValueError) as exc_info:
+            await service.update_incident_description(uuid4(), "New")
+
+        assert "Cannot update description" in str(exc_info.value)
+
+    @pytest.mark.asyncio
+    async def test_delete_incident(self, service, uow):
+        """Тест удаления решенного инцидента"""
+        incident_id = uuid4()
+        uow.incidents.delete_incident_in_status.return_value = GuardedWriteResult(
+            IncidentStatus.RESOLVED, applied=True
+        )
+
+        assert await service.delete_incident(incident_id) is True
+        uow.incidents.delete_incident_in_status.assert_called_once_with(
+            incident_id, FINAL_STATUSES
+        )
+        assert uow.committed
+
+    @pytest.mark.asyncio
+    async def test_delete_incident_not_closed(self, service, uow):
+        """Тест запрета удаления незакрытого инцидента"""
+        uow.incidents.delete_incident_in_status.return_value = GuardedWriteResult(
+            IncidentStatus.IN_PROGRESS, applied=False
+        )
+
+        with pytest.raises(ValueError) as exc_info:
+            await service.delete_incident(uuid4())
+
+        assert "Cannot delete incident" in str(exc_info.value)
+
+    @pytest.mark.asyncio
+    async def test_delete_incident_not_found(self, service, uow):
+        """Тест удаления несуществующего инцидента"""
+        uow.incidents.delete_incident_in_status.return_value = GuardedWriteResult(
+            None, applied=False
+        )
+
+        with pytest.raises(IncidentNotFoundError):
+            await service.delete_incident(uuid4())
+
+    @pytest.mark.asyncio
+    async def test_get_incident_stats(self, service, uow):
+        """Тест сводной статистики по счетчикам"""
+        uow.incidents.get_incident_stats.return_value = [
+            ("open", "operator", 3),
+            ("open", "partner", 2),
+            ("resolved", "operator", 1),
+            ("cancelled", "monitoring", 0),
+        ]
+
+        stats = await service.get_incident_stats()
+
+        assert stats.total == 6
+        assert stats.by_status[IncidentStatus.OPEN] == 5
+        assert stats.by_status[IncidentStatus.CANCELLED] == 0
+        assert stats.by_source[IncidentSource.OPERATOR] == 4
+        assert [(item.status, item.source, item.count) for item in stats.items] == [
+            (IncidentStatus.OPEN, IncidentSource.OPERATOR, 3),
+            (IncidentStatus.OPEN, IncidentSource.PARTNER, 2),
+            (IncidentStatus.RESOLVED, IncidentSource.OPERATOR, 1),
+        ]
+
+
+    @pytest.mark.asyncio
+    async def test_get_incidents_page_json_matches_model(self, service, uow):
+        """Тест: быстрый путь дает тот же JSON, что и IncidentPage"""
+        repository = MockIncidentRepository()
+        for i in range(3):
+            await repository.create_incident(f"Incident {i}", source=IncidentSource.PARTNER)
+        uow.incidents.get_incident_rows_page = repository.get_incident_rows_page
+        uow.incidents.get_incidents_page = repository.get_incidents_page
+
+        content = await service.get_incidents_page_json(limit=2)
+        page = await service.get_incidents_page(limit=2)
+
+        assert json.loads(content) == json.loads(page.model_dump_json())
+
+    @pytest.mark.asyncio
+    async def test_get_incidents_page_json_with_fields(self, service, uow):
+        """Тест: из БД читаются только запрошенные поля и ключ курсора"""
+        repository = MockIncidentRepository()
+        for i in range(3):
+            await repository.create_incident(f"Incident {i}")
+        uow.incidents.get_incident_rows_page = AsyncMock(wraps=repository.get_incident_rows_page)
+
+        content = await service.get_incidents_page_json(limit=2, fields=("status",))
+
+        page = json.loads(content)
+        assert page["items"] == [{"status": "open"}, {"status": "open"}]
+        assert page["next_cursor"] is not None
+        assert uow.incidents.get_incident_rows_page.call_args.kwargs["fields"] == (
+            "id", "status", "created_at"
+        )
+
+    @pytest.mark.asyncio
+    async def test_get_incident_fields(self, service, uow):
+        """Тест получения части полей инцидента"""
+        repository = MockIncidentRepository()
+        incident = await repository.create_incident("Test incident")
+        uow.incidents.get_incident_row = repository.get_incident_row
+
+        projection, version = await service.get_incident_fields(incident.id, ("id", "status"))
+
+        assert json.loads(projection.model_dump_json()) == {"id": str(incident.id), "status": "open"}
+        assert version == 1
+        with pytest.raises(IncidentNotFoundError):
+            await service.get_incident_fields(uuid4(), ("id",))
+
+    def test_parse_incident_fields(self):
+        """Тест разбора параметра fields и кэширования схем"""
+        assert parse_incident_fields("created_at, id,status") == ("id", "status", "created_at")
+        assert incident_projection_model(("id",)) is incident_projection_model(("id",))
+        with pytest.raises(ValueError):
+            parse_incident_fields("id,secret")
@@ -0,0 +1,92 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from uuid import uuid4
+from sqlalchemy.dialects import postgresql
+from core.enums import FINAL_STATUSES, IncidentStatus, IncidentSource
+from repositories.incident import IncidentRepository
+from repositories.mock_incident import MockIncidentRepository
+from schemas.incident import IncidentCreate
+
+
+class TestIncidentStatsDeltas:
+    """Тесты учета изменений счетчиков в репозитории"""
+
+    @pytest.fixture
+    def repository(self):
+        return MockIncidentRepository()
+
+    @pytest.mark.asyncio
+    async def test_writes_update_counters(self, repository):
+        """Тест: создание, смена статуса и удаление меняют счетчики"""
+        incident = await repository.create_incident("Test incident", source=IncidentSource.PARTNER)
+        await repository.create_incidents_bulk(
+            [IncidentCreate(description="Bulk incident", source=IncidentSource.PARTNER)]
+        )
+        await repository.transition_incident_status(
+            incident.id, IncidentStatus.CANCELLED, [IncidentStatus.OPEN]
+        )
+        await repository.apply_stats_deltas()
+        assert sorted(await repository.get_incident_stats()) == [
+            ("cancelled", "partner", 1),
+            ("open", "partner", 1),
+        ]
+
+        await repository.delete_incident_in_status(incident.id, FINAL_STATUSES)
+        await repository.apply_stats_deltas()
+        assert dict(
+            ((status, source), count)
+            for status, source, count in await repository.get_incident_stats()
+        )[("cancelled", "partner")] == 0
+
+    @pytest.mark.asyncio
+    async def test_rejected_transition_does_not_change_counters(self, repository):
+        """Тест: непримененная смена статуса не меняет счетчики"""
+        incident = await repository.create_incident("Test incident")
+        repository.stats_deltas.clear()
+
+        await repository.transition_incident_status(
+            incident.id, IncidentStatus.RESOLVED, [IncidentStatus.IN_PROGRESS]
+        )
+
+        assert not repository.stats_deltas
+
+    @pytest.mark.asyncio
+    async def test_bulk_transition_counts_only_applied(self, repository):
+        """Тест: пакетная смена статуса меняет счетчики и пишет события только для примененных"""
+        first = await repository.create_incident("First", source=IncidentSource.PARTNER)
+        second = await repository.create_incident("Second", source=IncidentSource.PARTNER)
+        await repository.transition_incident_status(second.id, IncidentStatus.CANCELLED, [IncidentStatus.OPEN])
+        await repository.apply_stats_deltas()
+        repository.events.clear()
+
+        results = await repository.transition_incidents_status(
+            [first.id, second.id, first.id, uuid4()], IncidentStatus.IN_PROGRESS, [IncidentStatus.OPEN]
+        )
+        await repository.apply_stats_deltas()
+
+        assert [result.applied for result in results.values()] == [True, False, False]
+        assert [event.id for event in repository.events] == [first.id]
+        stats = {(status, source): count for status, source, count in await repository.get_incident_stats()}
+        assert stats[("open", "partner")] == 0
+        assert stats[("in_progress", "partner")] == 1
+
+
+class TestRebuildStatement:
+    """Тесты SQL пересчета счетчиков"""
+
+    @pytest.mark.asyncio
+    async def test_rebuild_adds_correction_without_table_lock(self):
+        """Тест: пересчет - один запрос, добавляющий к счетчикам разницу, без LOCK TABLE"""
+        session = MagicMock(execute=AsyncMock())
+        repository = IncidentRepository(session)
+        repository.stats_deltas[("open", "partner")] = 1
+
+        await repository.rebuild_incident_stats()
+
+        session.execute.assert_awaited_once()
+        sql = str(session.execute.await_args.args[0].compile(dialect=postgresql.dialect()))
+        assert "LOCK" not in sql
+        assert "DELETE" not in sql
+        assert "FULL OUTER JOIN recorded" in sql
+        assert "DO UPDATE SET count = (incident_stats.count + excluded.count)" in sql
+        assert not repository.stats_deltas
@@ -0,0 +1,177 @@
+import asyncio
+import pytest
+from contextlib import asynccontextmanager
+from unittest.mock import patch
+from core.enums import IncidentStatus, IncidentSource
+from repositories.mock_incident import MockIncidentRepository
+from schemas.incident import IncidentCreate
+from services.ingestion import IncidentIngestionQueue, IngestionQueueFullError, IngestionStoppedError
+
+
+class _UnitOfWork:
+    """Минимальный Unit of Work вокруг mock-репозитория"""
+
+    def __init__(self, incidents):
+        self.incidents = incidents
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class TestIncidentIngestionQueue:
+    """Тесты очереди создания инцидентов микропакетами"""
+
+    @pytest.fixture
+    def repository(self):
+        return MockIncidentRepository()
+
+    def _queue(self, repository, queue_size=100, batch_size=10, flush_seconds=0.05):
+        @asynccontextmanager
+        async def uow_factory():
+            yield _UnitOfWork(repository)
+
+        return IncidentIngestionQueue(uow_factory, queue_size, batch_size, flush_seconds)
+
+    @pytest.mark.asyncio
+    async def test_concurrent_creates_are_coalesced(self, repository):
+        """Тест: конкурентные создания записываются одним пакетом"""
+        queue = self._queue(repository)
+        await queue.start()
+        with patch.object(
+            repository, "create_incidents_bulk", wraps=repository.create_incidents_bulk
+        ) as bulk:
+            results = await asyncio.gather(*(
+                queue.submit(IncidentCreate(description=f"Incident {i}", source=IncidentSource.PARTNER))
+                for i in range(5)
+            ))
+        await queue.stop()
+
+        assert bulk.call_count == 1
+        assert [incident.description for incident, _ in results] == [f"Incident {i}" for i in range(5)]
+        assert all(incident.status == IncidentStatus.OPEN and created for incident, created in results)
+        assert queue.stats()["batches"] == 1
+
+    @pytest.mark.asyncio
+    async def test_batches_are_limited_by_size(self, repository):
+        """Тест: пакет не превышает batch_size"""
+        queue = self._queue(repository, batch_size=2, flush_seconds=10)
+        await queue.start()
+        await asyncio.gather(*(
+            queue.submit(IncidentCreate(description="Incident", source=IncidentSource.OPERATOR))
+            for _ in range(4)
+        ))
+        await queue.stop()
+
+        assert queue.stats()["batches"] == 2
+        assert repository.get_count() == 4
+
+    @pytest.mark.asyncio
+    async def test_full_queue_rejects(self, repository):
+        """Тест: при переполнении очереди запрос отклоняется сразу"""
+        queue = self._queue(repository, queue_size=1)
+        incident_data = IncidentCreate(description="Incident", source=IncidentSource.OPERATOR)
+        pending = asyncio.create_task(queue.submit(incident_data))
+        await asyncio.sleep(0)
+
+        with pytest.raises(IngestionQueueFullError):
+            await queue.submit(incident_data)
+
+        await queue.start()
+        await queue.stop()
+        assert (await pending)[0].description == "Incident"
+        assert queue.stats()["rejected"] == 1
+
+    @pytest.mark.asyncio
+    async def test_stop_flushes_and_rejects_new(self, repository):
+        """Тест: остановка записывает накопленное и больше не принимает"""
+        queue = self._queue(repository, flush_seconds=10)
+        await queue.start()
+        pending = asyncio.create_task(
+            queue.submit(IncidentCreate(description="Incident", source=IncidentSource.OPERATOR))
+        )
+        await asyncio.sleep(0)
+        await queue.stop()
+
+        assert (await pending)[0].description == "Incident"
+        with pytest.raises(IngestionStoppedError):
+            await queue.submit(IncidentCreate(description="Late", source=IncidentSource.OPERATOR))
+
+    @pytest.mark.asyncio
+    async def test_idempotency_key_repeated_in_batch(self, repository):
+        """Тест: повтор ключа в одном пакете получает тот же инцидент"""
+        queue = self._queue(repository)
+        await queue.start()
+        incident_data = IncidentCreate(
+            description="Incident", source=IncidentSource.MONITORING, idempotency_key="alert-1"
+        )
+        (first, first_created), (second, second_created) = await asyncio.gather(
+            queue.submit(incident_data), queue.submit(incident_data)
+        )
+        await queue.stop()
+
+        assert first.id == second.id
+        assert (first_created, second_created) == (True, False)
+        assert repository.get_count() == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_fails_callers(self, repository):
+        """Тест: ошибка записи пакета возвращается всем ожидающим"""
+        queue = self._queue(repository)
+        await queue.start()
+        with patch.object(repository, "create_incidents_bulk", side_effect=RuntimeError("db is down")):
+            with pytest.raises(RuntimeError):
+                await queue.submit(IncidentCreate(description="Incident", source=IncidentSource.OPERATOR))
+        await queue.stop()
+
+        assert queue.stats()["failed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_poisoned_item_fails_only_its_caller(self, repository):
+        """Тест: ошибка одного элемента не проваливает остальные элементы пакета"""
+        queue = self._queue(repository, batch_size=8)
+        create_incidents_bulk = repository.create_incidents_bulk
+        attempts = []
+
+        async def failing_bulk(incidents, status):
+            attempts.append(len(incidents))
+            if any(incident.description == "Poison" for incident in incidents):
+                raise ValueError("invalid row")
+            return await create_incidents_bulk(incidents, status)
+
+        descriptions = [f"Incident {i}" for i in range(7)] + ["Poison"]
+        await queue.start()
+        with patch.object(repository, "create_incidents_bulk", side_effect=failing_bulk):
+            results = await asyncio.gather(
+                *(
+                    queue.submit(IncidentCreate(description=description, source=IncidentSource.OPERATOR))
+                    for description in descriptions
+                ),
+                return_exceptions=True,
+            )
+        await queue.stop()
+
+        assert [isinstance(result, ValueError) for result in results] == [False] * 7 + [True]
+        assert repository.get_count() == 7
+        assert attempts == [8, 4, 4, 2, 2, 1, 1]
+        assert queue.stats()["failed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_connection_error_is_not_retried(self, repository):
+        """Тест: ошибка соединения с БД сразу возвращается всему пакету"""
+        queue = self._queue(repository, batch_size=2)
+        await queue.start()
+        with patch.object(
+            repository, "create_incidents_bulk", side_effect=ConnectionRefusedError("db is down")
+        ) as create_incidents_bulk:
+            results = await asyncio.gather(
+                queue.submit(IncidentCreate(description="First", source=IncidentSource.OPERATOR)),
+                queue.submit(IncidentCreate(description="Second", source=IncidentSource.OPERATOR)),
+                return_exceptions=True,
+            )
+        await queue.stop()
+
+        assert all(isinstance(result, ConnectionRefusedError) for result in results)
+        assert create_incidents_bulk.call_count == 1
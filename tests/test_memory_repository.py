@@ -0,0 +1,143 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from core.enums import IncidentSource, IncidentStatus
+from core.unit_of_work import InMemoryUnitOfWork
+from repositories.memory_incident import InMemoryIncidentRepository
+from schemas.incident import IncidentCreate, IncidentFilter, IncidentOut
+from services.incident import IncidentService
+
+
+SOURCES = list(IncidentSource)
+STATUSES = list(IncidentStatus)
+
+
+async def populate(repository, count: int = 60):
+    """Инциденты с разными статусами, источниками и временем создания (есть совпадающие)"""
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    for index in range(count):
+        incident = await repository.create_incident(f"Incident {index}", source=SOURCES[index % len(SOURCES)])
+        await repository.update_incident(
+            incident.id,
+            status=STATUSES[index % len(STATUSES)].value,
+            created_at=start + timedelta(minutes=index // 3),
+        )
+
+
+def expected(repository, filters=None):
+    """Эталон: полный перебор с сортировкой, как ORDER BY created_at DESC, id DESC"""
+    return sorted(
+        (incident for incident in repository._incidents.values() if repository._matches(incident, filters)),
+        key=lambda incident: (incident.created_at, incident.id),
+        reverse=True,
+    )
+
+
+class TestInMemoryIncidentRepository:
+    """Тесты индексированного репозитория в памяти"""
+
+    @pytest.fixture
+    def repository(self):
+        return InMemoryIncidentRepository()
+
+    @pytest.mark.asyncio
+    async def test_orders_by_created_at_desc(self, repository):
+        """Тест: все инциденты и выборка по статусу - по убыванию created_at"""
+        await populate(repository)
+
+        all_incidents = await repository.get_all_incidents()
+        in_progress = await repository.get_incidents_by_status(IncidentStatus.IN_PROGRESS)
+
+        assert all_incidents == expected(repository)
+        assert in_progress == expected(repository, IncidentFilter(statuses=[IncidentStatus.IN_PROGRESS]))
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "filters",
+        [
+            None,
+            IncidentFilter(statuses=[IncidentStatus.OPEN, IncidentStatus.RESOLVED]),
+            IncidentFilter(source=IncidentSource.PARTNER),
+            IncidentFilter(
+                statuses=[IncidentStatus.WAITING],
+                source=IncidentSource.OPERATOR,
+                created_from=datetime(2025, 1, 1, 0, 3, tzinfo=timezone.utc),
+                created_to=datetime(2025, 1, 1, 0, 15, tzinfo=timezone.utc),
+            ),
+        ],
+    )
+    async def test_cursor_pages_match_full_scan(self, repository, filters):
+        """Тест: страницы по курсору (created_at, id) складываются в полную выборку"""
+        await populate(repository)
+
+        pages, after = [], None
+        while True:
+            page = await repository.get_incidents_page(limit=7, after=after, filters=filters)
+            pages.extend(page)
+            if len(page) < 7:
+                break
+            after = (page[-1].created_at, page[-1].id)
+
+        assert pages == expected(repository, filters)
+
+    @pytest.mark.asyncio
+    async def test_indexes_follow_writes(self, repository):
+        """Тест: смена статуса, удаление и архивирование обновляют индексы"""
+        first = await repository.create_incident("First")
+        second = await repository.create_incident("Second")
+
+        await repository.transition_incident_status(first.id, IncidentStatus.RESOLVED, [IncidentStatus.OPEN])
+        await repository.delete_incident(second.id)
+
+        assert await repository.get_incidents_by_status(IncidentStatus.OPEN) == []
+        assert await repository.get_incidents_by_status(IncidentStatus.RESOLVED) == [first]
+        assert await repository.archive_incidents(timedelta(0), limit=10) == 1
+        assert await repository.get_incidents_page(limit=10) == []
+        assert (await repository.get_archived_incident(first.id)).status == IncidentStatus.RESOLVED.value
+
+    @pytest.mark.asyncio
+    async def test_records_are_compact_and_serializable(self, repository):
+        """Тест: запись без __dict__ сериализуется как сущность"""
+        incident = await repository.create_incident("Test incident", source=IncidentSource.MONITORING)
+
+        assert not hasattr(incident, "__dict__")
+        assert IncidentOut.model_validate(incident).source == IncidentSource.MONITORING
+
+
+class TestInMemoryUnitOfWork:
+    """Тесты транзакций над репозиторием в памяти"""
+
+    @pytest.mark.asyncio
+    async def test_rollback_restores_state(self):
+        """Тест: откат возвращает инциденты, индексы и ключи идемпотентности"""
+        uow = InMemoryUnitOfWork()
+        service = IncidentService(uow)
+        kept = await service.create_incident(IncidentCreate(description="Kept incident", source=IncidentSource.PARTNER))
+
+        with pytest.raises(RuntimeError):
+            async with uow:
+                await uow.incidents.create_incidents_bulk(
+                    [IncidentCreate(description="Dropped", source=IncidentSource.PARTNER, idempotency_key="k1")]
+                )
+                await uow.incidents.transition_incident_status(
+                    kept.id, IncidentStatus.IN_PROGRESS, [IncidentStatus.OPEN]
+                )
+                raise RuntimeError("boom")
+
+        assert [incident.id for incident in await uow.incidents.get_all_incidents()] == [kept.id]
+        assert await uow.incidents.get_incidents_by_status(IncidentStatus.IN_PROGRESS) == []
+        assert (await uow.incidents.get_incident_by_id(kept.id)).version == 1
+        assert uow.incidents._idempotency_keys == {}
+        assert await uow.incidents.get_incident_stats() == [("open", "partner", 1)]
+
+    @pytest.mark.asyncio
+    async def test_commit_records_history_and_bumps_version(self):
+        """Тест: коммит пишет журнал статусов и увеличивает версию коллекции"""
+        uow = InMemoryUnitOfWork()
+        version = await uow.incidents.get_collection_version()
+
+        incident = await IncidentService(uow).create_incident(
+            IncidentCreate(description="Test incident", source=IncidentSource.OPERATOR)
+        )
+
+        assert uow.incidents.status_history[0][:3] == (incident.id, None, "open")
+        assert await uow.incidents.get_collection_version() == version + 1
@@ -0,0 +1,66 @@
+import pytest
+from types import SimpleNamespace
+from prometheus_client import REGISTRY
+from core.metrics import MetricsMiddleware, UNMATCHED_ROUTE, render_metrics, statement_operation
+
+
+def request_count(route: str, status: str) -> float:
+    value = REGISTRY.get_sample_value(
+        "http_request_duration_seconds_count", {"method": "GET", "route": route, "status": status}
+    )
+    return value or 0.0
+
+
+async def call(middleware, scope: dict) -> None:
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    await middleware(scope, receive, send)
+
+
+class TestMetrics:
+    """Тесты сбора метрик"""
+
+    def test_statement_operation(self):
+        """Тест: вид запроса определяется по первому слову, прочие - OTHER"""
+        assert statement_operation("  select 1") == "SELECT"
+        assert statement_operation("WITH written AS (UPDATE ...) SELECT ...") == "WITH"
+        assert statement_operation("LOCK TABLE incidents IN SHARE MODE") == "OTHER"
+
+    @pytest.mark.asyncio
+    async def test_latency_labelled_by_route_template(self):
+        """Тест: метка - шаблон маршрута, а не фактический путь; без маршрута - unmatched"""
+        route = "/incidents/{incident_id}"
+
+        async def app(scope, receive, send):
+            status = 404
+            if scope["path"] != "/missing":
+                scope["route"] = SimpleNamespace(path=route)
+                status = 200
+            await send({"type": "http.response.start", "status": status, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        middleware = MetricsMiddleware(app)
+        before = request_count(route, "200"), request_count(UNMATCHED_ROUTE, "404")
+
+        await call(middleware, {"type": "http", "method": "GET", "path": "/incidents/1"})
+        await call(middleware, {"type": "http", "method": "GET", "path": "/missing"})
+
+        assert request_count(route, "200") == before[0] + 1
+        assert request_count(UNMATCHED_ROUTE, "404") == before[1] + 1
+        assert b"http_request_duration_seconds_bucket" in render_metrics()
+
+    @pytest.mark.asyncio
+    async def test_unhandled_error_recorded_as_500(self):
+        """Тест: необработанное исключение учитывается как 500"""
+        async def app(scope, receive, send):
+            raise RuntimeError("boom")
+
+        before = request_count(UNMATCHED_ROUTE, "500")
+        with pytest.raises(RuntimeError):
+            await call(MetricsMiddleware(app), {"type": "http", "method": "GET", "path": "/boom"})
+
+        assert request_count(UNMATCHED_ROUTE, "500") == before + 1
@@ -0,0 +1,135 @@
+import pytest
+from datetime import date, datetime, timezone
+from unittest.mock import AsyncMock
+from uuid import uuid4
+from core.ids import ID_TIME_TOLERANCE, uuid7, uuid7_time
+from sqlalchemy.dialects import postgresql
+from sqlalchemy import select
+from db.partitions import (
+    Partition,
+    add_months,
+    create_partition,
+    expired_partitions,
+    missing_months,
+    parse_partition_bound,
+    partition_name,
+)
+from models.incident import Incident
+from repositories.incident import IncidentRepository, incident_key, incident_keys
+
+
+class TestPartitionHelpers:
+    """Тесты расчета помесячных партиций"""
+
+    def test_add_months_crosses_year(self):
+        """Тест: сложение месяцев с переходом через год"""
+        assert add_months(date(2025, 11, 1), 3) == date(2026, 2, 1)
+        assert add_months(date(2025, 1, 1), -1) == date(2024, 12, 1)
+
+    def test_partition_name(self):
+        """Тест: имя партиции совпадает с именами из миграции"""
+        assert partition_name(date(2025, 3, 1)) == "incidents_2025_03"
+
+    def test_parse_partition_bound(self):
+        """Тест: разбор границ из pg_get_expr"""
+        bound = "FOR VALUES FROM ('2025-11-01 00:00:00') TO ('2025-12-01 00:00:00')"
+        assert parse_partition_bound(bound) == (date(2025, 11, 1), date(2025, 12, 1))
+        assert parse_partition_bound("DEFAULT") is None
+
+    def test_missing_months(self):
+        """Тест: создаются только отсутствующие партиции текущего и будущих месяцев"""
+        partitions = [Partition("incidents_2025_11", date(2025, 11, 1), date(2025, 12, 1))]
+
+        assert missing_months(partitions, date(2025, 11, 19), months_ahead=2) == [
+            date(2025, 12, 1),
+            date(2026, 1, 1),
+        ]
+
+    def test_expired_partitions(self):
+        """Тест: устаревшими считаются партиции, целиком лежащие до границы хранения"""
+        partitions = [
+            Partition(partition_name(month), month, add_months(month, 1))
+            for month in (date(2025, 8, 1), date(2025, 9, 1), date(2025, 10, 1))
+        ]
+
+        expired = expired_partitions(partitions, date(2025, 11, 19), retention_months=2)
+
+        assert [partition.name for partition in expired] == ["incidents_2025_08"]
+
+
+class TestCreatePartition:
+    """Тесты создания партиции поверх DEFAULT-партиции"""
+
+    @staticmethod
+    def statements(connection) -> list[str]:
+        return [str(call.args[0]) for call in connection.execute.await_args_list]
+
+    @pytest.mark.asyncio
+    async def test_empty_default_creates_partition_of(self):
+        """Тест: без строк месяца в DEFAULT партиция создается сразу"""
+        connection = AsyncMock()
+        connection.scalar.return_value = False
+
+        assert await create_partition(connection, date(2026, 2, 1)) == "incidents_2026_02"
+
+        statements = self.statements(connection)
+        assert len(statements) == 2
+        assert statements[1].startswith("CREATE TABLE IF NOT EXISTS incidents_2026_02 PARTITION OF incidents")
+
+    @pytest.mark.asyncio
+    async def test_rows_in_default_are_moved(self):
+        """Тест: строки месяца переносятся из DEFAULT до присоединения партиции"""
+        connection = AsyncMock()
+        connection.scalar.return_value = True
+
+        await create_partition(connection, date(2026, 2, 1))
+
+        statements = self.statements(connection)
+        assert statements[0].startswith("LOCK TABLE incidents_default")
+        assert "DELETE FROM incidents_default" in statements[2]
+        assert "INSERT INTO incidents_2026_02" in statements[2]
+        assert statements[3] == (
+            "ALTER TABLE incidents ATTACH PARTITION incidents_2026_02 "
+            "FOR VALUES FROM ('2026-02-01') TO ('2026-03-01')"
+        )
+
+
+def test_page_after_cursor_bounds_created_at():
+    """Тест: запрос страницы после курсора ограничивает created_at для отсечения партиций"""
+    stmt = IncidentRepository._page_statement(
+        select(Incident.id), 10, (datetime(2025, 11, 19, 12, 0), uuid4()), None
+    )
+
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+
+    assert "incidents.created_at <= " in sql
+
+
+class TestIncidentKey:
+    """Тесты отсечения партиций при поиске по id"""
+
+    def test_uuid7_keeps_creation_time(self):
+        """Тест: время создания восстанавливается из UUIDv7 с точностью до миллисекунды"""
+        created = datetime(2025, 11, 19, 12, 0, 0, 123000, tzinfo=timezone.utc)
+        incident_id = uuid7(created.timestamp() + 0.0001)
+
+        assert incident_id.version == 7
+        assert uuid7_time(incident_id) == datetime(2025, 11, 19, 12, 0, 0, 123000)
+        assert uuid7_time(uuid4()) is None
+
+    def test_uuid7_bounds_created_at(self):
+        """Тест: поиск по UUIDv7 ограничивает created_at, по UUIDv4 - нет"""
+        incident_id = uuid7()
+        created_at = uuid7_time(incident_id)
+
+        stmt = select(Incident.id).where(*incident_key(incident_id))
+        params = stmt.compile(dialect=postgresql.dialect()).params
+
+        assert created_at - ID_TIME_TOLERANCE in params.values()
+        assert created_at + ID_TIME_TOLERANCE in params.values()
+        assert "created_at" not in str(select(Incident.id).where(*incident_key(uuid4())))
+
+    def test_batch_bounds_only_when_all_ids_are_uuid7(self):
+        """Тест: пакет ограничивается по created_at, только если у всех id есть время"""
+        assert len(incident_keys([uuid7(), uuid7()])) == 3
+        assert len(incident_keys([uuid7(), uuid4()])) == 1
@@ -0,0 +1,23 @@
+from types import SimpleNamespace
+
+from core.dependencies import PRIMARY_PIN_COOKIE, is_pinned_to_primary
+
+
+def make_request(cookies: dict) -> SimpleNamespace:
+    return SimpleNamespace(cookies=cookies)
+
+
+class TestReadRouting:
+    """Тесты выбора primary/реплики для чтений"""
+
+    def test_recent_write_pins_to_primary(self):
+        """Тест: в окне после записи чтения идут в primary"""
+        request = make_request({PRIMARY_PIN_COOKIE: "1000.5"})
+
+        assert is_pinned_to_primary(request, now=1000.0) is True
+        assert is_pinned_to_primary(request, now=1001.0) is False
+
+    def test_missing_or_broken_cookie_reads_replica(self):
+        """Тест: без корректной cookie чтения идут в реплику"""
+        assert is_pinned_to_primary(make_request({}), now=0.0) is False
+        assert is_pinned_to_primary(make_request({PRIMARY_PIN_COOKIE: "oops"}), now=0.0) is False
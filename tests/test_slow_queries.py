@@ -0,0 +1,116 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy.util import greenlet_spawn
+from db.slow_queries import SlowQueryRecorder, find_caller, normalize_sql, parameters_shape
+
+
+def make_recorder(**overrides) -> SlowQueryRecorder:
+    options = dict(
+        threshold_seconds=0.1,
+        max_statements=2,
+        explain_sample_rate=1.0,
+        explain_interval_seconds=600,
+        explain_timeout_seconds=5,
+        clock=lambda: 1000.0,
+    )
+    options.update(overrides)
+    return SlowQueryRecorder(**options)
+
+
+class FakeConnection:
+    """Соединение движка, возвращающее заранее заданный план"""
+
+    def __init__(self, plan_rows):
+        self.statements = []
+        self.parameters = []
+        self.plan_rows = plan_rows
+        self.rollback = AsyncMock()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execution_options(self, **options):
+        self.options = options
+        return self
+
+    async def exec_driver_sql(self, statement, parameters=None):
+        self.statements.append(statement)
+        self.parameters.append(parameters)
+        return MagicMock(all=MagicMock(return_value=self.plan_rows))
+
+
+class TestSlowQueryHelpers:
+    """Тесты нормализации запросов"""
+
+    def test_normalize_sql(self):
+        """Тест: значения и списки IN разной длины не дают новых форм запроса"""
+        first = normalize_sql("SELECT *\n  FROM incidents WHERE id IN ($1, $2, $3) AND status = 'open' LIMIT 10")
+        second = normalize_sql("SELECT * FROM incidents WHERE id IN ($1) AND status = 'closed' LIMIT 20")
+
+        assert first == "SELECT * FROM incidents WHERE id IN (?, ...) AND status = ? LIMIT ?"
+        assert second == "SELECT * FROM incidents WHERE id IN (?) AND status = ? LIMIT ?"
+
+    def test_parameters_shape_hides_values(self):
+        """Тест: в журнал попадают типы параметров, а не значения"""
+        assert parameters_shape(("secret", 5)) == "(str, int)"
+        assert parameters_shape([("a",), ("b",)], executemany=True) == "2 x (str)"
+
+    @pytest.mark.asyncio
+    async def test_find_caller_crosses_greenlet(self):
+        """Тест: вызывающий метод находится через границу greenlet SQLAlchemy"""
+        async def repository_method():
+            return await greenlet_spawn(find_caller, __name__)
+
+        caller = await repository_method()
+
+        assert caller.startswith(f"{__name__}:")
+        assert caller.endswith("<locals>.repository_method")
+
+
+class TestSlowQueryRecorder:
+    """Тесты журнала медленных запросов"""
+
+    def test_aggregates_by_normalized_sql(self):
+        """Тест: запросы одной формы складываются, число форм ограничено"""
+        recorder = make_recorder()
+        recorder.record("primary", "SELECT 1 FROM incidents WHERE id = $1", ("a",), False, 0.2, "repo:get")
+        recorder.record("primary", "SELECT 1 FROM incidents WHERE id = $1", ("b",), False, 0.4, "repo:get")
+        recorder.record("primary", "UPDATE incidents SET status = $1", ("x",), False, 0.3, None)
+        recorder.record("primary", "DELETE FROM incidents", (), False, 0.3, None)
+
+        statements = recorder.snapshot()["statements"]
+        assert [statement["sql"] for statement in statements] == [
+            "UPDATE incidents SET status = ?",
+            "DELETE FROM incidents",
+        ]
+        assert recorder.recorded == 4
+
+        recorder.reset()
+        entry = recorder.record("primary", "SELECT 1 FROM incidents WHERE id = $1", ("a",), False, 0.2, "repo:get")
+        recorder.record("primary", "SELECT 1 FROM incidents WHERE id = $1", ("b",), False, 0.4, "repo:get")
+        assert (entry.count, entry.max_seconds, entry.caller) == (2, 0.4, "repo:get")
+        assert entry.total_seconds == pytest.approx(0.6)
+
+    @pytest.mark.asyncio
+    async def test_explains_sampled_selects_in_background(self):
+        """Тест: фоновый EXPLAIN только для SELECT, один на форму запроса"""
+        recorder = make_recorder()
+        connection = FakeConnection([("Seq Scan on incidents",), ("Buffers: shared hit=10",)])
+        recorder._engines["primary"] = MagicMock(connect=MagicMock(return_value=connection))
+        await recorder.start()
+
+        entry = recorder.record("primary", "SELECT * FROM incidents WHERE id = $1", ("a",), False, 0.5, None)
+        recorder.record("primary", "SELECT * FROM incidents WHERE id = $1", ("b",), False, 0.5, None)
+        recorder.record("primary", "UPDATE incidents SET status = $1", ("x",), False, 0.5, None)
+        await asyncio.wait_for(recorder._explain_queue.join(), 1)
+        await recorder.stop()
+
+        assert entry.plan == "Seq Scan on incidents\nBuffers: shared hit=10"
+        assert connection.statements[-1] == "EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM incidents WHERE id = $1"
+        assert connection.parameters[-1] == ("a",)
+        assert connection.options["postgresql_readonly"] is True
+        assert recorder.explained == 1